@@ -0,0 +1,52 @@
+-- Tables as they existed before sql/migrations, so a throwaway database can
+-- be brought to the current schema with the same migrations production ran.
+
+CREATE TABLE IF NOT EXISTS companies (
+    ticker TEXT PRIMARY KEY,
+    company_name TEXT,
+    sector TEXT,
+    industry TEXT,
+    exchange TEXT,
+    market_cap_category TEXT,
+    alpaca_tradable BOOLEAN DEFAULT FALSE,
+    alpaca_shortable BOOLEAN DEFAULT FALSE,
+    alpaca_marginable BOOLEAN DEFAULT FALSE,
+    alpaca_fractionable BOOLEAN DEFAULT FALSE,
+    clinical_trials_search_phrases TEXT,
+    primary_search_phrase TEXT
+);
+
+CREATE TABLE IF NOT EXISTS clinical_trials (
+    nctid TEXT PRIMARY KEY,
+    title TEXT,
+    phase TEXT,
+    pcd DATE,
+    primary_sponsor TEXT,
+    primary_sponsor_ticker TEXT,
+    conditions TEXT,
+    traded BOOLEAN NOT NULL DEFAULT FALSE
+);
+
+CREATE TABLE IF NOT EXISTS regulatory_decisions (
+    id SERIAL PRIMARY KEY,
+    useu TEXT,
+    ticker TEXT,
+    drug_name TEXT,
+    date DATE,
+    status TEXT,
+    decision TEXT,
+    traded BOOLEAN NOT NULL DEFAULT FALSE,
+    UNIQUE (ticker, drug_name, date)
+);
+
+CREATE TABLE IF NOT EXISTS trades (
+    symbol TEXT PRIMARY KEY,
+    call_put TEXT,
+    ticker TEXT,
+    expiration DATE,
+    strike NUMERIC,
+    premium NUMERIC,
+    study_id TEXT,
+    regulatory_id INTEGER,
+    quantity INTEGER
+);
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Record Fixtures
+Refreshes benchmarks/fixtures from the live sources: the RTT News calendar
+pages, two ClinicalTrials.gov result pages, an openFDA hit and miss, an
+Alpaca option chain (range and at-the-money lookups) plus the asset list,
+and yfinance company info for the screened tickers.
+
+Needs network access and the Alpaca keys in src/config. Re-record when a
+source changes its format, then save a new baseline.
+
+Usage:
+    python benchmarks/record_fixtures.py UNDERLYING [SPONSOR]
+"""
+import json
+import sys
+from datetime import date, timedelta
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR.parent / "src"))
+
+import requests
+import yfinance as yf
+
+from config import alpacaConfig
+from data_inflows.clinical_trials import BASE_URL, FIELDS
+from data_inflows.pdufa_manager import OPENFDA_URL
+from data_inflows.pdufa_scraper import RTT_CALENDAR_URL, RTT_PAGES
+from trading.alpaca_gateway import PAPER_TRADING_URL
+
+from stand_ins import FIXTURES_DIR
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+OPENFDA_HIT = "OHTUVAYRE"
+OPENFDA_MISS = "NOTADRUGNAME"
+INFO_KEYS = ('symbol', 'longName', 'marketCap', 'sector', 'industry', 'regularMarketPrice', 'volume', 'exchange')
+
+
+def _write(relative: str, content):
+    path = FIXTURES_DIR / relative
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if isinstance(content, bytes):
+        path.write_bytes(content)
+    else:
+        path.write_text(json.dumps(content, indent=1))
+    print(f"Recorded {path.relative_to(BENCH_DIR)}")
+
+
+def record_rtt():
+    session = requests.Session()
+    session.headers['User-Agent'] = USER_AGENT
+    for page in range(1, RTT_PAGES + 1):
+        response = session.get(f"{RTT_CALENDAR_URL}?PageNum={page}")
+        response.raise_for_status()
+        _write(f"rtt/page_{page}.html", response.content)
+
+
+def record_clinical_trials(sponsor: str):
+    params = {
+        'format': 'json',
+        'filter.overallStatus': 'RECRUITING,ACTIVE_NOT_RECRUITING',
+        'filter.advanced': f'AREA[Phase]PHASE3,AREA[LeadSponsorClass]INDUSTRY,AREA[LeadSponsorName]{sponsor}',
+        'fields': ','.join(FIELDS),
+        'pageSize': 100,
+    }
+    for page in (1, 2):
+        response = requests.get(BASE_URL, params=params)
+        response.raise_for_status()
+        data = response.json()
+        if page == 2:
+            data.pop('nextPageToken', None)
+        _write(f"clinicaltrials/studies_page_{page}.json", data)
+        if not data.get('nextPageToken'):
+            break
+        params['pageToken'] = data['nextPageToken']
+
+
+def record_openfda():
+    for name, drug in (("found", OPENFDA_HIT), ("not_found", OPENFDA_MISS)):
+        response = requests.get(OPENFDA_URL, params={
+            'search': f'openfda.brand_name:"{drug}" OR openfda.generic_name:"{drug}"', 'limit': 1
+        })
+        _write(f"openfda/{name}.json", response.json())
+
+
+def record_alpaca(underlying: str):
+    session = requests.Session()
+    session.headers.update({
+        'APCA-API-KEY-ID': alpacaConfig.ALPACA_API_KEY,
+        'APCA-API-SECRET-KEY': alpacaConfig.ALPACA_SECRET_KEY,
+    })
+    spot = yf.Ticker(underlying).info['regularMarketPrice']
+    target = date.today() + timedelta(days=60)
+    chain = session.get(f"{PAPER_TRADING_URL}/v2/options/contracts", params={
+        'underlying_symbols': underlying, 'style': 'american', 'type': 'call',
+        'expiration_date_gte': (target - timedelta(days=15)).isoformat(),
+        'expiration_date_lte': (target + timedelta(days=15)).isoformat(),
+        'strike_price_gte': str(spot - 5), 'strike_price_lte': str(spot + 5),
+    })
+    chain.raise_for_status()
+    contracts = chain.json()
+    _write("alpaca/option_contracts_range.json", contracts)
+
+    atm = min(contracts['option_contracts'], key=lambda c: (abs(float(c['strike_price']) - spot),
+                                                            abs(date.fromisoformat(c['expiration_date']) - target)))
+    straddle = session.get(f"{PAPER_TRADING_URL}/v2/options/contracts", params={
+        'underlying_symbols': underlying, 'style': 'american', 'expiration_date': atm['expiration_date'],
+        'strike_price_gte': atm['strike_price'], 'strike_price_lte': atm['strike_price'],
+    })
+    straddle.raise_for_status()
+    _write("alpaca/option_contracts_atm.json", straddle.json())
+
+    assets = session.get(f"{PAPER_TRADING_URL}/v2/assets", params={'status': 'active', 'asset_class': 'us_equity'})
+    assets.raise_for_status()
+    _write("alpaca/assets.json", assets.json())
+
+
+def record_company_info(underlying: str):
+    path = FIXTURES_DIR / "yfinance" / "info.json"
+    tickers = set(json.loads(path.read_text())) if path.exists() else set()
+    info = {}
+    for ticker in sorted(tickers | {underlying}):
+        ticker_info = yf.Ticker(ticker).info
+        if ticker_info.get('longName'):
+            info[ticker] = {key: ticker_info.get(key) for key in INFO_KEYS}
+    _write("yfinance/info.json", info)
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: record_fixtures.py UNDERLYING [SPONSOR]")
+        sys.exit(1)
+    underlying = sys.argv[1].upper()
+    sponsor = sys.argv[2] if len(sys.argv) > 2 else "Madrigal"
+    record_rtt()
+    record_clinical_trials(sponsor)
+    record_openfda()
+    record_alpaca(underlying)
+    record_company_info(underlying)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+"""
+Pipeline Benchmarks
+Times the data pipelines stage by stage against recorded fixtures served by
+local HTTP stand-ins (stand_ins.py) and a throwaway Postgres
+(throwaway_db.py), and compares each stage's median time with the stored
+baseline so regressions are flagged.
+
+Stages:
+    rtt_scrape       PDUFAScraper over the recorded RTT calendar pages, no page store
+    rtt_poll         PDUFAScraper re-polling the calendar with a warm page store (conditional requests)
+    pdufa_sources    PDUFAScraper.scrape_multiple_sources: RTT and press-release feeds run concurrently
+    ct_parse_study   ClinicalTrialsAggregator.parse_study over recorded studies
+    ct_fetch         ClinicalTrialsAggregator.fetch_upcoming_trials_v2, paging + DB writes   [db]
+    openfda_verify   PDUFAManager.verify_decisions against recorded openFDA answers
+    pdufa_write      PDUFAManager.write_records_to_db                                     [db]
+    screener         BiotechScreener.screen_biotech_companies                              [db]
+    best_contract    AlpacaTradingClient.get_best_contract over the recorded option chain
+
+yfinance calls to Yahoo cannot be pointed at a local server, so the screener
+and trader read company info from fixtures/yfinance/info.json instead.
+Politeness delays between requests are set to zero. Stages marked [db] are
+skipped when no PostgreSQL server binaries are found. Like every other entry
+point, the run imports src/config (the credentials in it are not used).
+
+Usage:
+    python benchmarks/run_benchmarks.py                        # run all, compare with baseline.json
+    python benchmarks/run_benchmarks.py --stages rtt_scrape,best_contract --repeat 20
+    python benchmarks/run_benchmarks.py --save-baseline        # store this run as the baseline
+"""
+import argparse
+import json
+import platform
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from types import SimpleNamespace
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR.parent / "src"))
+
+import psycopg as ppg
+from alpaca.trading.client import TradingClient
+
+import data_inflows.clinical_trials as clinical_trials
+import data_inflows.pdufa_manager as pdufa_manager
+import data_inflows.pdufa_scraper as pdufa_scraper
+import trading.order_placer as order_placer
+import utils.biotech_screener as biotech_screener
+from trading.alpaca_gateway import AlpacaGateway
+from utils.logger import Logger
+
+from stand_ins import StandInServer
+from throwaway_db import ThrowawayPostgres, find_pg_bin
+
+BASELINE_PATH = BENCH_DIR / "baseline.json"
+RESULTS_DIR = BENCH_DIR / "results"
+
+DEFAULT_REPEAT = 5
+# A stage regresses when its median is this much slower than the baseline's
+DEFAULT_TOLERANCE = 0.25
+
+# get_best_contract calls per iteration
+BEST_CONTRACT_CALLS = 50
+
+
+class _FixtureTicker:
+    """yf.Ticker stand-in serving the recorded .info payload"""
+
+    def __init__(self, info: dict, ticker: str):
+        self.info = info.get(ticker, {})
+
+
+def _fixture_yfinance(ctx):
+    return SimpleNamespace(Ticker=lambda ticker: _FixtureTicker(ctx.fixtures.company_info, ticker))
+
+
+def _scraped_records(ctx):
+    pdufa_scraper.RTT_CALENDAR_URL = ctx.server.url("/corpinfo/fdacalendar.aspx")
+    pdufa_scraper.RTT_REQUEST_DELAY = 0
+    return pdufa_scraper.PDUFAScraper(page_store_dir=None, source_status_path=None).scrape_multiple_sources()
+
+
+# ----------------------------------------------------------------------
+# Stages: each returns (run, reset); run() returns the number of items it
+# processed, reset() (untimed) restores state between iterations
+# ----------------------------------------------------------------------
+
+def bench_rtt_scrape(ctx):
+    pdufa_scraper.RTT_CALENDAR_URL = ctx.server.url("/corpinfo/fdacalendar.aspx")
+    pdufa_scraper.RTT_REQUEST_DELAY = 0
+    scraper = pdufa_scraper.PDUFAScraper(page_store_dir=None, source_status_path=None)
+    return lambda: len(scraper.scrape_multiple_sources()), None
+
+
+def bench_rtt_poll(ctx):
+    # The warm-up iteration fills the store; timed iterations get 304s
+    pdufa_scraper.RTT_CALENDAR_URL = ctx.server.url("/corpinfo/fdacalendar.aspx")
+    pdufa_scraper.RTT_REQUEST_DELAY = 0
+    scraper = pdufa_scraper.PDUFAScraper(page_store_dir=ctx.workdir / "rtt_pages", source_status_path=None)
+    return lambda: len(scraper.scrape_multiple_sources()), None
+
+
+def bench_pdufa_sources(ctx):
+    # Same RTT work as rtt_scrape plus one feed per company; should take about as long as rtt_scrape
+    pdufa_scraper.RTT_CALENDAR_URL = ctx.server.url("/corpinfo/fdacalendar.aspx")
+    pdufa_scraper.RTT_REQUEST_DELAY = 0
+    feeds = {ticker: ctx.server.url(f"/press/{ticker}.rss") for ticker in ctx.fixtures.company_info}
+    scraper = pdufa_scraper.PDUFAScraper(page_store_dir=None, source_status_path=None, press_release_feeds=feeds)
+    return lambda: len(scraper.scrape_multiple_sources()), None
+
+
+def bench_ct_parse_study(ctx):
+    aggregator = clinical_trials.ClinicalTrialsAggregator.__new__(clinical_trials.ClinicalTrialsAggregator)
+    aggregator.conn = aggregator.cursor = None
+    studies = ctx.fixtures.studies()
+
+    def run():
+        for study in studies:
+            aggregator.parse_study(study)
+        return len(studies)
+    return run, None
+
+
+def bench_ct_fetch(ctx):
+    clinical_trials.BASE_URL = ctx.server.url("/api/v2/studies")
+    companies = [(ticker, [info['longName']]) for ticker, info in ctx.fixtures.company_info.items()]
+    ctx.db.truncate("companies")
+    with ctx.db.connect() as conn:
+        conn.cursor().executemany(
+            "INSERT INTO companies (ticker, company_name, alpaca_tradable, clinical_trials_search_phrases) VALUES (%s, %s, TRUE, %s)",
+            [(ticker, phrases[0], phrases) for ticker, phrases in companies]
+        )
+    aggregator = clinical_trials.ClinicalTrialsAggregator(ctx.db.settings)
+
+    def run():
+        aggregator.fetch_upcoming_trials_v2()
+        aggregator.cursor.execute("SELECT count(*) FROM clinical_trials")
+        return aggregator.cursor.fetchone()[0]
+    return run, lambda: ctx.db.truncate("clinical_trials")
+
+
+def bench_openfda_verify(ctx):
+    pdufa_manager.OPENFDA_URL = ctx.server.url("/drug/drugsfda.json")
+    pdufa_manager.OPENFDA_REQUEST_DELAY = 0
+    manager = pdufa_manager.PDUFAManager.__new__(pdufa_manager.PDUFAManager)
+    records = _scraped_records(ctx)
+    batch = records.copy()
+
+    def reset():
+        # verify_decisions updates the batch in place
+        batch.columns = records.copy().columns
+
+    def run():
+        manager.verify_decisions(batch)
+        return len(batch)
+    return run, reset
+
+
+def bench_pdufa_write(ctx):
+    records = _scraped_records(ctx)
+    manager = pdufa_manager.PDUFAManager(ctx.db.settings)
+
+    def run():
+        manager.write_records_to_db(records)
+        return len(records)
+    return run, lambda: ctx.db.truncate("regulatory_decisions")
+
+
+class _FixtureScreener(biotech_screener.BiotechScreener):
+    """BiotechScreener wired to the throwaway database and the Alpaca stand-in"""
+
+    def __init__(self, db_settings, alpaca_url: str):
+        self.rescreen_after = timedelta(days=30)
+        self.conn = ppg.connect(dbname=db_settings.DB_NAME, user=db_settings.DB_USER, host=db_settings.DB_HOST)
+        self.cursor = self.conn.cursor()
+        self.trading_client = TradingClient("bench", "bench", paper=True, url_override=alpaca_url)
+
+
+def bench_screener(ctx):
+    biotech_screener.yf = _fixture_yfinance(ctx)
+    biotech_screener.SCREEN_DELAY_SECONDS = 0
+    screener = _FixtureScreener(ctx.db.settings, ctx.server.base_url)
+    tickers = set(ctx.fixtures.company_info)
+
+    def run():
+        screener.screen_biotech_companies(tickers)
+        return len(tickers)
+    return run, lambda: ctx.db.truncate("companies")
+
+
+def bench_best_contract(ctx):
+    order_placer.yf = _fixture_yfinance(ctx)
+    gateway = AlpacaGateway("bench", "bench", paper=True, rate_limit_per_minute=10 ** 9)
+    gateway.trading_url = ctx.server.base_url
+    trader = order_placer.AlpacaTradingClient.__new__(order_placer.AlpacaTradingClient)
+    trader.conn = trader.cursor = None
+    trader.gateway = gateway
+
+    atm = json.loads(ctx.fixtures.option_contracts_atm)["option_contracts"][0]
+    ticker = atm["underlying_symbol"]
+    target_date = date.fromisoformat(atm["expiration_date"])
+
+    def run():
+        for _ in range(BEST_CONTRACT_CALLS):
+            trader.get_best_contract(ticker, target_date)
+        return BEST_CONTRACT_CALLS
+    return run, None
+
+
+STAGES = {
+    'rtt_scrape': (bench_rtt_scrape, False),
+    'rtt_poll': (bench_rtt_poll, False),
+    'pdufa_sources': (bench_pdufa_sources, False),
+    'ct_parse_study': (bench_ct_parse_study, False),
+    'ct_fetch': (bench_ct_fetch, True),
+    'openfda_verify': (bench_openfda_verify, False),
+    'pdufa_write': (bench_pdufa_write, True),
+    'screener': (bench_screener, True),
+    'best_contract': (bench_best_contract, False),
+}
+
+
+# ----------------------------------------------------------------------
+# Measurement
+# ----------------------------------------------------------------------
+
+def _percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p * len(values)))]
+
+
+def measure(factory, ctx, repeat: int):
+    """One warm-up iteration, then repeat timed iterations; spans are aggregated over the timed ones"""
+    logger = Logger()
+    run, reset = factory(ctx)
+    if reset:
+        reset()
+    run()
+
+    logger.reset_spans()
+    ctx.server.reset_counts()
+    timings, items = [], 0
+    for _ in range(repeat):
+        if reset:
+            reset()
+        start = time.perf_counter()
+        items = run()
+        timings.append(time.perf_counter() - start)
+
+    median = _percentile(timings, 0.5)
+    return {
+        'iterations': repeat,
+        'items': items,
+        'median_s': median,
+        'p95_s': _percentile(timings, 0.95),
+        'min_s': min(timings),
+        'items_per_s': items / median if median else None,
+        'requests': ctx.server.request_counts(),
+        'spans': logger.span_summary(),
+    }
+
+
+def compare(results: dict, baseline: dict) -> dict:
+    """Stage name -> median / baseline median ratio, for stages present in both"""
+    ratios = {}
+    for name, result in results.items():
+        base = baseline.get('stages', {}).get(name)
+        if base and base.get('median_s'):
+            ratios[name] = result['median_s'] / base['median_s']
+    return ratios
+
+
+def print_report(results: dict, ratios: dict, tolerance: float):
+    print(f"\n{'stage':<16} {'items':>7} {'median ms':>10} {'p95 ms':>10} {'items/s':>10} {'vs base':>9}")
+    for name, result in results.items():
+        ratio = ratios.get(name)
+        flag = "" if ratio is None else f"{ratio:8.2f}x" + (" REGRESSION" if ratio > 1 + tolerance else "")
+        print(f"{name:<16} {result['items']:>7} {result['median_s'] * 1000:>10.1f} {result['p95_s'] * 1000:>10.1f} "
+              f"{result['items_per_s'] or 0:>10.1f} {flag}")
+        for span, stats in sorted(result['spans'].items(), key=lambda item: -item[1]['total_ms']):
+            print(f"    {span:<34} {stats['count']:>6} calls  p50 {stats['p50_ms']:>8.2f}ms  p95 {stats['p95_ms']:>8.2f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the data pipelines against recorded fixtures")
+    parser.add_argument('--stages', help="comma-separated subset of: " + ", ".join(STAGES))
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT)
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help="flag stages whose median is this fraction slower than the baseline")
+    parser.add_argument('--latency-ms', type=float, default=0.0, help="delay added to every stand-in response")
+    parser.add_argument('--baseline', type=Path, default=BASELINE_PATH)
+    parser.add_argument('--save-baseline', action='store_true', help="store this run's stages in the baseline")
+    parser.add_argument('--no-db', action='store_true', help="skip the stages that need Postgres")
+    args = parser.parse_args()
+
+    names = args.stages.split(",") if args.stages else list(STAGES)
+    unknown = [name for name in names if name not in STAGES]
+    if unknown:
+        parser.error(f"unknown stages: {', '.join(unknown)}")
+
+    use_db = not args.no_db and any(STAGES[name][1] for name in names)
+    if use_db and find_pg_bin() is None:
+        print("PostgreSQL server binaries not found (set PG_BIN); skipping database stages")
+        use_db = False
+    names = [name for name in names if use_db or not STAGES[name][1]]
+
+    # The fixtures include entries the pipelines warn about; keep the report readable
+    Logger(level="ERROR")
+
+    # Scratch space for stages that keep state on disk (the RTT page store)
+    workdir = Path(tempfile.mkdtemp(prefix="pharma_trade_bench_"))
+
+    results = {}
+    with StandInServer(latency=args.latency_ms / 1000) as server:
+        db = ThrowawayPostgres() if use_db else None
+        if db:
+            db.__enter__()
+        try:
+            ctx = SimpleNamespace(server=server, fixtures=server.fixtures, db=db, workdir=workdir)
+            for name in names:
+                print(f"Running {name}...")
+                results[name] = measure(STAGES[name][0], ctx, args.repeat)
+        finally:
+            if db:
+                db.__exit__(None, None, None)
+
+    baseline = json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+    ratios = compare(results, baseline)
+    print_report(results, ratios, args.tolerance)
+
+    meta = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'machine': platform.platform(),
+        'repeat': args.repeat,
+        'latency_ms': args.latency_ms,
+    }
+    RESULTS_DIR.mkdir(exist_ok=True)
+    (RESULTS_DIR / f"run_{datetime.now():%Y%m%d_%H%M%S}.json").write_text(
+        json.dumps({'meta': meta, 'stages': results}, indent=2)
+    )
+
+    if args.save_baseline:
+        baseline = {'meta': meta, 'stages': {**baseline.get('stages', {}), **results}}
+        args.baseline.write_text(json.dumps(baseline, indent=2))
+        print(f"\nSaved baseline for {len(results)} stages to {args.baseline}")
+        return 0
+
+    regressions = [name for name, ratio in ratios.items() if ratio > 1 + args.tolerance]
+    if not baseline:
+        print("\nNo baseline yet; run with --save-baseline to store one")
+    elif regressions:
+        print(f"\nRegressions (> {args.tolerance:.0%} slower than baseline): {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
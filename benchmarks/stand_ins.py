@@ -0,0 +1,162 @@
+"""
+HTTP Stand-ins
+Local server answering the RTT News calendar, company press-release feeds,
+ClinicalTrials.gov, openFDA and Alpaca trading endpoints from the recorded fixtures, so the pipelines
+can be benchmarked without the network.
+"""
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+FIXTURES_DIR = Path(__file__).resolve().parent / "fixtures"
+
+# Last-Modified sent with every RTT page (the fixtures never change)
+RTT_LAST_MODIFIED = "Mon, 06 Jan 2025 00:00:00 GMT"
+
+# openFDA lookups for drug names starting with one of these letters come
+# back as approved, the rest as 404, so both branches are exercised
+OPENFDA_FOUND_LETTERS = set("aeiou")
+
+
+class Fixtures:
+    """Recorded responses, read once and served as bytes"""
+
+    def __init__(self, root: Path = FIXTURES_DIR):
+        self.root = Path(root)
+        self.rtt_pages = {
+            int(path.stem.split("_")[1]): path.read_bytes()
+            for path in sorted((self.root / "rtt").glob("page_*.html"))
+        }
+        self.study_pages = [
+            path.read_bytes()
+            for path in sorted((self.root / "clinicaltrials").glob("studies_page_*.json"))
+        ]
+        self.openfda_found = (self.root / "openfda" / "found.json").read_bytes()
+        self.openfda_not_found = (self.root / "openfda" / "not_found.json").read_bytes()
+        self.option_contracts_range = (self.root / "alpaca" / "option_contracts_range.json").read_bytes()
+        self.option_contracts_atm = (self.root / "alpaca" / "option_contracts_atm.json").read_bytes()
+        self.assets = (self.root / "alpaca" / "assets.json").read_bytes()
+        self.company_info = json.loads((self.root / "yfinance" / "info.json").read_text())
+        self.press_release_feed = (self.root / "press_releases" / "feed.xml").read_bytes()
+
+    def studies(self):
+        """Every recorded ClinicalTrials.gov study"""
+        return [study for page in self.study_pages for study in json.loads(page)["studies"]]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; without this, keep-alive
+    # clients wait out the delayed ACK on every response
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, body: bytes, content_type: str = "application/json", headers: dict = None):
+        self.server.counts[self.route] = self.server.counts.get(self.route, 0) + 1
+        self.server.bytes_sent += len(body)
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        fixtures = self.server.fixtures
+
+        if url.path == "/corpinfo/fdacalendar.aspx":
+            self.route = "rtt"
+            page = int(params.get("PageNum", 1))
+            body = fixtures.rtt_pages.get(page)
+            if not body:
+                return self._send(404, b"", "text/html")
+            # Conditional requests as the live site answers them
+            validators = {"ETag": f'"{hashlib.sha256(body).hexdigest()[:16]}"', "Last-Modified": RTT_LAST_MODIFIED}
+            if self.headers.get("If-None-Match") == validators["ETag"]:
+                self.route = "rtt.not_modified"
+                return self._send(304, b"", "text/html", validators)
+            return self._send(200, body, "text/html", validators)
+
+        if url.path == "/api/v2/studies":
+            # One recorded page per pageToken; the last page has no nextPageToken
+            self.route = "clinicaltrials"
+            index = 1 if params.get("pageToken") else 0
+            return self._send(200, fixtures.study_pages[min(index, len(fixtures.study_pages) - 1)])
+
+        if url.path == "/drug/drugsfda.json":
+            self.route = "openfda"
+            name = params.get("search", "").split('"')[1] if '"' in params.get("search", "") else ""
+            if name[:1].lower() in OPENFDA_FOUND_LETTERS:
+                return self._send(200, fixtures.openfda_found)
+            return self._send(404, fixtures.openfda_not_found)
+
+        if url.path.startswith("/press/"):
+            # Every ticker's feed is the same recorded one
+            self.route = "press_releases"
+            return self._send(200, fixtures.press_release_feed, "application/rss+xml")
+
+        if url.path == "/v2/options/contracts":
+            self.route = "alpaca.options/contracts"
+            body = fixtures.option_contracts_atm if "expiration_date" in params else fixtures.option_contracts_range
+            return self._send(200, body)
+
+        if url.path == "/v2/assets":
+            self.route = "alpaca.assets"
+            return self._send(200, fixtures.assets)
+
+        self.route = "unknown"
+        self._send(404, b'{"message": "not found"}')
+
+
+class StandInServer:
+    """
+    Threaded HTTP server on 127.0.0.1. latency adds a fixed delay (seconds)
+    to every response to model a network round trip.
+
+        with StandInServer() as server:
+            scraper_module.RTT_CALENDAR_URL = server.url("/corpinfo/fdacalendar.aspx")
+    """
+
+    def __init__(self, fixtures: Fixtures = None, latency: float = 0.0):
+        self.fixtures = fixtures or Fixtures()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self._server.daemon_threads = True
+        self._server.fixtures = self.fixtures
+        self._server.latency = latency
+        self._server.counts = {}
+        self._server.bytes_sent = 0
+        self._thread = threading.Thread(target=self._server.serve_forever, name="stand-ins", daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def url(self, path: str) -> str:
+        return f"{self.base_url}{path}"
+
+    def request_counts(self) -> dict:
+        return dict(self._server.counts)
+
+    def reset_counts(self):
+        self._server.counts = {}
+        self._server.bytes_sent = 0
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,94 @@
+"""
+Throwaway Postgres
+Starts a private PostgreSQL cluster in a temporary directory (initdb +
+pg_ctl, trust auth over a Unix socket), loads the pre-migration schema and
+runs sql/migrations, then deletes the cluster on exit.
+
+The server binaries are looked up in $PG_BIN, then on PATH, then under
+/usr/lib/postgresql/<version>/bin.
+"""
+import glob
+import os
+import shutil
+import subprocess
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+import psycopg as ppg
+
+from utils.migrations import run_migrations
+
+BASE_SCHEMA = Path(__file__).resolve().parent / "base_schema.sql"
+DB_NAME = "pharma_trade_bench"
+
+
+def find_pg_bin() -> Optional[Path]:
+    candidates = [os.environ.get("PG_BIN")]
+    initdb = shutil.which("initdb")
+    if initdb:
+        candidates.append(os.path.dirname(initdb))
+    candidates += sorted(glob.glob("/usr/lib/postgresql/*/bin"), reverse=True)
+    for candidate in candidates:
+        if candidate and (Path(candidate) / "initdb").exists() and (Path(candidate) / "pg_ctl").exists():
+            return Path(candidate)
+    return None
+
+
+class DBSettings:
+    """Same shape as config.dbConfig"""
+
+    def __init__(self, host: str, user: str, name: str = DB_NAME):
+        self.DB_HOST = host
+        self.DB_USER = user
+        self.DB_NAME = name
+        self.DB_PASSWORD = None
+
+
+class ThrowawayPostgres:
+    """
+        with ThrowawayPostgres() as db:
+            conn = db.connect()
+    """
+
+    def __init__(self, pg_bin: Optional[Path] = None):
+        self.pg_bin = Path(pg_bin) if pg_bin else find_pg_bin()
+        if self.pg_bin is None:
+            raise RuntimeError("PostgreSQL server binaries not found (set PG_BIN)")
+        self.root = None
+        self.settings = None
+
+    def _run(self, *args):
+        subprocess.run([str(self.pg_bin / args[0]), *args[1:]], check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+
+    def __enter__(self):
+        self.root = Path(tempfile.mkdtemp(prefix="pharma_trade_pg_"))
+        data_dir = self.root / "data"
+        user = os.environ.get("USER") or "postgres"
+        self._run("initdb", "-D", str(data_dir), "-U", user, "-A", "trust", "--no-sync")
+        # Unix socket only, in the temp dir; durability off since the data is thrown away
+        options = f"-k {self.root} -c listen_addresses='' -c fsync=off -c synchronous_commit=off -c full_page_writes=off"
+        self._run("pg_ctl", "-D", str(data_dir), "-o", options, "-l", str(self.root / "server.log"), "-w", "start")
+
+        self.settings = DBSettings(host=str(self.root), user=user)
+        with ppg.connect(dbname="postgres", user=user, host=str(self.root), autocommit=True) as conn:
+            conn.execute(f"CREATE DATABASE {DB_NAME}")
+        with self.connect() as conn:
+            conn.execute(BASE_SCHEMA.read_text())
+        run_migrations(self.settings)
+        return self
+
+    def connect(self, **kwargs):
+        return ppg.connect(dbname=self.settings.DB_NAME, user=self.settings.DB_USER,
+                           host=self.settings.DB_HOST, **kwargs)
+
+    def truncate(self, *tables: str):
+        with self.connect() as conn:
+            conn.execute(f"TRUNCATE {', '.join(tables)} RESTART IDENTITY CASCADE")
+
+    def __exit__(self, *exc):
+        try:
+            self._run("pg_ctl", "-D", str(self.root / "data"), "-m", "immediate", "-w", "stop")
+        finally:
+            shutil.rmtree(self.root, ignore_errors=True)
@@ -35,7 +35,7 @@ run_trading() {
     fi
     
     # Run the trading bot
-    "$PYTHON_ENV" src/main.py run_trades > "$log_file" 2>&1
+    "$PYTHON_ENV" src/main.py run_trades ${PROFILE:+--profile} > "$log_file" 2>&1
     local exit_code=$?
     
     if [[ $exit_code -eq 0 ]]; then
@@ -63,7 +63,7 @@ run_pdufa_scraping() {
         exit 1
     }
     
-    "$PYTHON_ENV" src/main.py scrape_pdufa > "$log_file" 2>&1
+    "$PYTHON_ENV" src/main.py scrape_pdufa ${PROFILE:+--profile} > "$log_file" 2>&1
     local exit_code=$?
     
     if [[ $exit_code -eq 0 ]]; then
@@ -87,7 +87,7 @@ run_trials_fetching() {
         exit 1
     }
     
-    "$PYTHON_ENV" src/main.py fetch_trials > "$log_file" 2>&1
+    "$PYTHON_ENV" src/main.py fetch_trials ${PROFILE:+--profile} > "$log_file" 2>&1
     local exit_code=$?
     
     if [[ $exit_code -eq 0 ]]; then
@@ -124,6 +124,7 @@ case "${1:-}" in
         echo "  pdufa   - Scrape PDUFA data and screen companies"
         echo "  trials  - Fetch clinical trials data"
         echo "  weekly  - Run both pdufa and trials (for weekly refresh)"
+        echo "Set PROFILE=1 to write a cProfile capture next to each run's JSON log (logs/*.profile.json)"
         exit 1
         ;;
 esac
@@ -0,0 +1,27 @@
+-- Store clinical trials search phrases as a native text[] instead of a
+-- comma-joined string, and index it for reverse lookups by sponsor name.
+
+DO $$
+BEGIN
+    IF (SELECT data_type
+          FROM information_schema.columns
+         WHERE table_name = 'companies'
+           AND column_name = 'clinical_trials_search_phrases') <> 'ARRAY' THEN
+        ALTER TABLE companies
+            ALTER COLUMN clinical_trials_search_phrases TYPE text[]
+            USING CASE
+                WHEN clinical_trials_search_phrases IS NULL
+                    OR clinical_trials_search_phrases = '' THEN '{}'::text[]
+                WHEN clinical_trials_search_phrases LIKE '{%}'
+                    THEN clinical_trials_search_phrases::text[]
+                ELSE string_to_array(clinical_trials_search_phrases, ',')
+            END;
+    END IF;
+END
+$$;
+
+ALTER TABLE companies
+    ALTER COLUMN clinical_trials_search_phrases SET DEFAULT '{}'::text[];
+
+CREATE INDEX IF NOT EXISTS companies_search_phrases_gin
+    ON companies USING GIN (clinical_trials_search_phrases);
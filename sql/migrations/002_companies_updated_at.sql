@@ -0,0 +1,8 @@
+-- Track when each company was last screened so known tickers can be
+-- re-screened once they go stale instead of never (or on every run).
+
+ALTER TABLE companies
+    ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ NOT NULL DEFAULT now();
+
+CREATE INDEX IF NOT EXISTS companies_ticker_updated_at_idx
+    ON companies (ticker, updated_at);
@@ -0,0 +1,80 @@
+-- Materialized views over the trade/event joins the dashboard and trader
+-- read repeatedly. Both carry a unique index so they can be refreshed with
+-- REFRESH MATERIALIZED VIEW CONCURRENTLY (see utils/event_views.py) without
+-- blocking readers; materialized_view_refreshes records when each one was
+-- last rebuilt so readers can cache on and display that timestamp.
+
+CREATE TABLE IF NOT EXISTS materialized_view_refreshes (
+    view_name TEXT PRIMARY KEY,
+    refreshed_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+-- Every trade leg with its linked clinical trial or regulatory decision
+CREATE MATERIALIZED VIEW IF NOT EXISTS event_positions AS
+SELECT
+    t.symbol,
+    t.call_put,
+    t.ticker,
+    t.expiration,
+    t.strike,
+    t.premium AS entry_price,
+    t.quantity,
+    t.study_id,
+    t.regulatory_id,
+    COALESCE(ct.title, rd.drug_name) AS linked_event,
+    COALESCE(ct.pcd, rd.date) AS event_date,
+    CASE
+        WHEN ct.nctid IS NOT NULL THEN 'Clinical Trial'
+        ELSE 'PDUFA Decision'
+    END AS event_type
+FROM trades t
+LEFT JOIN clinical_trials ct ON t.study_id = ct.nctid
+LEFT JOIN regulatory_decisions rd ON t.regulatory_id = rd.id
+WHERE t.symbol IS NOT NULL;
+
+CREATE UNIQUE INDEX IF NOT EXISTS event_positions_symbol_idx
+    ON event_positions (symbol);
+CREATE INDEX IF NOT EXISTS event_positions_expiration_symbol_idx
+    ON event_positions (expiration DESC, symbol DESC);
+CREATE INDEX IF NOT EXISTS event_positions_ticker_expiration_symbol_idx
+    ON event_positions (ticker, expiration DESC, symbol DESC);
+CREATE INDEX IF NOT EXISTS event_positions_event_type_expiration_symbol_idx
+    ON event_positions (event_type, expiration DESC, symbol DESC);
+CREATE INDEX IF NOT EXISTS event_positions_call_put_expiration_symbol_idx
+    ON event_positions (call_put, expiration DESC, symbol DESC);
+
+-- Pending regulatory decisions and untraded trial readouts from the refresh
+-- date on; readers still filter on event_date >= CURRENT_DATE between refreshes
+CREATE MATERIALIZED VIEW IF NOT EXISTS upcoming_events AS
+SELECT
+    'PDUFA Decision' AS event_type,
+    id::text AS event_id,
+    ticker,
+    drug_name AS event_name,
+    date AS event_date,
+    status,
+    decision
+FROM regulatory_decisions
+WHERE date >= CURRENT_DATE AND status = 'pending'
+
+UNION ALL
+
+SELECT
+    'Clinical Trial' AS event_type,
+    nctid AS event_id,
+    primary_sponsor_ticker AS ticker,
+    title AS event_name,
+    pcd AS event_date,
+    'pending' AS status,
+    NULL AS decision
+FROM clinical_trials
+WHERE pcd >= CURRENT_DATE AND traded = FALSE;
+
+CREATE UNIQUE INDEX IF NOT EXISTS upcoming_events_event_idx
+    ON upcoming_events (event_type, event_id);
+CREATE INDEX IF NOT EXISTS upcoming_events_event_date_idx
+    ON upcoming_events (event_date);
+
+INSERT INTO materialized_view_refreshes (view_name, refreshed_at)
+VALUES ('event_positions', now()), ('upcoming_events', now())
+ON CONFLICT (view_name) DO UPDATE SET refreshed_at = EXCLUDED.refreshed_at;
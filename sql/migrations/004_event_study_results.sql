@@ -0,0 +1,22 @@
+-- Per-decision abnormal-return results written by analytics/event_study.py,
+-- looked up by ticker for the screener and the dashboard.
+
+CREATE TABLE IF NOT EXISTS event_study_results (
+    regulatory_id INTEGER PRIMARY KEY,
+    ticker TEXT NOT NULL,
+    drug_name TEXT,
+    event_date DATE NOT NULL,
+    benchmark TEXT NOT NULL,
+    window_start INTEGER NOT NULL,
+    window_end INTEGER NOT NULL,
+    car_m1_p1 DOUBLE PRECISION,
+    car_0_p1 DOUBLE PRECISION,
+    car_window DOUBLE PRECISION,
+    pre_event_vol DOUBLE PRECISION,
+    move_zscore DOUBLE PRECISION,
+    abnormal_returns DOUBLE PRECISION[],
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS event_study_results_ticker_event_date_idx
+    ON event_study_results (ticker, event_date);
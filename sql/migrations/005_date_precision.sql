@@ -0,0 +1,8 @@
+-- How exact each event date is: 'day', 'month', 'quarter' or 'half'.
+-- Approximate PDUFA dates are stored mid-period, YYYY-MM completion dates
+-- as the 1st; rows written before this column existed are taken as exact.
+
+ALTER TABLE regulatory_decisions
+    ADD COLUMN IF NOT EXISTS date_precision TEXT NOT NULL DEFAULT 'day';
+ALTER TABLE clinical_trials
+    ADD COLUMN IF NOT EXISTS pcd_precision TEXT NOT NULL DEFAULT 'day';
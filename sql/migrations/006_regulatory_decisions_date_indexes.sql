@@ -0,0 +1,9 @@
+-- PDUFAManager's date-range and per-ticker lookups: a range scan on date,
+-- and an equality-then-range scan on (ticker, date), so neither reads the
+-- whole table.
+
+CREATE INDEX IF NOT EXISTS regulatory_decisions_date_idx
+    ON regulatory_decisions (date);
+
+CREATE INDEX IF NOT EXISTS regulatory_decisions_ticker_date_idx
+    ON regulatory_decisions (ticker, date);
@@ -0,0 +1,6 @@
+-- Press-release RSS feed of each company (its investor-relations news feed),
+-- polled by PressReleaseFeedSource as a second source of PDUFA dates next to
+-- the RTT calendar. NULL for companies without a feed.
+
+ALTER TABLE companies
+    ADD COLUMN IF NOT EXISTS press_release_feed TEXT;
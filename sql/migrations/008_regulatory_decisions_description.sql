@@ -0,0 +1,6 @@
+-- Free-text description of each decision (the press-release title, for
+-- instance), read back into RegulatoryDecision.description. Older tables
+-- may already have it; rows without one read as empty.
+
+ALTER TABLE regulatory_decisions
+    ADD COLUMN IF NOT EXISTS description TEXT NOT NULL DEFAULT '';
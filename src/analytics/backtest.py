@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+Straddle Backtest
+Replays historical regulatory decisions and trial readouts through the
+trader's straddle rules (AlpacaTradingClient.get_best_contract) against
+daily underlying closes, and summarizes P&L by event type, market-cap
+category and phase.
+
+There is no historical option chain data, so listed contracts are
+simulated: expirations are the monthly third Fridays and strikes sit on
+the usual exchange increments. Legs are marked with Black-Scholes at an
+assumed pre-event IV on entry and a post-event (crushed) IV on exit.
+
+Events are simulated as arrays, a chunk at a time, and chunks are spread
+over a process pool. Daily closes are read from the local price store.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+import psycopg as ppg
+
+from data_inflows.price_history import PriceHistoryStore
+from analytics.greeks import CONTRACT_MULTIPLIER, DAYS_PER_YEAR, RISK_FREE_RATE, black_scholes_price
+
+# Trader rules (see AlpacaTradingClient). Entry lead is how far ahead of the
+# event the trader's daily run first picks it up (the look-ahead window of
+# get_upcoming_regulatory_decisions / get_upcoming_studies); the target offset
+# is where it aims the expiration (decision + 14 days, PCD + 60 days)
+ENTRY_LEAD_DAYS = {'PDUFA Decision': 15, 'Clinical Trial': 15}
+TARGET_OFFSET_DAYS = {'PDUFA Decision': 14, 'Clinical Trial': 60}
+EXPIRATION_WINDOW_DAYS = 15
+STRIKE_BAND = 5.0
+ORDER_QUANTITY = 1
+
+# Default marking assumptions (run_backtest entry_iv / exit_iv override them)
+ENTRY_IV = 0.9
+EXIT_IV = 0.5
+EXIT_DAYS_AFTER = 1
+
+SUMMARY_COLUMNS = ['trades', 'win_rate', 'mean_return', 'median_return', 'p05_return', 'p95_return',
+                   'total_pnl_exit', 'total_pnl_expiry', 'mean_abs_move']
+
+CHUNK_SIZE = 1000
+SUMMARY_DIMENSIONS = ('event_type', 'market_cap_category', 'phase')
+
+
+def load_events(db_settings) -> pd.DataFrame:
+    """Past regulatory decisions and trial readouts with their company's market-cap category"""
+    conn = ppg.connect(dbname=db_settings.DB_NAME,
+                       user=db_settings.DB_USER,
+                       host=db_settings.DB_HOST,
+                       password=db_settings.DB_PASSWORD)
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT 'PDUFA Decision', rd.id::text, rd.ticker, rd.date, NULL, c.market_cap_category
+                FROM regulatory_decisions rd
+                LEFT JOIN companies c ON c.ticker = rd.ticker
+                WHERE rd.date < CURRENT_DATE AND rd.ticker IS NOT NULL
+
+                UNION ALL
+
+                SELECT 'Clinical Trial', ct.nctid, ct.primary_sponsor_ticker, ct.pcd, ct.phase::text, c.market_cap_category
+                FROM clinical_trials ct
+                LEFT JOIN companies c ON c.ticker = ct.primary_sponsor_ticker
+                WHERE ct.pcd < CURRENT_DATE AND ct.primary_sponsor_ticker IS NOT NULL
+                """
+            )
+            rows = cursor.fetchall()
+    finally:
+        conn.close()
+
+    events = pd.DataFrame(rows, columns=['event_type', 'event_id', 'ticker', 'event_date', 'phase', 'market_cap_category'])
+    events['event_date'] = pd.to_datetime(events['event_date'])
+    return events
+
+
+def monthly_expirations(start, end) -> np.ndarray:
+    """Third Friday of every month between start and end, as datetime64[D]"""
+    months = pd.date_range(pd.Timestamp(start).to_period('M').to_timestamp(),
+                           pd.Timestamp(end) + pd.offsets.MonthBegin(1), freq='MS')
+    first_friday = months + pd.to_timedelta((4 - months.dayofweek) % 7, unit='D')
+    return (first_friday + pd.Timedelta(days=14)).to_numpy().astype('datetime64[D]')
+
+
+def strike_increment(spot: np.ndarray) -> np.ndarray:
+    """Typical listed strike spacing for the underlying's price"""
+    return np.select([spot < 25, spot < 50, spot < 200], [1.0, 2.5, 5.0], 10.0)
+
+
+def _asof(closes: np.ndarray, dates: np.ndarray, columns: np.ndarray, when: np.ndarray) -> np.ndarray:
+    """Close of each column on or before each date (NaN before the first bar)"""
+    rows = np.searchsorted(dates, when, side='right') - 1
+    values = closes[rows.clip(0), columns]
+    return np.where(rows >= 0, values, np.nan)
+
+
+def select_contracts(events: pd.DataFrame, closes: pd.DataFrame) -> pd.DataFrame:
+    """
+    Apply the trader's contract selection to every event at once: the
+    expiration nearest the target date (within the window) and the strike
+    nearest the spot price on entry (within the strike band).
+    Events the trader would have skipped get selected=False.
+    """
+    dates = closes.index.to_numpy().astype('datetime64[D]')
+    columns = closes.columns.get_indexer(events['ticker'])
+    values = closes.to_numpy(dtype=float)
+
+    event_date = events['event_date'].to_numpy().astype('datetime64[D]')
+    leads = events['event_type'].map(ENTRY_LEAD_DAYS).fillna(0).to_numpy(dtype=np.int64)
+    entry_date = event_date - leads.astype('timedelta64[D]')
+    offsets = events['event_type'].map(TARGET_OFFSET_DAYS).fillna(0).to_numpy(dtype=np.int64)
+    target_date = event_date + offsets.astype('timedelta64[D]')
+
+    spot = np.where(columns >= 0, _asof(values, dates, columns, entry_date), np.nan)
+    increment = strike_increment(np.nan_to_num(spot))
+    strike = np.round(spot / increment) * increment
+
+    # Nearest expiration to the target date (the range always holds at least two)
+    expirations = monthly_expirations(entry_date.min(), target_date.max() + np.timedelta64(EXPIRATION_WINDOW_DAYS, 'D'))
+    after = np.searchsorted(expirations, target_date).clip(1, len(expirations) - 1)
+    before = after - 1
+    gap_before = np.abs((target_date - expirations[before]).astype(np.int64))
+    gap_after = np.abs((expirations[after] - target_date).astype(np.int64))
+    expiration = expirations[np.where(gap_after < gap_before, after, before)]
+    gap = np.minimum(gap_before, gap_after)
+
+    selected = (
+        (columns >= 0) & np.isfinite(spot) & (spot > 0)
+        & (gap <= EXPIRATION_WINDOW_DAYS)
+        & (np.abs(strike - spot) <= STRIKE_BAND)
+        & (expiration > entry_date)
+    )
+
+    return events.assign(
+        entry_date=entry_date.astype('datetime64[ns]'),
+        target_date=target_date.astype('datetime64[ns]'),
+        expiration=expiration.astype('datetime64[ns]'),
+        spot_entry=spot,
+        strike=strike,
+        selected=selected
+    )
+
+
+def simulate(events: pd.DataFrame, closes: pd.DataFrame, entry_iv: float = ENTRY_IV, exit_iv: float = EXIT_IV,
+             exit_days_after: int = EXIT_DAYS_AFTER, r: float = RISK_FREE_RATE) -> pd.DataFrame:
+    """
+    Straddle P&L for a batch of events: marked at the close the day after the
+    event (exit) and held to expiration (expiry). One contract per leg.
+    Events without a price on entry or exit are dropped.
+    """
+    if events.empty:
+        return events.copy()
+    trades = select_contracts(events, closes)
+    trades = trades[trades['selected']].drop(columns='selected')
+
+    dates = closes.index.to_numpy().astype('datetime64[D]')
+    columns = closes.columns.get_indexer(trades['ticker'])
+    values = closes.to_numpy(dtype=float)
+
+    entry = trades['entry_date'].to_numpy().astype('datetime64[D]')
+    expiration = trades['expiration'].to_numpy().astype('datetime64[D]')
+    exit_date = trades['event_date'].to_numpy().astype('datetime64[D]') + np.timedelta64(exit_days_after, 'D')
+    exit_date = np.minimum(exit_date, expiration)
+
+    spot_entry = trades['spot_entry'].to_numpy()
+    spot_exit = _asof(values, dates, columns, exit_date)
+    spot_expiry = _asof(values, dates, columns, expiration)
+    strike = trades['strike'].to_numpy()
+
+    # Both legs at once: axis 1 is (call, put)
+    is_call = np.array([True, False])
+    t_entry = ((expiration - entry).astype(np.int64) / DAYS_PER_YEAR)[:, None]
+    t_exit = ((expiration - exit_date).astype(np.int64) / DAYS_PER_YEAR)[:, None]
+    entry_cost = black_scholes_price(spot_entry[:, None], strike[:, None], t_entry, entry_iv, is_call, r).sum(axis=1)
+    exit_value = black_scholes_price(spot_exit[:, None], strike[:, None], t_exit, exit_iv, is_call, r).sum(axis=1)
+    expiry_value = np.abs(spot_expiry - strike)
+
+    scale = ORDER_QUANTITY * CONTRACT_MULTIPLIER
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return trades.assign(
+            exit_date=exit_date.astype('datetime64[ns]'),
+            spot_exit=spot_exit,
+            spot_expiry=spot_expiry,
+            move=spot_exit / spot_entry - 1,
+            entry_cost=entry_cost * scale,
+            pnl_exit=(exit_value - entry_cost) * scale,
+            return_exit=exit_value / entry_cost - 1,
+            pnl_expiry=(expiry_value - entry_cost) * scale,
+            return_expiry=expiry_value / entry_cost - 1
+        ).dropna(subset=['spot_exit'])
+
+
+def _simulate_chunk(args):
+    events, closes, kwargs = args
+    return simulate(events, closes, **kwargs)
+
+
+def run_backtest(events: pd.DataFrame, closes: pd.DataFrame, workers: Optional[int] = None,
+                 chunk_size: int = CHUNK_SIZE, entry_iv: float = ENTRY_IV, exit_iv: float = EXIT_IV,
+                 **kwargs) -> pd.DataFrame:
+    """
+    Simulate every event, chunk_size events per task across a process pool.
+    closes is a date x ticker frame of daily closes (PriceHistoryStore.read_closes);
+    each task only receives the columns for its own tickers. entry_iv and
+    exit_iv are the volatilities legs are marked at on entry and exit.
+    """
+    kwargs = {**kwargs, 'entry_iv': entry_iv, 'exit_iv': exit_iv}
+    closes = closes.sort_index().ffill()
+    events = events.dropna(subset=['ticker', 'event_date']).reset_index(drop=True)
+    chunks = [events.iloc[i:i + chunk_size] for i in range(0, len(events), chunk_size)]
+    tasks = [
+        (chunk, closes[closes.columns.intersection(chunk['ticker'].unique())], kwargs)
+        for chunk in chunks
+    ]
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(tasks) <= 1:
+        results = [_simulate_chunk(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+            results = list(pool.map(_simulate_chunk, tasks))
+
+    return pd.concat(results, ignore_index=True) if results else simulate(events, closes, **kwargs)
+
+
+def summarize(results: pd.DataFrame, by: str) -> pd.DataFrame:
+    """Trade count, win rate and return / P&L distribution per group"""
+    if results.empty or 'pnl_exit' not in results:
+        # No event survived selection: simulate() returned the bare event columns
+        return pd.DataFrame(columns=SUMMARY_COLUMNS, index=pd.Index([], name=by))
+    grouped = results.assign(win=results['pnl_exit'] > 0).groupby(
+        results[by].fillna('Unknown'), sort=True
+    )
+    return pd.DataFrame({
+        'trades': grouped.size(),
+        'win_rate': grouped['win'].mean(),
+        'mean_return': grouped['return_exit'].mean(),
+        'median_return': grouped['return_exit'].median(),
+        'p05_return': grouped['return_exit'].quantile(0.05),
+        'p95_return': grouped['return_exit'].quantile(0.95),
+        'total_pnl_exit': grouped['pnl_exit'].sum(),
+        'total_pnl_expiry': grouped['pnl_expiry'].sum(),
+        'mean_abs_move': grouped['move'].apply(lambda moves: moves.abs().mean())
+    })
+
+
+def summarize_all(results: pd.DataFrame, dimensions: Sequence[str] = SUMMARY_DIMENSIONS) -> Dict[str, pd.DataFrame]:
+    return {dimension: summarize(results, dimension) for dimension in dimensions}
+
+
+def main():
+    import sys
+    import time
+    from config import dbConfig
+
+    # Optional: entry IV and exit IV, e.g. "0.8 0.45"
+    entry_iv, exit_iv = (float(sys.argv[1]), float(sys.argv[2])) if len(sys.argv) > 2 else (ENTRY_IV, EXIT_IV)
+
+    events = load_events(dbConfig)
+    closes = PriceHistoryStore().read_closes(events['ticker'].dropna())
+
+    start = time.perf_counter()
+    results = run_backtest(events, closes, entry_iv=entry_iv, exit_iv=exit_iv)
+    elapsed = time.perf_counter() - start
+
+    print(f"Simulated {len(results)} of {len(events)} events in {elapsed:.2f}s")
+    for dimension, summary in summarize_all(results).items():
+        print(f"\nBy {dimension}:")
+        print(summary.to_string(float_format=lambda x: f"{x:,.3f}"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+PDUFA Event Study
+Market-adjusted abnormal returns of every regulatory_decisions ticker
+around its decision date, computed for all events at once as an
+(events x event-day) NumPy array, and stored per drug/ticker in
+event_study_results.
+
+Day 0 is the first trading day on or after the decision date. Abnormal
+returns are the stock's daily return minus the benchmark's (XBI by
+default) on the same day. Daily bars come from the local price store,
+which is brought up to date in bulk before the study runs.
+"""
+import sys
+import warnings
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+import psycopg as ppg
+
+from data_inflows.price_history import PriceHistoryStore
+from utils.logger import get_logger
+
+logger = get_logger("analytics")
+
+BENCHMARK = "XBI"
+
+# Event window in trading days around day 0, and the pre-event window the
+# abnormal-return volatility is measured over (ending before the window)
+WINDOW = (-5, 5)
+ESTIMATION_DAYS = 60
+
+# Calendar days of bars read either side of the events
+READ_PADDING_DAYS = 120
+
+MOVE_QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+
+
+def load_pdufa_events(db_settings) -> pd.DataFrame:
+    """Past regulatory decisions with a ticker"""
+    conn = ppg.connect(dbname=db_settings.DB_NAME,
+                       user=db_settings.DB_USER,
+                       host=db_settings.DB_HOST,
+                       password=db_settings.DB_PASSWORD)
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT id, ticker, drug_name, date
+                FROM regulatory_decisions
+                WHERE date < CURRENT_DATE AND ticker IS NOT NULL
+                ORDER BY date
+                """
+            )
+            rows = cursor.fetchall()
+    finally:
+        conn.close()
+
+    events = pd.DataFrame(rows, columns=['regulatory_id', 'ticker', 'drug_name', 'event_date'])
+    events['event_date'] = pd.to_datetime(events['event_date'])
+    return events
+
+
+def _event_matrix(values: np.ndarray, day0: np.ndarray, columns: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    """values[day0 + offset, column] for every event and offset, NaN outside the data"""
+    rows = day0[:, None] + offsets[None, :]
+    valid = (rows >= 0) & (rows < len(values)) & (columns >= 0)[:, None]
+    matrix = values[rows.clip(0, len(values) - 1), columns.clip(0)[:, None]]
+    return np.where(valid, matrix, np.nan)
+
+
+def abnormal_returns(events: pd.DataFrame, closes: pd.DataFrame, benchmark: str = BENCHMARK,
+                     window: Tuple[int, int] = WINDOW) -> pd.DataFrame:
+    """Market-adjusted abnormal returns, one row per event, one column per event day"""
+    returns = closes.sort_index().pct_change(fill_method=None)
+    abnormal = returns.sub(returns[benchmark], axis=0)
+
+    dates = abnormal.index.to_numpy().astype('datetime64[D]')
+    day0 = np.searchsorted(dates, events['event_date'].to_numpy().astype('datetime64[D]'), side='left')
+    columns = abnormal.columns.get_indexer(events['ticker'])
+    offsets = np.arange(window[0], window[1] + 1)
+
+    matrix = _event_matrix(abnormal.to_numpy(dtype=float), day0, columns, offsets)
+    return pd.DataFrame(matrix, index=events.index, columns=pd.Index(offsets, name='event_day'))
+
+
+def _car(ar: pd.DataFrame, start: int, end: int) -> np.ndarray:
+    """Cumulative abnormal return over event days [start, end], NaN if any day is missing"""
+    return ar.loc[:, start:end].to_numpy().sum(axis=1)
+
+
+def event_study(events: pd.DataFrame, closes: pd.DataFrame, benchmark: str = BENCHMARK,
+                window: Tuple[int, int] = WINDOW, estimation_days: int = ESTIMATION_DAYS) -> pd.DataFrame:
+    """
+    Per-event abnormal-return summary: CAR(-1,+1), CAR(0,+1), CAR over the
+    whole window, pre-event abnormal volatility and the day 0-1 move in
+    units of that volatility, plus the daily abnormal returns themselves.
+    """
+    window = (min(window[0], -1), max(window[1], 1))
+    ar = abnormal_returns(events, closes, benchmark, window)
+    estimation = abnormal_returns(events, closes, benchmark, (window[0] - estimation_days, window[0] - 1))
+
+    with np.errstate(invalid='ignore', divide='ignore'), warnings.catch_warnings():
+        # Events without enough pre-event history get a NaN volatility
+        warnings.simplefilter('ignore', RuntimeWarning)
+        pre_event_vol = np.nanstd(estimation.to_numpy(), axis=1, ddof=1)
+        car_0_p1 = _car(ar, 0, 1)
+        results = events.assign(
+            benchmark=benchmark,
+            window_start=window[0],
+            window_end=window[1],
+            car_m1_p1=_car(ar, -1, 1),
+            car_0_p1=car_0_p1,
+            car_window=_car(ar, *window),
+            pre_event_vol=pre_event_vol,
+            move_zscore=car_0_p1 / (pre_event_vol * np.sqrt(2)),
+            abnormal_returns=list(ar.to_numpy())
+        )
+    return results
+
+
+def move_distribution(results: pd.DataFrame, columns: Sequence[str] = ('car_m1_p1', 'car_0_p1', 'car_window'),
+                      quantiles: Sequence[float] = MOVE_QUANTILES) -> pd.DataFrame:
+    """Quantiles of the absolute realized move per window across all events"""
+    moves = results[list(columns)].abs()
+    distribution = moves.quantile(list(quantiles)).T
+    distribution.columns = [f"p{int(q * 100):02d}" for q in quantiles]
+    distribution.insert(0, 'events', moves.notna().sum())
+    distribution.insert(1, 'mean', moves.mean())
+    return distribution
+
+
+def write_results_to_db(results: pd.DataFrame, db_settings):
+    """Upsert one row per regulatory decision into event_study_results"""
+    conn = ppg.connect(dbname=db_settings.DB_NAME,
+                       user=db_settings.DB_USER,
+                       host=db_settings.DB_HOST,
+                       password=db_settings.DB_PASSWORD)
+    rows = [
+        (int(row.regulatory_id), row.ticker, row.drug_name, row.event_date.date(), row.benchmark,
+         int(row.window_start), int(row.window_end),
+         *(None if pd.isna(value) else float(value)
+           for value in (row.car_m1_p1, row.car_0_p1, row.car_window, row.pre_event_vol, row.move_zscore)),
+         [None if np.isnan(value) else float(value) for value in row.abnormal_returns])
+        for row in results.itertuples(index=False)
+    ]
+    try:
+        with conn.cursor() as cursor:
+            cursor.executemany(
+                """
+                INSERT INTO event_study_results (regulatory_id, ticker, drug_name, event_date, benchmark,
+                                                 window_start, window_end, car_m1_p1, car_0_p1, car_window,
+                                                 pre_event_vol, move_zscore, abnormal_returns)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                ON CONFLICT (regulatory_id) DO UPDATE SET
+                    ticker = EXCLUDED.ticker,
+                    drug_name = EXCLUDED.drug_name,
+                    event_date = EXCLUDED.event_date,
+                    benchmark = EXCLUDED.benchmark,
+                    window_start = EXCLUDED.window_start,
+                    window_end = EXCLUDED.window_end,
+                    car_m1_p1 = EXCLUDED.car_m1_p1,
+                    car_0_p1 = EXCLUDED.car_0_p1,
+                    car_window = EXCLUDED.car_window,
+                    pre_event_vol = EXCLUDED.pre_event_vol,
+                    move_zscore = EXCLUDED.move_zscore,
+                    abnormal_returns = EXCLUDED.abnormal_returns,
+                    updated_at = now()
+                """,
+                rows
+            )
+        conn.commit()
+        logger.info(f"Wrote {len(rows)} event study results to DB", rows=len(rows))
+    except Exception as e:
+        logger.error(f"Error writing event study results to DB: {e}")
+        conn.rollback()
+    finally:
+        conn.close()
+
+
+def run_event_study(db_settings, benchmark: str = BENCHMARK, window: Tuple[int, int] = WINDOW,
+                    store: Optional[PriceHistoryStore] = None) -> pd.DataFrame:
+    """Load past decisions, bring their bars up to date in the store, compute and store the study"""
+    events = load_pdufa_events(db_settings)
+    if events.empty:
+        logger.info("No past regulatory decisions to study")
+        return events
+
+    store = store or PriceHistoryStore()
+    tickers = list(events['ticker'].unique()) + [benchmark]
+    store.update(tickers, '1d')
+    padding = pd.Timedelta(days=READ_PADDING_DAYS)
+    closes = store.read_closes(tickers, events['event_date'].min() - padding, events['event_date'].max() + padding)
+    if benchmark not in closes.columns:
+        # read_closes leaves out tickers without bars, e.g. when the benchmark update failed
+        logger.error(f"No {benchmark} bars in the price store for the event dates; cannot compute abnormal returns. "
+                     f"Check that update_prices can fetch {benchmark}.", benchmark=benchmark)
+        return events.iloc[0:0]
+    results = event_study(events, closes, benchmark, window)
+
+    logger.info(f"Event study over {len(results)} decisions ({results['car_0_p1'].notna().sum()} with full day 0-1 data)")
+    logger.info("Move distribution:\n" + move_distribution(results).to_string(float_format=lambda x: f"{x:.3f}"))
+    write_results_to_db(results, db_settings)
+    return results
+
+
+def main():
+    from config import dbConfig
+
+    window = (int(sys.argv[1]), int(sys.argv[2])) if len(sys.argv) > 2 else WINDOW
+    run_event_study(dbConfig, window=window)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Implied Volatility and Greeks
+NumPy-vectorized Black-Scholes-Merton pricing, implied volatility and greeks
+for whole books of option contracts at once.
+
+Contracts are priced as European options on a stock with a continuous
+dividend yield. For the calls this strategy buys on non-dividend payers that
+equals the American value; for puts the early-exercise premium is ignored,
+which slightly understates IV on deep in-the-money puts.
+"""
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+RISK_FREE_RATE = 0.045
+DAYS_PER_YEAR = 365.0
+CONTRACT_MULTIPLIER = 100
+
+# Implied volatility search bounds and solver settings
+MIN_VOL = 1e-4
+MAX_VOL = 5.0
+IV_TOLERANCE = 1e-6
+IV_MAX_ITERATIONS = 100
+
+
+def _erf(x: np.ndarray) -> np.ndarray:
+    """Abramowitz-Stegun 7.1.26 error function (max abs error 1.5e-7)"""
+    sign = np.sign(x)
+    x = np.abs(x)
+    t = 1.0 / (1.0 + 0.3275911 * x)
+    poly = t * (0.254829592 + t * (-0.284496736 + t * (1.421413741 + t * (-1.453152027 + t * 1.061405429))))
+    return sign * (1.0 - poly * np.exp(-x * x))
+
+
+def norm_cdf(x: np.ndarray) -> np.ndarray:
+    return 0.5 * (1.0 + _erf(x / np.sqrt(2.0)))
+
+
+def norm_pdf(x: np.ndarray) -> np.ndarray:
+    return np.exp(-0.5 * x * x) / np.sqrt(2.0 * np.pi)
+
+
+def _d1_d2(S, K, T, r, sigma, q):
+    sqrt_t = np.sqrt(T)
+    d1 = (np.log(S / K) + (r - q + 0.5 * sigma ** 2) * T) / (sigma * sqrt_t)
+    return d1, d1 - sigma * sqrt_t
+
+
+def black_scholes_price(S, K, T, sigma, is_call, r: float = RISK_FREE_RATE, q: float = 0.0) -> np.ndarray:
+    """Option value for arrays of underlying price, strike, years to expiry and volatility"""
+    S, K, T, sigma, is_call = np.broadcast_arrays(*(np.asarray(a, dtype=float) for a in (S, K, T, sigma)),
+                                                  np.asarray(is_call, dtype=bool))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        d1, d2 = _d1_d2(S, K, T, r, sigma, q)
+        discounted_s = S * np.exp(-q * T)
+        discounted_k = K * np.exp(-r * T)
+        call = discounted_s * norm_cdf(d1) - discounted_k * norm_cdf(d2)
+        put = discounted_k * norm_cdf(-d2) - discounted_s * norm_cdf(-d1)
+    price = np.where(is_call, call, put)
+    # At or past expiry the option is worth its intrinsic value
+    intrinsic = np.where(is_call, np.maximum(S - K, 0.0), np.maximum(K - S, 0.0))
+    return np.where(T > 0, price, intrinsic)
+
+
+def implied_volatility(price, S, K, T, is_call, r: float = RISK_FREE_RATE, q: float = 0.0) -> np.ndarray:
+    """
+    Solve Black-Scholes implied volatility for every contract at once.
+    Newton steps are taken where they stay inside a per-contract bracket,
+    bisection otherwise, so every contract converges. Prices outside the
+    no-arbitrage bounds (or expired contracts) return NaN.
+    """
+    price, S, K, T, is_call = np.broadcast_arrays(*(np.asarray(a, dtype=float) for a in (price, S, K, T)),
+                                                  np.asarray(is_call, dtype=bool))
+    shape = price.shape
+    price, S, K, T, is_call = (a.ravel() for a in (price, S, K, T, is_call))
+
+    discounted_s = S * np.exp(-q * T)
+    discounted_k = K * np.exp(-r * T)
+    lower = np.where(is_call, np.maximum(discounted_s - discounted_k, 0.0), np.maximum(discounted_k - discounted_s, 0.0))
+    upper = np.where(is_call, discounted_s, discounted_k)
+    valid = np.isfinite(price) & (T > 0) & (S > 0) & (K > 0) & (price > lower) & (price < upper)
+
+    lo = np.full(price.shape, MIN_VOL)
+    hi = np.full(price.shape, MAX_VOL)
+    # Brenner-Subrahmanyam starting point, clipped into the bracket
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sigma = np.sqrt(2.0 * np.pi / T) * price / S
+    sigma = np.clip(np.nan_to_num(sigma, nan=0.5), 0.05, 2.0)
+
+    active = valid.copy()
+    for _ in range(IV_MAX_ITERATIONS):
+        if not active.any():
+            break
+        idx = np.nonzero(active)[0]
+        s_, k_, t_, c_, p_, v_ = (a[idx] for a in (S, K, T, is_call, price, sigma))
+
+        diff = black_scholes_price(s_, k_, t_, v_, c_, r, q) - p_
+        vega_ = _vega(s_, k_, t_, v_, r, q)
+
+        # Price is increasing in volatility, so the sign of diff moves the bracket
+        lo_, hi_ = lo[idx], hi[idx]
+        lo_ = np.where(diff < 0, v_, lo_)
+        hi_ = np.where(diff > 0, v_, hi_)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            newton = v_ - diff / vega_
+        use_newton = np.isfinite(newton) & (newton > lo_) & (newton < hi_)
+        new_sigma = np.where(use_newton, newton, 0.5 * (lo_ + hi_))
+
+        done = (np.abs(diff) < IV_TOLERANCE) | (hi_ - lo_ < IV_TOLERANCE)
+        new_sigma = np.where(done, v_, new_sigma)
+
+        lo[idx] = lo_
+        hi[idx] = hi_
+        sigma[idx] = new_sigma
+        active[idx[done]] = False
+
+    return np.where(valid, sigma, np.nan).reshape(shape)
+
+
+def _vega(S, K, T, sigma, r, q):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        d1, _ = _d1_d2(S, K, T, r, sigma, q)
+        return S * np.exp(-q * T) * norm_pdf(d1) * np.sqrt(T)
+
+
+def greeks(S, K, T, sigma, is_call, r: float = RISK_FREE_RATE, q: float = 0.0) -> Dict[str, np.ndarray]:
+    """
+    Per-contract (one share of underlying) greeks.
+    vega is per 1 volatility point and theta per calendar day.
+    """
+    S, K, T, sigma = np.broadcast_arrays(*(np.asarray(a, dtype=float) for a in (S, K, T, sigma)))
+    is_call = np.broadcast_to(np.asarray(is_call, dtype=bool), S.shape)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        d1, d2 = _d1_d2(S, K, T, r, sigma, q)
+        sqrt_t = np.sqrt(T)
+        div_disc = np.exp(-q * T)
+        rate_disc = np.exp(-r * T)
+        pdf_d1 = norm_pdf(d1)
+
+        delta = np.where(is_call, div_disc * norm_cdf(d1), div_disc * (norm_cdf(d1) - 1.0))
+        gamma = div_disc * pdf_d1 / (S * sigma * sqrt_t)
+        vega = S * div_disc * pdf_d1 * sqrt_t / 100.0
+        common = -S * div_disc * pdf_d1 * sigma / (2.0 * sqrt_t)
+        call_theta = common - r * K * rate_disc * norm_cdf(d2) + q * S * div_disc * norm_cdf(d1)
+        put_theta = common + r * K * rate_disc * norm_cdf(-d2) - q * S * div_disc * norm_cdf(-d1)
+        theta = np.where(is_call, call_theta, put_theta) / DAYS_PER_YEAR
+
+    return {'delta': delta, 'gamma': gamma, 'vega': vega, 'theta': theta}
+
+
+def compute_position_greeks(positions: pd.DataFrame, r: float = RISK_FREE_RATE) -> pd.DataFrame:
+    """
+    Add implied vol and greeks to a frame of option positions.
+    Expects columns strike, option_type ('CALL'/'PUT'), days_to_expiration,
+    option_price (mid), underlying_price and qty. Adds iv, the per-contract
+    greeks and position-level dollar greeks (scaled by qty x 100):
+    position_delta, position_gamma, position_vega and position_theta.
+    """
+    frame = positions.copy()
+    S = frame['underlying_price'].to_numpy(dtype=float)
+    K = frame['strike'].to_numpy(dtype=float)
+    T = frame['days_to_expiration'].to_numpy(dtype=float, na_value=np.nan) / DAYS_PER_YEAR
+    is_call = (frame['option_type'].astype(str) == 'CALL').to_numpy()
+    price = frame['option_price'].to_numpy(dtype=float)
+
+    frame['iv'] = implied_volatility(price, S, K, T, is_call, r)
+    contract_greeks = greeks(S, K, T, frame['iv'].to_numpy(), is_call, r)
+
+    scale = frame['qty'].to_numpy(dtype=float) * CONTRACT_MULTIPLIER
+    for name, values in contract_greeks.items():
+        frame[name] = values
+        frame[f'position_{name}'] = values * scale
+    return frame
+
+
+POSITION_GREEKS = ['position_delta', 'position_gamma', 'position_vega', 'position_theta']
+
+
+def aggregate_greeks(positions: pd.DataFrame, by: Optional[Sequence[str]] = None) -> pd.DataFrame:
+    """Sum position greeks for the whole book, or per group (e.g. per linked event)"""
+    if by is None:
+        return positions[POSITION_GREEKS].sum(min_count=1).to_frame().T
+    return positions.groupby(list(by), dropna=False, observed=True)[POSITION_GREEKS].sum(min_count=1).reset_index()
+
+
+def main():
+    import time
+
+    n = 500
+    rng = np.random.default_rng(0)
+    S = rng.uniform(5, 200, n)
+    K = S * rng.uniform(0.8, 1.2, n)
+    T = rng.integers(1, 120, n) / DAYS_PER_YEAR
+    is_call = rng.integers(0, 2, n).astype(bool)
+    true_vol = rng.uniform(0.2, 2.0, n)
+    price = black_scholes_price(S, K, T, true_vol, is_call)
+
+    start = time.perf_counter()
+    solved = implied_volatility(price, S, K, T, is_call)
+    greeks(S, K, T, solved, is_call)
+    elapsed = time.perf_counter() - start
+
+    # Compare repriced values: vol is unidentifiable where the price is ~0
+    error = np.nanmax(np.abs(black_scholes_price(S, K, T, solved, is_call) - price))
+    print(f"Solved IV and greeks for {n} contracts in {elapsed * 1000:.1f} ms (max repricing error {error:.2e})")
+
+
+if __name__ == "__main__":
+    main()
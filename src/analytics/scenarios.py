@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Straddle Scenarios
+Mark-to-model P&L for groups of option legs (each event's call + put) and
+for the whole book over a grid of underlying moves x days forward.
+
+The grid is evaluated in one NumPy broadcast over (leg, day, move) and
+memoized per position set, so re-rendering an unchanged book is free.
+"""
+from functools import lru_cache
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .greeks import CONTRACT_MULTIPLIER, DAYS_PER_YEAR, RISK_FREE_RATE, black_scholes_price
+
+DEFAULT_MOVES = np.round(np.linspace(-0.6, 0.6, 49), 4)
+DEFAULT_DAYS_FORWARD = (0, 7, 14, 30)
+
+# Columns a book frame must carry for scenario evaluation
+LEG_COLUMNS = ['strike', 'option_type', 'days_to_expiration', 'qty', 'avg_entry_price', 'underlying_price', 'iv']
+
+# Legs without a solved IV are marked with this volatility
+FALLBACK_IV = 0.6
+
+
+def _leg_key(legs: pd.DataFrame) -> Tuple[tuple, ...]:
+    frame = legs[LEG_COLUMNS].astype({'option_type': str})
+    frame = frame.assign(
+        days_to_expiration=frame['days_to_expiration'].astype(float),
+        iv=frame['iv'].astype(float).fillna(FALLBACK_IV)
+    )
+    return tuple(frame.itertuples(index=False, name=None))
+
+
+@lru_cache(maxsize=64)
+def _pnl_cube(legs: Tuple[tuple, ...], moves: Tuple[float, ...], days_forward: Tuple[int, ...], r: float) -> np.ndarray:
+    """P&L per leg, day and move; shape (legs, days, moves)"""
+    strike, option_type, dte, qty, entry, spot, iv = (np.array(column) for column in zip(*legs))
+    is_call = option_type == 'CALL'
+    moves = np.asarray(moves, dtype=float)
+    days = np.asarray(days_forward, dtype=float)
+
+    # Broadcast legs on axis 0, days on axis 1, moves on axis 2
+    S = spot.astype(float)[:, None, None] * (1.0 + moves[None, None, :])
+    T = np.maximum(dte.astype(float)[:, None, None] - days[None, :, None], 0.0) / DAYS_PER_YEAR
+    value = black_scholes_price(S, strike.astype(float)[:, None, None], T, iv.astype(float)[:, None, None],
+                                is_call[:, None, None], r)
+    return (value - entry.astype(float)[:, None, None]) * (qty.astype(float) * CONTRACT_MULTIPLIER)[:, None, None]
+
+
+def scenario_grid(legs: pd.DataFrame, moves: Sequence[float] = DEFAULT_MOVES,
+                  days_forward: Sequence[int] = DEFAULT_DAYS_FORWARD, r: float = RISK_FREE_RATE) -> pd.DataFrame:
+    """
+    Combined P&L of the given legs as a days-forward x underlying-move grid.
+    Moves are fractional changes in each leg's own underlying, so a book
+    grid reads as "every name moves by x%".
+    """
+    grid = _pnl_cube(_leg_key(legs), tuple(moves), tuple(days_forward), r).sum(axis=0)
+    return pd.DataFrame(grid, index=pd.Index(days_forward, name='days_forward'),
+                        columns=pd.Index(moves, name='move'))
+
+
+def expiry_payoff(legs: pd.DataFrame, moves: Sequence[float] = DEFAULT_MOVES) -> pd.Series:
+    """Combined P&L of the legs if every leg is held to its expiration"""
+    expiry = int(legs['days_to_expiration'].astype(float).max())
+    return scenario_grid(legs, moves, (expiry,)).iloc[0]
+
+
+def group_scenarios(book: pd.DataFrame, by: str, moves: Sequence[float] = DEFAULT_MOVES,
+                    days_forward: Sequence[int] = DEFAULT_DAYS_FORWARD,
+                    r: float = RISK_FREE_RATE) -> Dict[str, pd.DataFrame]:
+    """Scenario grid per group of legs, e.g. per linked event's straddle"""
+    return {
+        group: scenario_grid(legs, moves, days_forward, r)
+        for group, legs in book.groupby(by, dropna=False, sort=True)
+    }
+
+
+def breakevens(payoff: pd.Series, spot: Optional[float] = None) -> list:
+    """Moves (or prices, given spot) where a payoff curve crosses zero"""
+    values = payoff.to_numpy()
+    moves = payoff.index.to_numpy(dtype=float)
+    crossings = np.nonzero(np.diff(np.sign(values)) != 0)[0]
+    points = [
+        moves[i] - values[i] * (moves[i + 1] - moves[i]) / (values[i + 1] - values[i])
+        for i in crossings
+    ]
+    return [spot * (1 + m) for m in points] if spot else points
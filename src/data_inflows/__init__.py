@@ -1,3 +1,5 @@
 from .clinical_trials import ClinicalTrialsAggregator
 from .pdufa_manager import PDUFAManager
-from .pdufa_scraper import PDUFAScraper, RegulatoryDecision
\ No newline at end of file
+from .pdufa_scraper import PDUFAScraper, RegulatoryDecision
+from .pdufa_sources import PDUFASource, PressReleaseFeedSource, SourceRunner
+from .price_history import PriceHistoryStore, update_company_prices
@@ -1,11 +1,14 @@
-import re
 import requests
-import json
 import pandas as pd
 from datetime import datetime, timedelta
 import psycopg as ppg
 
 import data_models.Study as Study
+from data_models import StudyBatch
+from utils.dates import normalize_date
+from utils.logger import get_logger
+
+logger = get_logger("data_inflows")
 
 # Constants
 BASE_URL = "https://clinicaltrials.gov/api/v2/studies"
@@ -45,12 +48,27 @@ class ClinicalTrialsAggregator:
     def fetch_companies_from_db(self):
         """Fetch companies from the database."""
         self.cursor.execute("SELECT ticker, clinical_trials_search_phrases FROM companies WHERE alpaca_tradable = TRUE")
-        rows = self.cursor.fetchall()
-        companies_list = []
-        for row in rows:
-            search_phrases = row[1].replace('"', "").replace("{", "").replace("}", "").split(",")
-            companies_list.append((row[0], search_phrases))
-        return companies_list
+        # clinical_trials_search_phrases is text[], psycopg hands it back as a list
+        return [(row[0], row[1] or []) for row in self.cursor.fetchall()]
+
+    def find_tickers_by_sponsors(self, sponsor_names):
+        """
+        Reverse lookup of a ticker for each sponsor name that appears in some
+        company's search phrases, in one query for the whole list.
+        """
+        sponsor_names = list(set(sponsor_names))
+        if not sponsor_names:
+            return {}
+        self.cursor.execute(
+            """
+            SELECT DISTINCT ON (sponsor) sponsor, c.ticker
+            FROM unnest(%s::text[]) AS sponsor
+            JOIN companies c ON c.clinical_trials_search_phrases @> ARRAY[sponsor]
+            ORDER BY sponsor, c.ticker
+            """,
+            (sponsor_names,)
+        )
+        return dict(self.cursor.fetchall())
 
     def parse_study(self, study):
         """Parse a single study entry into a Study object."""
@@ -68,46 +86,46 @@ class ClinicalTrialsAggregator:
         phase = phases[0] if phases else ""
         pcd_str = status.get("primaryCompletionDateStruct", {}).get("date", "")
         
-        year_month_regex = r"^\d{4}-\d{2}$"
-        if re.match(year_month_regex, pcd_str):
-            pcd_str += "-01"
-        if not phase or not pcd_str:
+        # YYYY-MM completion dates come back as the 1st with month precision
+        pcd = normalize_date(pcd_str)
+        if not phase or not pcd:
             return None
-        
-        date = self.parse_date(pcd_str)
 
         study = Study(
             nctid = nctID,
             title = idmod.get("briefTitle", ""),
             phase = phase,
-            pcd = date,
+            pcd = pcd.start,
             primary_sponsor=lead_sponsor.get("name", ""),
-            conditions=", ".join(cond_mod.get("conditions", []))
+            conditions=", ".join(cond_mod.get("conditions", [])),
+            pcd_precision=pcd.precision
         )
         return study
 
     def parse_date(self, date_str):
-        """Parse dates from API (ISO 8601 or fallback)."""
-        try:
-            return datetime.fromisoformat(date_str.split("T")[0])
-        except Exception:
-            return None
+        """Parse dates from API (ISO 8601, YYYY-MM or calendar text)."""
+        parsed = normalize_date(date_str)
+        return parsed.start if parsed else None
 
 
-    def write_to_db(self, study):
-        """Write a Study object to the database."""
+    def write_batch_to_db(self, studies: StudyBatch):
+        """Write a batch of studies in one statement, binding each column as an array."""
+        if not len(studies):
+            return
         try:
-            self.cursor.execute(
-                """
-                INSERT INTO clinical_trials (nctid, title, phase, pcd, primary_sponsor, primary_sponsor_ticker, conditions, traded)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %b)
-                ON CONFLICT (nctid) DO NOTHING
-                """,
-                (study.nctid, study.title, study.phase, study.pcd, study.primary_sponsor, study.primary_sponsor_ticker, study.conditions, False)
-            )
-            self.conn.commit()
+            with logger.span("db.clinical_trials.write", studies=len(studies)):
+                self.cursor.execute(
+                    """
+                    INSERT INTO clinical_trials (nctid, title, phase, pcd, primary_sponsor, primary_sponsor_ticker, conditions, pcd_precision)
+                    SELECT * FROM unnest(%s::text[], %s::text[], %s::text[], %s::date[], %s::text[], %s::text[], %s::text[], %s::text[])
+                    ON CONFLICT (nctid) DO NOTHING
+                    """,
+                    tuple(studies.column(name) for name in
+                          ('nctid', 'title', 'phase', 'pcd', 'primary_sponsor', 'primary_sponsor_ticker', 'conditions', 'pcd_precision'))
+                )
+                self.conn.commit()
         except Exception as e:
-            print(f"Error writing to DB: {e}")
+            logger.error(f"Error writing {len(studies)} studies to DB: {e}")
             self.conn.rollback()
         
 
@@ -116,51 +134,59 @@ class ClinicalTrialsAggregator:
         """Fetch Phase 2/3 trials with primary completion dates in next X days using V2 API."""
         companies = self.fetch_companies_from_db()
         
+        logger.info(f"Fetching trials for {len(companies)} companies")
         for company in companies:
             ticker = company[0]
+            with logger.context(ticker=ticker):
+                self._fetch_company_trials(ticker, company[1])
+
+    def _fetch_company_trials(self, ticker, search_phrases):
+        """Page through ClinicalTrials.gov for one company's sponsor names."""
+        for search_phrase in search_phrases:
+            params = {
+                'format': 'json',
+                'filter.overallStatus': 'RECRUITING,ACTIVE_NOT_RECRUITING',
+                'filter.advanced': 'AREA[Phase]PHASE3,AREA[LeadSponsorClass]INDUSTRY,AREA[LeadSponsorName]{}'.format(search_phrase),
+                'fields': ','.join(FIELDS)
+            }
             continue_querying = True
-            for search_phrase in company[1]:
-                params = {
-                    'format': 'json',
-                    'filter.overallStatus': 'RECRUITING,ACTIVE_NOT_RECRUITING',
-                    'filter.advanced': 'AREA[Phase]PHASE3,AREA[LeadSponsorClass]INDUSTRY,AREA[LeadSponsorName]{}'.format(search_phrase),
-                    'fields': ','.join(FIELDS)
-                }
-                continue_querying = True
-                page_token = None
-                while True:
-                    if page_token:
-                        params["pageToken"] = page_token
-                    
-                    try:
+            page_token = None
+            while True:
+                if page_token:
+                    params["pageToken"] = page_token
+                
+                try:
+                    with logger.span("clinicaltrials.page", search_phrase=search_phrase):
                         response = requests.get(BASE_URL, params=params)
-                        with open('../data/studies.json', 'w') as f:
-                            json.dump(response.json(), f, indent=2) # indent=2 specifies 2 spaces for indentation
-                        data = response.json()
-                        response.raise_for_status()
-                        
-                    except Exception as e:
-                        print(f"Error fetching trials for {ticker}: {e}")
-                        break
+                    data = response.json()
+                    response.raise_for_status()
                     
-                    # Process each study (updated for studies.json structure)
-                    if len(data.get("studies", [])) > 0:
-                        continue_querying = False
-                    for study in data["studies"]:
-                        study = self.parse_study(study)
-                        if not study:
-                            continue
-                        else:
-                            study.add_ticker(ticker)
-                        if study.phase not in ["PHASE2", "PHASE3", "PHASE2/PHASE3"]:
-                            continue
-                        
-                        if TODAY <= study.pcd:
-                            self.write_to_db(study)
+                except Exception as e:
+                    logger.error(f"Error fetching trials for {ticker}: {e}")
+                    break
+                
+                # Process each study (updated for studies.json structure)
+                logger.debug(f"Fetched {len(data.get('studies', []))} studies", search_phrase=search_phrase)
+                if len(data.get("studies", [])) > 0:
+                    continue_querying = False
+                upcoming = StudyBatch()
+                for study in data["studies"]:
+                    study = self.parse_study(study)
+                    if not study:
+                        continue
+                    else:
+                        study.add_ticker(ticker)
+                    if study.phase not in ["PHASE2", "PHASE3", "PHASE2/PHASE3"]:
+                        continue
                     
-                    # Check for next page
-                    page_token = data.get("nextPageToken")
-                    if not page_token:
-                        break
-                if not continue_querying:
+                    if TODAY <= study.pcd:
+                        upcoming.append(study)
+                # One write per page instead of one per study
+                self.write_batch_to_db(upcoming)
+                
+                # Check for next page
+                page_token = data.get("nextPageToken")
+                if not page_token:
                     break
+            if not continue_querying:
+                break
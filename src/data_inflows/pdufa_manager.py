@@ -1,44 +1,49 @@
-from typing import List
-import json
 from datetime import datetime
-from typing import List
+from functools import partial
+from typing import Iterator, List, Union
 
 import psycopg as ppg
+from psycopg.rows import class_row
 
 from .pdufa_scraper import PDUFAScraper
-from data_models import RegulatoryDecision
+from .pdufa_sources import load_press_release_feeds
+from data_models import RegulatoryDecision, RegulatoryDecisionBatch
+from utils.logger import get_logger
+
+logger = get_logger("data_inflows")
+
+OPENFDA_URL = "https://api.fda.gov/drug/drugsfda.json"
+# Pause between openFDA lookups
+OPENFDA_REQUEST_DELAY = 0.3
 
 
 class PDUFAManager:
     
     def __init__(self, db_settings):
-        self.scraper = PDUFAScraper()
         self.conn = ppg.connect(dbname=db_settings.DB_NAME,
                                 user=db_settings.DB_USER,
                                 host=db_settings.DB_HOST,
                                 password=db_settings.DB_PASSWORD)
         self.cursor = self.conn.cursor()
+        # The feeds are read from companies only once the press-release source is built
+        self.scraper = PDUFAScraper(feed_loader=partial(load_press_release_feeds, self.conn))
     
     def get_records(self):
-        print("Updating PDUFA data from web sources...")
+        logger.info("Updating PDUFA data from web sources...")
         records = self.scraper.run_full_scrape()
         return records
 
     
-    def sort_records(self, records):
+    def sort_records(self, records: RegulatoryDecisionBatch):
         today = datetime.now()
         
-        previous_decisions = []
-        impending_decisions = []
-        companies = set()
-        
-        for record in records:
-            if record.pdufa_date < today or record.status == "decided":
-                previous_decisions.append(record)
-            else:
-                impending_decisions.append(record)
-            companies.add(record.ticker_symbol)
-        
+        decided = [
+            pdufa_date < today or status == "decided"
+            for pdufa_date, status in zip(records.column('pdufa_date'), records.column('status'))
+        ]
+        previous_decisions = records.filter(decided)
+        impending_decisions = records.filter([not flag for flag in decided])
+        companies = set(records.column('ticker_symbol'))
         
         result = {
             'total_records': len(records),
@@ -50,129 +55,140 @@ class PDUFAManager:
         return result
     
     
-    def get_impending_decisions(self):
-        self.cursor.execute("SELECT * FROM regulatory_decisions WHERE status = 'pending'")
-        rows = self.cursor.fetchall()
-        records = []
-        for row in rows:
-            record = RegulatoryDecision(
-                company_name=row[1],
-                ticker_symbol=row[2],
-                drug_name=row[3],
-                pdufa_date=row[4],
-                decision=row[5],
-                description=row[6],
-                status=row[7]
+    def _query_decisions(self, where: str, params: tuple = ()) -> Iterator[RegulatoryDecision]:
+        """
+        Stream regulatory_decisions rows matching where as RegulatoryDecision objects.
+        Columns are aliased to the dataclass fields so class_row builds them directly.
+        """
+        with self.conn.cursor(row_factory=class_row(RegulatoryDecision)) as cursor:
+            yield from cursor.stream(
+                f"""
+                SELECT COALESCE(c.company_name, '') AS company_name,
+                       rd.ticker AS ticker_symbol,
+                       rd.drug_name,
+                       rd.date::timestamp AS pdufa_date,
+                       rd.decision,
+                       COALESCE(rd.description, '') AS description,
+                       rd.status,
+                       rd.useu AS "USEU",
+                       rd.date_precision
+                FROM regulatory_decisions rd
+                LEFT JOIN companies c ON c.ticker = rd.ticker
+                WHERE {where}
+                ORDER BY rd.date
+                """,
+                params
             )
-            records.append(record)
-        return records
+
+    def _decisions(self, where: str, params: tuple = (), stream: bool = False
+                   ) -> Union[List[RegulatoryDecision], Iterator[RegulatoryDecision]]:
+        """
+        A list, or with stream=True the row iterator itself. A stream holds the
+        connection until it is exhausted, so finish it before the next query.
+        """
+        rows = self._query_decisions(where, params)
+        return rows if stream else list(rows)
+
+    def get_impending_decisions(self, stream: bool = False):
+        return self._decisions("rd.status = 'pending'", stream=stream)
 
     
-    def get_previous_decisions(self):
-        self.cursor.execute("SELECT * FROM regulatory_decisions WHERE status != 'pending'")
-        rows = self.cursor.fetchall()
-        records = []
-        for row in rows:
-            record = RegulatoryDecision(
-                company_name=row[1],
-                ticker_symbol=row[2],
-                drug_name=row[3],
-                pdufa_date=row[4],
-                decision=row[5],
-                description=row[6],
-                status=row[7]
-            )
-            records.append(record)
-        return records
+    def get_previous_decisions(self, stream: bool = False):
+        return self._decisions("rd.status != 'pending'", stream=stream)
     
-    def get_upcoming_by_ticker(self, ticker: str):
-        impending = self.get_impending_decisions()
-        return [record for record in impending if record.get('ticker_symbol', '').upper() == ticker.upper()]
+    def get_upcoming_by_ticker(self, ticker: str, stream: bool = False):
+        # Tickers are stored upper-case; comparing the column as-is keeps the (ticker, date) index usable
+        return self._decisions("rd.ticker = %s AND rd.status = 'pending'", (ticker.upper(),), stream)
     
-    def get_decisions_by_date_range(self, start_date: str, end_date: str):
-        start = datetime.fromisoformat(start_date)
-        end = datetime.fromisoformat(end_date)
-        
-        all_records = self.get_impending_decisions() + self.get_previous_decisions()
-        filtered = []
-        
-        for record in all_records:
-            record_date = datetime.fromisoformat(record['pdufa_date'])
-            if start <= record_date <= end:
-                filtered.append(record)
-        
-        return sorted(filtered, key=lambda x: x['pdufa_date'])
+    def get_decisions_by_date_range(self, start_date, end_date, stream: bool = False):
+        """Decisions dated start_date..end_date inclusive (ISO strings or dates), ordered by date"""
+        start = datetime.fromisoformat(start_date) if isinstance(start_date, str) else start_date
+        end = datetime.fromisoformat(end_date) if isinstance(end_date, str) else end_date
+        return self._decisions("rd.date BETWEEN %s::date AND %s::date", (start, end), stream)
     
     
-    def write_records_to_db(self, records: List[RegulatoryDecision]):
-        for record in records:
-            self.cursor.execute(
-                """
-                INSERT INTO regulatory_decisions(useu, ticker, drug_name, date, status, decision)
-                VALUES (%s, %s, %s, %s, %s, %s)
-                ON CONFLICT (ticker, drug_name, date) DO NOTHING
-                """,
-                (record.USEU, record.ticker_symbol, record.drug_name, record.pdufa_date, record.status, record.decision)
-            )
+    def write_records_to_db(self, records: RegulatoryDecisionBatch):
+        """Insert the whole batch in one statement, binding each column as an array"""
+        if not len(records):
+            return
+        try:
+            with logger.span("db.regulatory_decisions.write", records=len(records)):
+                self.cursor.execute(
+                    """
+                    INSERT INTO regulatory_decisions(useu, ticker, drug_name, date, status, decision, date_precision,
+                                                     description)
+                    SELECT * FROM unnest(%s::text[], %s::text[], %s::text[], %s::date[], %s::text[], %s::text[], %s::text[],
+                                         %s::text[])
+                    ON CONFLICT (ticker, drug_name, date) DO NOTHING
+                    """,
+                    (records.column('USEU'), records.column('ticker_symbol'), records.column('drug_name'),
+                     records.column('pdufa_date'), records.column('status'), records.column('decision'),
+                     records.column('date_precision'), records.column('description'))
+                )
             self.conn.commit()
+            logger.info(f"Wrote {len(records)} PDUFA records to DB")
+        except Exception as e:
+            logger.error(f"Error writing {len(records)} PDUFA records to DB: {e}")
+            self.conn.rollback()
     
     def print_summary(self):
         impending = self.get_impending_decisions()
-        previous = self.get_previous_decisions()
+        # Only counted, so the rows are streamed rather than held
+        previous = sum(1 for _ in self.get_previous_decisions(stream=True))
         
-        print(f"\n=== PDUFA Data Summary ===")
-        print(f"Impending decisions: {len(impending)}")
-        print(f"Previous decisions: {len(previous)}")
+        logger.info("=== PDUFA Data Summary ===")
+        logger.info(f"Impending decisions: {len(impending)}")
+        logger.info(f"Previous decisions: {previous}")
         
         if impending:
-            print(f"\nNext 5 upcoming PDUFA dates:")
-            sorted_impending = sorted(impending, key=lambda x: x['pdufa_date'])[:5]
-            for record in sorted_impending:
-                print(f"  {record['pdufa_date']}: {record['ticker_symbol']} - {record['drug_name']}")
+            logger.info("Next 5 upcoming PDUFA dates:")
+            # Already in date order
+            for record in impending[:5]:
+                logger.info(f"  {record.pdufa_date:%Y-%m-%d}: {record.ticker_symbol} - {record.drug_name}")
 
-    def verify_decisions(self, records: List[RegulatoryDecision]) -> None:
+    def verify_decisions(self, records: RegulatoryDecisionBatch) -> None:
         """
         Check drug approval status against openFDA API.
         Updates record status to 'decided' and decision to 'Approved' if drug is found.
-        Modifies records in place.
+        Modifies the batch in place.
         """
         import requests
         from time import sleep
         
-        for record in records:
-            try:
-                # Search openFDA drug approvals API
-                url = "https://api.fda.gov/drug/drugsfda.json"
-                params = {
-                    'search': f'openfda.brand_name:"{record.drug_name}" OR openfda.generic_name:"{record.drug_name}"',
-                    'limit': 1
-                }
+        for index, (ticker, drug_name) in enumerate(zip(records.column('ticker_symbol'), records.column('drug_name'))):
+            with logger.context(ticker=ticker, drug=drug_name):
+                try:
+                    # Search openFDA drug approvals API
+                    params = {
+                        'search': f'openfda.brand_name:"{drug_name}" OR openfda.generic_name:"{drug_name}"',
+                        'limit': 1
+                    }
                 
-                response = requests.get(url, params=params)
+                    with logger.span("openfda.lookup"):
+                        response = requests.get(OPENFDA_URL, params=params)
                 
-                if response.status_code == 200:
-                    data = response.json()
+                    if response.status_code == 200:
+                        data = response.json()
                     
-                    if data.get('results') and len(data['results']) > 0:
-                        # Drug found in FDA approvals database
-                        print(f"Found approved drug: {record.drug_name}")
-                        record.status = "decided"
-                        record.decision = "Approved"
-                    else:
-                        print(f"Drug not found in FDA database: {record.drug_name}")
+                        if data.get('results') and len(data['results']) > 0:
+                            # Drug found in FDA approvals database
+                            logger.info(f"Found approved drug: {drug_name}")
+                            records.update(index, status="decided", decision="Approved")
+                        else:
+                            logger.debug(f"Drug not found in FDA database: {drug_name}")
                         
-                elif response.status_code == 404:
-                    # No results found
-                    print(f"No FDA approval found for: {record.drug_name}")
+                    elif response.status_code == 404:
+                        # No results found
+                        logger.debug(f"No FDA approval found for: {drug_name}")
                     
-                else:
-                    print(f"FDA API error for {record.drug_name}: {response.status_code}")
+                    else:
+                        logger.warning(f"FDA API error for {drug_name}: {response.status_code}")
                     
-            except Exception as e:
-                print(f"Error checking FDA status for {record.drug_name}: {e}")
+                except Exception as e:
+                    logger.error(f"Error checking FDA status for {drug_name}: {e}")
             
-            # Be respectful to the API
-            sleep(0.3)
+                # Be respectful to the API
+                sleep(OPENFDA_REQUEST_DELAY)
 
     def pull_records(self):
         records = self.get_records()
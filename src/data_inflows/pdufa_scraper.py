@@ -2,69 +2,273 @@ import requests
 from time import sleep
 from datetime import datetime, timedelta
 from bs4 import BeautifulSoup
+import hashlib
+import json
+import os
 import re
-from typing import Dict, List, Optional
+import tempfile
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import pyarrow as pa
+
+from data_models import RegulatoryDecision, RegulatoryDecisionBatch
+from utils.dates import ParsedDate, normalize_date
+from .pdufa_sources import (PRESS_RELEASE_FEEDS, SOURCE_STATUS_PATH, SOURCE_TIMEOUT, PDUFASource,
+                            PressReleaseFeedSource, SourceRunner)
+from utils.logger import get_logger
+
+logger = get_logger("data_inflows")
+
+RTT_CALENDAR_URL = "https://www.rttnews.com/corpinfo/fdacalendar.aspx"
+RTT_PAGES = 6
+# Pause between calendar pages (respectful scraping delay)
+RTT_REQUEST_DELAY = 0.2
+# Seconds before an RTT page request is abandoned
+RTT_REQUEST_TIMEOUT = 30
+# Slowest full calendar scrape; the source runner waits at least this long
+RTT_WORST_CASE = RTT_PAGES * (RTT_REQUEST_TIMEOUT + RTT_REQUEST_DELAY)
+
+# Previously parsed calendar pages, with the validators needed to re-check them
+RTT_PAGE_STORE_DIR = Path(__file__).resolve().parents[2] / "data" / "rtt_pages"
+# Bump when parsing changes so stored records are parsed again
+RTT_PARSER_VERSION = 1
+
+
+def _calendar_region(content: bytes) -> bytes:
+    """The calendar entries of a page (ads, timestamps and the rest of the page change every request)"""
+    start = content.find(b'data-th=')
+    if start == -1:
+        return content
+    end = content.find(b'</div>', content.rfind(b'data-th='))
+    return content[start:end if end != -1 else len(content)]
+
+
+class RTTPageStore:
+    """
+    Per-page store under data/rtt_pages: page_<n>.json holds the ETag,
+    Last-Modified and calendar-region hash of the last download, and
+    page_<n>.arrow the records parsed from it.
+    """
+
+    def __init__(self, root: Path = RTT_PAGE_STORE_DIR):
+        self.root = Path(root)
+
+    def load(self, page: int) -> Optional[dict]:
+        """Stored validators for the page, or None if there is nothing reusable"""
+        meta_path, records_path = self.root / f"page_{page}.json", self.root / f"page_{page}.arrow"
+        if not meta_path.exists() or not records_path.exists():
+            return None
+        meta = json.loads(meta_path.read_text())
+        return meta if meta.get('parser_version') == RTT_PARSER_VERSION else None
+
+    def records(self, page: int) -> RegulatoryDecisionBatch:
+        with pa.memory_map(str(self.root / f"page_{page}.arrow"), 'r') as source:
+            return RegulatoryDecisionBatch.from_arrow(pa.ipc.open_file(source).read_all())
+
+    def save(self, page: int, meta: dict, records: RegulatoryDecisionBatch):
+        """Write records, then the validators (each atomically), so a validator never points at missing records"""
+        self.root.mkdir(parents=True, exist_ok=True)
+        table = records.to_arrow()
+        self._replace(self.root / f"page_{page}.arrow", lambda sink: self._write_table(sink, table))
+        self.save_meta(page, meta)
+
+    def save_meta(self, page: int, meta: dict):
+        """Replace only the validators, for a page whose records are unchanged"""
+        meta = {**meta, 'parser_version': RTT_PARSER_VERSION}
+        self._replace(self.root / f"page_{page}.json", lambda sink: sink.write(json.dumps(meta).encode()))
+
+    @staticmethod
+    def _write_table(sink, table):
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+
+    def _replace(self, path: Path, write):
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as sink:
+                write(sink)
+            os.replace(tmp_path, path)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+
+
+class RTTCalendarSource(PDUFASource):
+    """The RTT News FDA calendar, scraped by PDUFAScraper; pages already scraped count if it runs late"""
+    name = "rtt"
+
+    def __init__(self, scraper: "PDUFAScraper"):
+        self.scraper = scraper
+        self.pages: List[RegulatoryDecisionBatch] = []
+
+    def fetch(self) -> RegulatoryDecisionBatch:
+        self.pages = []
+        return self.scraper.scrape_rtt_news_calendar(pages=self.pages)
+
+    def partial(self) -> Optional[RegulatoryDecisionBatch]:
+        records = RegulatoryDecisionBatch()
+        for page_records in list(self.pages):
+            records.extend(page_records)
+        return records
 
-from data_models import RegulatoryDecision
 
 class PDUFAScraper:
     
-    def __init__(self):
+    def __init__(self, page_store_dir: Optional[Path] = RTT_PAGE_STORE_DIR,
+                 sources: Optional[List[PDUFASource]] = None,
+                 source_status_path: Optional[Path] = SOURCE_STATUS_PATH,
+                 press_release_feeds: Optional[Dict[str, str]] = None,
+                 company_names: Optional[Dict[str, str]] = None,
+                 feed_loader: Optional[Callable[[], Tuple[Dict[str, str], Dict[str, str]]]] = None):
+        """
+        page_store_dir=None downloads and parses every page on every run.
+        sources replaces default_sources(); source_status_path=None keeps
+        source freshness in memory only. press_release_feeds (ticker -> RSS
+        URL) and company_names feed the press-release source; feed_loader
+        returns more of both (see pdufa_sources.load_press_release_feeds) and
+        is only called when the sources are built, on the first scrape.
+        """
+        self.press_release_feeds = {**PRESS_RELEASE_FEEDS, **(press_release_feeds or {})}
+        self.company_names = company_names or {}
+        self.feed_loader = feed_loader
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         })
+        self.page_store = RTTPageStore(page_store_dir) if page_store_dir else None
+        self.last_scrape_stats = {}
+        self.sources = sources
+        self.source_status_path = source_status_path
+        self._source_runner: Optional[SourceRunner] = None
+
+    @property
+    def source_runner(self) -> SourceRunner:
+        """Built on first use, so nothing is loaded for the sources until a scrape needs them"""
+        if self._source_runner is None:
+            self._source_runner = SourceRunner(self.sources if self.sources is not None else self.default_sources(),
+                                               timeout=max(SOURCE_TIMEOUT, RTT_WORST_CASE),
+                                               status_path=self.source_status_path)
+        return self._source_runner
+
+    def default_sources(self) -> List[PDUFASource]:
+        """In merge priority order"""
+        sources = [RTTCalendarSource(self)]
+        feeds, company_names = self.press_release_feeds, self.company_names
+        if self.feed_loader:
+            loaded_feeds, loaded_names = self.feed_loader()
+            logger.info(f"Press-release feeds: {len(loaded_feeds)} companies")
+            feeds, company_names = {**feeds, **loaded_feeds}, {**company_names, **loaded_names}
+        if feeds:
+            sources.append(PressReleaseFeedSource(feeds, company_names))
+        return sources
     
-    def scrape_rtt_news_calendar(self) -> List[RegulatoryDecision]:
-        records = []
-        for page in range(1, 7):
+    def scrape_rtt_news_calendar(self, pages: Optional[list] = None) -> RegulatoryDecisionBatch:
+        """All calendar pages; each page's records are also appended to pages as soon as it is done"""
+        records = RegulatoryDecisionBatch()
+        # bytes_saved: bodies not downloaded (304s); bytes_not_parsed: bodies downloaded
+        # but not parsed because their calendar entries were unchanged
+        stats = {'pages': RTT_PAGES, 'parsed': 0, 'not_modified': 0, 'unchanged': 0,
+                 'bytes_downloaded': 0, 'bytes_saved': 0, 'bytes_not_parsed': 0}
+        for page in range(1, RTT_PAGES + 1):
             try:
-                url = f"https://www.rttnews.com/corpinfo/fdacalendar.aspx?PageNum={page}"
-                response = self.session.get(url)
-                response.raise_for_status()
-                soup = BeautifulSoup(response.content, 'html.parser')
+                page_records = self._scrape_rtt_page(page, stats)
+                records.extend(page_records)
+                if pages is not None:
+                    pages.append(page_records)
+            except Exception as e:
+                logger.error(f"Error scraping RTT News: {e}", exc_info=True, page=page)
+            
+            sleep(RTT_REQUEST_DELAY)
+        
+        self.last_scrape_stats = stats
+        skipped = stats['not_modified'] + stats['unchanged']
+        logger.info(
+            f"RTT calendar: {stats['parsed']} pages parsed, {skipped} skipped "
+            f"({stats['not_modified']} not modified, {stats['unchanged']} unchanged), "
+            f"{stats['bytes_saved']} bytes not downloaded, {stats['bytes_not_parsed']} not parsed", **stats
+        )
+        return records
 
-                print(f"Response status: {response.status_code}")
-                print(f"Page title: {soup.title.string if soup.title else 'No title'}")
+    def _scrape_rtt_page(self, page: int, stats: dict) -> RegulatoryDecisionBatch:
+        """
+        One calendar page. With a stored copy the request is conditional: a 304
+        reuses the stored records without a body, and a body whose calendar
+        region hashes the same reuses them without parsing.
+        """
+        stored = self.page_store.load(page) if self.page_store else None
+        headers = {}
+        if stored and stored.get('etag'):
+            headers['If-None-Match'] = stored['etag']
+        if stored and stored.get('last_modified'):
+            headers['If-Modified-Since'] = stored['last_modified']
 
-                # RTT News changed their format - now uses text blocks instead of tables
-            
-                # Look for calendar data using data-th attributes
-                print("Searching for calendar entries using data-th attributes")
-                
-                # Find all divs with the specific data-th attributes
-                company_divs = soup.find_all('div', attrs={'data-th': 'Company Name'})
-                drug_divs = soup.find_all('div', attrs={'data-th': 'Drug'})
-                event_divs = soup.find_all('div', attrs={'data-th': 'Event'})
-                outcome_divs = soup.find_all('div', attrs={'data-th': 'Outcome'})
-                
-                
-                #print(f"Found {len(company_divs)} company entries, {len(drug_divs)} drug entries")
-                #print(f"Found {len(event_divs)} event entries, {len(outcome_divs)} outcome entries")
-                
-                # Group entries by row (assuming they appear in the same order)
-                min_length = min(len(company_divs), len(drug_divs), len(event_divs), len(outcome_divs))
-                
-                for i in range(min_length):
-                    try:
-                        record = self._parse_data_th_entry(
-                            company_divs[i], 
-                            drug_divs[i], 
-                            event_divs[i], 
-                            outcome_divs[i]
-                        )
-                        if record:
-                            records.append(record)
-                    except Exception as e:
-                        print(f"Error parsing entry {i}: {e}")
-                        continue
+        url = f"{RTT_CALENDAR_URL}?PageNum={page}"
+        with logger.span("rtt.page", page=page):
+            response = self.session.get(url, headers=headers, timeout=RTT_REQUEST_TIMEOUT)
+        logger.debug(f"Response status: {response.status_code}", page=page)
+
+        if response.status_code == 304 and stored:
+            stats['not_modified'] += 1
+            stats['bytes_saved'] += stored['content_length']
+            return self.page_store.records(page)
+        response.raise_for_status()
+        stats['bytes_downloaded'] += len(response.content)
+
+        content_hash = hashlib.sha256(_calendar_region(response.content)).hexdigest()
+        meta = {
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'content_hash': content_hash,
+            'content_length': len(response.content),
+        }
+        if stored and stored['content_hash'] == content_hash:
+            # Same entries: the stored records stand, only new validators are written
+            stats['unchanged'] += 1
+            stats['bytes_not_parsed'] += len(response.content)
+            if any(stored.get(key) != value for key, value in meta.items()):
+                self.page_store.save_meta(page, meta)
+            return self.page_store.records(page)
+
+        stats['parsed'] += 1
+        page_records = self._parse_calendar_page(response.content, page)
+        if self.page_store:
+            self.page_store.save(page, meta, page_records)
+        return page_records
 
+    def _parse_calendar_page(self, content: bytes, page: int) -> RegulatoryDecisionBatch:
+        records = RegulatoryDecisionBatch()
+        soup = BeautifulSoup(content, 'html.parser')
+
+        logger.debug(f"Page title: {soup.title.string if soup.title else 'No title'}", page=page)
+
+        # RTT News changed their format - now uses text blocks instead of tables
+    
+        # Look for calendar data using data-th attributes
+        logger.debug("Searching for calendar entries using data-th attributes", page=page)
+        
+        # Find all divs with the specific data-th attributes
+        company_divs = soup.find_all('div', attrs={'data-th': 'Company Name'})
+        drug_divs = soup.find_all('div', attrs={'data-th': 'Drug'})
+        event_divs = soup.find_all('div', attrs={'data-th': 'Event'})
+        outcome_divs = soup.find_all('div', attrs={'data-th': 'Outcome'})
+        
+        # Group entries by row (assuming they appear in the same order)
+        min_length = min(len(company_divs), len(drug_divs), len(event_divs), len(outcome_divs))
+        
+        for i in range(min_length):
+            try:
+                record = self._parse_data_th_entry(
+                    company_divs[i], 
+                    drug_divs[i], 
+                    event_divs[i], 
+                    outcome_divs[i]
+                )
+                if record:
+                    records.append(record)
             except Exception as e:
-                print(f"Error scraping RTT News: {e}")
-                import traceback
-                traceback.print_exc()
-            
-            sleep(0.2)  # Respectful scraping delay
+                logger.warning(f"Error parsing entry {i}: {e}", page=page)
+                continue
         
         return records
     
@@ -81,13 +285,13 @@ class PDUFAScraper:
             company_name, ticker = self._extract_company_and_ticker(company_text)
             
             # Parse date from event text (PDUFA dates are usually in the event description)
-            pdufa_date = self._parse_date(event_text)
-            if not pdufa_date:
+            parsed_date = self._parse_date(event_text)
+            if not parsed_date:
                 # Try parsing from outcome text as fallback
-                pdufa_date = self._parse_date(outcome_text)
+                parsed_date = self._parse_date(outcome_text)
             
-            if not pdufa_date:
-                print(f"No valid date found for {company_name} - {drug_name}")
+            if not parsed_date:
+                logger.warning(f"No valid date found for {company_name} - {drug_name}", ticker=ticker)
                 return None
             
             # Determine decision and status from outcome text
@@ -111,14 +315,16 @@ class PDUFAScraper:
                 company_name=company_name,
                 ticker_symbol=ticker,
                 drug_name=drug_name,
-                pdufa_date=pdufa_date,
+                # Approximate dates keep the mid-period anchor; precision says how exact it is
+                pdufa_date=parsed_date.mid,
                 decision=decision,
                 description=description,
-                status=status
+                status=status,
+                date_precision=parsed_date.precision
             )
             
         except Exception as e:
-            print(f"Error parsing data-th entry: {e}")
+            logger.warning(f"Error parsing data-th entry: {e}")
             return None
     
     def _extract_company_and_ticker(self, company_text: str) -> tuple:
@@ -137,96 +343,18 @@ class PDUFAScraper:
         
         return company_name, ticker
     
-    def _parse_date(self, date_text: str) -> Optional[datetime]:
-        date_text = date_text.strip()
-        
-        patterns = [
-            r'(\d{1,2})/(\d{1,2})/(\d{4})',
-            r'(\d{4})-(\d{1,2})-(\d{1,2})',
-            r'(\w+)\s+(\d{1,2}),?\s+(\d{4})',
-            r'Q(\d)\s+(\d{4})',
-            r'(\w+)\s+(\d{4})',
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, date_text)
-            if match:
-                try:
-                    if 'Q' in pattern:
-                        quarter = int(match.group(1))
-                        year = int(match.group(2))
-                        month = (quarter - 1) * 3 + 2
-                        return datetime(year, month, 15)
-                    elif len(match.groups()) == 2:
-                        month_name = match.group(1)
-                        year = int(match.group(2))
-                        month_num = self._month_name_to_number(month_name)
-                        if month_num:
-                            return datetime(year, month_num, 15)
-                    elif len(match.groups()) == 3:
-                        if match.group(1).isdigit():
-                            month = int(match.group(1))
-                            day = int(match.group(2))
-                            year = int(match.group(3))
-                            return datetime(year, month, day)
-                        else:
-                            month_name = match.group(1)
-                            day = int(match.group(2))
-                            year = int(match.group(3))
-                            month_num = self._month_name_to_number(month_name)
-                            if month_num:
-                                return datetime(year, month_num, day)
-                except ValueError:
-                    continue
-        
-        return None
+    def _parse_date(self, date_text: str) -> Optional[ParsedDate]:
+        return normalize_date(date_text.strip())
     
-    def _month_name_to_number(self, month_name: str) -> Optional[int]:
-        months = {
-            'january': 1, 'february': 2, 'march': 3, 'april': 4,
-            'may': 5, 'june': 6, 'july': 7, 'august': 8,
-            'september': 9, 'october': 10, 'november': 11, 'december': 12,
-            'jan': 1, 'feb': 2, 'mar': 3, 'apr': 4, 'may': 5, 'jun': 6,
-            'jul': 7, 'aug': 8, 'sep': 9, 'oct': 10, 'nov': 11, 'dec': 12
-        }
-        return months.get(month_name.lower())
-    
-    def scrape_multiple_sources(self) -> List[RegulatoryDecision]:
-        all_records = []
-        
-        rtt_records = self.scrape_rtt_news_calendar()
-        all_records.extend(rtt_records)
-        
-        return self._deduplicate_records(all_records)
-    
-    def _deduplicate_records(self, records: List[RegulatoryDecision]) -> List[RegulatoryDecision]:
-        seen = set()
-        unique_records = []
-        
-        for record in records:
-            key = (record.ticker_symbol, record.drug_name, record.pdufa_date.strftime('%Y-%m-%d'))
-            if key not in seen:
-                seen.add(key)
-                unique_records.append(record)
-        
-        return unique_records
-    
-    def _record_to_dict(self, record: RegulatoryDecision) -> Dict:
-        return {
-            'company_name': record.company_name,
-            'ticker_symbol': record.ticker_symbol,
-            'drug_name': record.drug_name,
-            'pdufa_date': record.pdufa_date.isoformat(),
-            'decision': record.decision,
-            'description': record.description,
-            'status': record.status
-        }
+    def scrape_multiple_sources(self) -> RegulatoryDecisionBatch:
+        """Every source concurrently, merged and de-duplicated per event (see pdufa_sources.merge_batches)"""
+        return self.source_runner.run()
     
-    def run_full_scrape(self) -> Dict[str, int]:
-        print("Starting PDUFA data scraping...")
+    def run_full_scrape(self) -> RegulatoryDecisionBatch:
+        logger.info("Starting PDUFA data scraping...")
         
         records = self.scrape_multiple_sources()
-        print(f"Scraped {len(records)} unique PDUFA records")
+        logger.info(f"Scraped {len(records)} unique PDUFA records")
         
         return records
 
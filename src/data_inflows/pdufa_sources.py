@@ -0,0 +1,295 @@
+"""
+PDUFA Sources
+Plugin interface for the places PDUFA dates are scraped from, and the
+runner that fetches every source concurrently and merges the results.
+
+A source subclasses PDUFASource, sets a unique name and implements fetch()
+returning a RegulatoryDecisionBatch. Sources run on their own threads with
+a shared deadline: a source that fails is reported and left out of the
+merge, and one still running at the deadline contributes whatever partial()
+has gathered so far, so the scrape takes at most the deadline. Per-source latency and the time of the
+last successful fetch (freshness) are kept in data/pdufa_sources.json.
+
+Sources: the RTT News calendar (pdufa_scraper.RTTCalendarSource) and
+company press-release feeds (companies.press_release_feed, read by
+load_press_release_feeds, plus any in PRESS_RELEASE_FEEDS). Adding one means
+a PDUFASource subclass and an entry in PDUFAScraper.default_sources.
+"""
+import json
+import re
+import threading
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from functools import partial
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from data_models import RegulatoryDecision, RegulatoryDecisionBatch
+from utils.dates import DAY, HALF, MONTH, QUARTER, normalize_date, period_bounds
+from utils.logger import get_logger
+
+logger = get_logger("data_inflows")
+
+SOURCE_STATUS_PATH = Path(__file__).resolve().parents[2] / "data" / "pdufa_sources.json"
+# Seconds the runner waits for all sources together
+SOURCE_TIMEOUT = 60.0
+
+# Extra press-release RSS feeds (ticker -> URL) on top of companies.press_release_feed
+PRESS_RELEASE_FEEDS: Dict[str, str] = {}
+# Feeds read at once, and seconds before one is abandoned
+FEED_WORKERS = 8
+FEED_TIMEOUT = 20
+
+
+class PDUFASource:
+    """Base class for PDUFA sources; earlier sources win when records collide in the merge"""
+    name = "source"
+
+    def fetch(self) -> RegulatoryDecisionBatch:
+        raise NotImplementedError
+
+    def partial(self) -> Optional[RegulatoryDecisionBatch]:
+        """Records fetched so far, used if the source misses the deadline (None: nothing usable)"""
+        return None
+
+
+class PressReleaseFeedSource(PDUFASource):
+    """
+    Company press-release RSS feeds. Items that mention a PDUFA / target
+    action date become pending decisions for the feed's ticker; the drug is
+    the first capitalised word after "for" in the title, if any.
+    """
+    name = "press_releases"
+
+    def __init__(self, feeds: Dict[str, str], company_names: Optional[Dict[str, str]] = None):
+        """feeds: ticker -> RSS URL"""
+        self.feeds = {ticker.upper(): url for ticker, url in feeds.items()}
+        self.company_names = {ticker.upper(): name for ticker, name in (company_names or {}).items()}
+
+    def fetch(self) -> RegulatoryDecisionBatch:
+        # Feeds live on different company sites, so they are read in parallel too. One
+        # session keeps connections alive to hosts serving several feeds, with a pool
+        # large enough for every worker
+        records = RegulatoryDecisionBatch()
+        with requests.Session() as session:
+            adapter = HTTPAdapter(pool_connections=FEED_WORKERS, pool_maxsize=FEED_WORKERS)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            with ThreadPoolExecutor(max_workers=FEED_WORKERS, thread_name_prefix="press-release") as executor:
+                for feed_records in executor.map(partial(self._fetch_feed, session), self.feeds.items()):
+                    records.extend(feed_records)
+        return records
+
+    def _fetch_feed(self, session: requests.Session, feed: Tuple[str, str]) -> List[RegulatoryDecision]:
+        ticker, url = feed
+        try:
+            with logger.span("press_release.feed", ticker=ticker):
+                response = session.get(url, timeout=FEED_TIMEOUT)
+            response.raise_for_status()
+            return self._parse_feed(ticker, response.content)
+        except Exception as e:
+            logger.warning(f"Error reading press releases for {ticker}: {e}", ticker=ticker)
+            return []
+
+    def _parse_feed(self, ticker: str, content: bytes) -> List[RegulatoryDecision]:
+        records = []
+        for item in ET.fromstring(content).iter('item'):
+            title = (item.findtext('title') or "").strip()
+            text = f"{title}. {item.findtext('description') or ''}"
+            lowered = text.lower()
+            if "pdufa" not in lowered and "target action date" not in lowered:
+                continue
+            # The action date follows the PDUFA mention; the publication date does not count
+            anchor = max(lowered.find("pdufa"), lowered.find("target action date"))
+            parsed = normalize_date(text[anchor:])
+            if not parsed:
+                continue
+            drug_name = ""
+            words = title.split()
+            for word, following in zip(words, words[1:]):
+                if word.lower() == "for" and following[:1].isupper():
+                    drug_name = following.strip(",.:;()")
+                    break
+            records.append(RegulatoryDecision(
+                company_name=self.company_names.get(ticker, ""),
+                ticker_symbol=ticker,
+                drug_name=drug_name,
+                pdufa_date=parsed.mid,
+                description=title,
+                date_precision=parsed.precision,
+            ))
+        return records
+
+
+def load_press_release_feeds(conn) -> Tuple[Dict[str, str], Dict[str, str]]:
+    """Feed URL and company name per ticker for companies with a press_release_feed"""
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT ticker, company_name, press_release_feed
+                FROM companies
+                WHERE press_release_feed IS NOT NULL
+                """
+            )
+            rows = cursor.fetchall()
+    except Exception as e:
+        logger.error(f"Error loading press-release feeds: {e}")
+        conn.rollback()
+        return {}, {}
+    return ({ticker: feed for ticker, _, feed in rows},
+            {ticker: company_name for ticker, company_name, _ in rows})
+
+
+# Finer precisions rank lower; a merged row keeps the most exact date any source gave
+PRECISION_RANK = {DAY: 0, MONTH: 1, QUARTER: 2, HALF: 3}
+
+
+def normalize_drug_name(drug_name: str) -> str:
+    """Case, spacing and punctuation folded away ("ABC-123 " and "abc 123" match)"""
+    return re.sub(r'[^a-z0-9]', '', (drug_name or "").lower())
+
+
+def same_event(drug: str, period: tuple, other_drug: str, other_period: tuple) -> bool:
+    """
+    Two rows for one ticker are the same event when their date periods
+    overlap (a mid-month RTT date and the exact day a press release gives)
+    and their drugs match; a row whose drug could not be read matches any.
+    """
+    if period[0] > other_period[1] or other_period[0] > period[1]:
+        return False
+    return not drug or not other_drug or drug == other_drug
+
+
+def merge_batches(batches: Sequence[RegulatoryDecisionBatch]) -> RegulatoryDecisionBatch:
+    """
+    Merge through a ticker index (upper-cased). The first batch to bring an
+    event keeps it; a later one for the same event (see same_event) only fills
+    in a drug name or decision the kept row lacks, or a more exact date.
+    Rows with neither a ticker nor a drug name are kept but never merged.
+    """
+    merged = RegulatoryDecisionBatch()
+    # ticker -> [(normalized drug, period, merged position)]
+    index: Dict[str, List[tuple]] = {}
+    for batch in batches:
+        rows = zip(batch.column('ticker_symbol'), batch.column('drug_name'),
+                   batch.column('pdufa_date'), batch.column('date_precision'))
+        for row, (ticker, drug_name, pdufa_date, precision) in enumerate(rows):
+            ticker = (ticker or "").strip().upper()
+            drug = normalize_drug_name(drug_name)
+            period = period_bounds(pdufa_date, precision)
+            # Nothing to tell such rows apart by: each gets an index of its own, never shared
+            events = index.setdefault(ticker, []) if ticker or drug else []
+            match = next((event for event in events if same_event(drug, period, event[0], event[1])), None)
+            if match is None:
+                events.append((drug, period, len(merged)))
+                merged.append(batch.record(row))
+                merged.update(len(merged) - 1, ticker_symbol=ticker)
+                continue
+
+            kept_drug, kept_period, position = match
+            updates = {}
+            if not kept_drug and drug:
+                updates['drug_name'] = drug_name
+                kept_drug = drug
+            if PRECISION_RANK[precision] < PRECISION_RANK[merged.column('date_precision')[position]]:
+                updates.update(pdufa_date=pdufa_date, date_precision=precision)
+                kept_period = period
+            if merged.column('decision')[position] is None and batch.column('decision')[row] is not None:
+                updates.update(decision=batch.column('decision')[row], status=batch.column('status')[row])
+            if updates:
+                merged.update(position, **updates)
+                events[events.index(match)] = (kept_drug, kept_period, position)
+    return merged
+
+
+class SourceRunner:
+    """Runs sources concurrently and tracks each one's latency and freshness"""
+
+    def __init__(self, sources: Sequence[PDUFASource], timeout: float = SOURCE_TIMEOUT,
+                 status_path: Optional[Path] = SOURCE_STATUS_PATH):
+        self.sources = list(sources)
+        self.timeout = timeout
+        self.status_path = Path(status_path) if status_path else None
+        self.status = self._load_status()
+
+    def _load_status(self) -> Dict[str, dict]:
+        if self.status_path and self.status_path.exists():
+            return json.loads(self.status_path.read_text())
+        return {}
+
+    def _save_status(self):
+        if self.status_path:
+            self.status_path.parent.mkdir(parents=True, exist_ok=True)
+            self.status_path.write_text(json.dumps(self.status, indent=2))
+
+    def run(self) -> RegulatoryDecisionBatch:
+        """Fetch every source at once, wait at most timeout, merge what came back in source order"""
+        start = time.perf_counter()
+        outcomes: Dict[str, tuple] = {}
+
+        def fetch(source: PDUFASource):
+            source_start = time.perf_counter()
+            try:
+                with logger.context(source=source.name):
+                    records = source.fetch()
+                outcomes[source.name] = (records, time.perf_counter() - source_start, None)
+            except Exception as e:
+                outcomes[source.name] = (None, time.perf_counter() - source_start, e)
+
+        # Daemon threads: a source stuck past the deadline is abandoned, and cannot hold up exit either
+        threads = [threading.Thread(target=fetch, args=(source,), name=f"pdufa-source-{source.name}", daemon=True)
+                   for source in self.sources]
+        for thread in threads:
+            thread.start()
+        deadline = start + self.timeout
+        for thread in threads:
+            thread.join(max(deadline - time.perf_counter(), 0))
+
+        batches = []
+        for source in self.sources:
+            status = self.status.setdefault(source.name, {})
+            if source.name not in outcomes:
+                elapsed = time.perf_counter() - start
+                records = source.partial()
+                status.update(state="timeout", latency_s=round(elapsed, 3), records=len(records) if records else 0)
+                logger.record_span(f"pdufa.source.{source.name}", elapsed, error=True)
+                logger.warning(f"PDUFA source {source.name} timed out after {self.timeout:.0f}s, "
+                               f"keeping {status['records']} records fetched so far",
+                               source=source.name, last_success=status.get('last_success'))
+                if records:
+                    batches.append(records)
+                continue
+            records, elapsed, error = outcomes[source.name]
+            if error:
+                status.update(state="error", latency_s=round(elapsed, 3), records=0, error=str(error))
+                logger.record_span(f"pdufa.source.{source.name}", elapsed, error=True)
+                logger.error(f"PDUFA source {source.name} failed: {error}", source=source.name,
+                             last_success=status.get('last_success'))
+                continue
+            status.update(state="ok", latency_s=round(elapsed, 3), records=len(records),
+                          last_success=datetime.now().isoformat(timespec='seconds'))
+            status.pop('error', None)
+            logger.record_span(f"pdufa.source.{source.name}", elapsed)
+            logger.info(f"PDUFA source {source.name}: {len(records)} records in {elapsed:.2f}s",
+                        source=source.name, records=len(records), latency_s=round(elapsed, 3))
+            batches.append(records)
+
+        self._save_status()
+        return merge_batches(batches)
+
+    def freshness(self) -> Dict[str, Optional[float]]:
+        """Hours since each source last fetched successfully (None if it never has)"""
+        now = datetime.now()
+        return {
+            source.name: (
+                (now - datetime.fromisoformat(self.status[source.name]['last_success'])).total_seconds() / 3600
+                if self.status.get(source.name, {}).get('last_success') else None
+            )
+            for source in self.sources
+        }
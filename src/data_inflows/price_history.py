@@ -0,0 +1,245 @@
+"""
+Price History Store
+Local columnar store of daily and intraday OHLCV bars per ticker.
+
+Bars live under data/prices/<interval>/<TICKER>/ as uncompressed Arrow IPC
+segments sorted by time. Updates fetch only bars newer than the last stored
+one and write them as a new segment (compacted once a ticker collects too
+many). Reads memory-map the segments and slice them by date range without
+copying, so backtests, event studies and the dashboard read from disk
+rather than the network.
+"""
+import os
+import tempfile
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import pandas as pd
+import psycopg as ppg
+import pyarrow as pa
+import yfinance as yf
+
+from utils.logger import get_logger
+
+logger = get_logger("data_inflows")
+
+PRICE_STORE_DIR = Path(__file__).resolve().parents[2] / "data" / "prices"
+
+# yfinance interval -> how far back a first fetch goes (intraday history is capped by Yahoo)
+INTERVAL_LOOKBACK_DAYS = {
+    '1d': 365 * 10,
+    '1h': 729,
+    '5m': 59,
+}
+
+BAR_SCHEMA = pa.schema([
+    ('timestamp', pa.timestamp('ns', tz='UTC')),
+    ('open', pa.float64()),
+    ('high', pa.float64()),
+    ('low', pa.float64()),
+    ('close', pa.float64()),
+    ('volume', pa.float64()),
+])
+
+# Segments per ticker before they are merged into one
+MAX_SEGMENTS = 16
+
+# Tickers per bulk yfinance download
+DOWNLOAD_BATCH_SIZE = 100
+
+
+def _to_utc(value) -> pd.Timestamp:
+    timestamp = pd.Timestamp(value)
+    return timestamp.tz_localize('UTC') if timestamp.tzinfo is None else timestamp.tz_convert('UTC')
+
+
+class PriceHistoryStore:
+    def __init__(self, root: Path = PRICE_STORE_DIR):
+        self.root = Path(root)
+
+    def _ticker_dir(self, ticker: str, interval: str) -> Path:
+        return self.root / interval / ticker.upper()
+
+    def _segments(self, ticker: str, interval: str) -> List[Path]:
+        directory = self._ticker_dir(ticker, interval)
+        return sorted(directory.glob("*.arrow")) if directory.exists() else []
+
+    @staticmethod
+    def _read_segment(path: Path) -> pa.Table:
+        """Memory-mapped read: the table's buffers point into the mapped file"""
+        with pa.memory_map(str(path), 'r') as source:
+            return pa.ipc.open_file(source).read_all()
+
+    def _write_segment(self, ticker: str, interval: str, table: pa.Table, sequence: int):
+        """Write a segment atomically (temporary file, then rename)"""
+        directory = self._ticker_dir(ticker, interval)
+        directory.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as sink, pa.ipc.new_file(sink, BAR_SCHEMA) as writer:
+                writer.write_table(table)
+            os.replace(tmp_path, directory / f"{sequence:08d}.arrow")
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    def last_timestamp(self, ticker: str, interval: str = '1d') -> Optional[pd.Timestamp]:
+        segments = self._segments(ticker, interval)
+        if not segments:
+            return None
+        timestamps = self._read_segment(segments[-1]).column('timestamp')
+        return pd.Timestamp(timestamps[len(timestamps) - 1].as_py()) if len(timestamps) else None
+
+    def read(self, ticker: str, interval: str = '1d', start=None, end=None) -> pa.Table:
+        """Bars with start <= timestamp < end as a zero-copy slice of the mapped segments"""
+        tables = [self._read_segment(path) for path in self._segments(ticker, interval)]
+        if not tables:
+            return BAR_SCHEMA.empty_table()
+        table = pa.concat_tables(tables)
+
+        # Timestamps are sorted, so the range is found by binary search
+        timestamps = table.column('timestamp').to_numpy()
+        lo = timestamps.searchsorted(_to_utc(start).to_datetime64()) if start is not None else 0
+        hi = timestamps.searchsorted(_to_utc(end).to_datetime64()) if end is not None else len(timestamps)
+        return table.slice(lo, hi - lo)
+
+    def read_frame(self, ticker: str, interval: str = '1d', start=None, end=None) -> pd.DataFrame:
+        return self.read(ticker, interval, start, end).to_pandas().set_index('timestamp')
+
+    def read_closes(self, tickers: Iterable[str], start=None, end=None, interval: str = '1d') -> pd.DataFrame:
+        """Wide frame of closes (timestamp x ticker); daily bars are indexed by date"""
+        columns = {}
+        for ticker in sorted(set(tickers)):
+            table = self.read(ticker, interval, start, end)
+            if table.num_rows:
+                columns[ticker] = pd.Series(table.column('close').to_numpy(),
+                                            index=pd.DatetimeIndex(table.column('timestamp').to_numpy()))
+        closes = pd.DataFrame(columns).sort_index()
+        if interval == '1d' and not closes.empty:
+            closes.index = closes.index.normalize()
+        return closes
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+
+    def append(self, ticker: str, interval: str, bars: pd.DataFrame) -> int:
+        """
+        Append bars (DatetimeIndex, open/high/low/close/volume columns) newer
+        than the last stored bar. Returns the number of bars written.
+        """
+        if bars.empty:
+            return 0
+        frame = bars[['open', 'high', 'low', 'close', 'volume']].astype(float)
+        index = pd.DatetimeIndex(frame.index)
+        frame.index = index.tz_localize('UTC') if index.tz is None else index.tz_convert('UTC')
+        frame = frame[~frame.index.duplicated(keep='last')].sort_index().dropna(subset=['close'])
+
+        last = self.last_timestamp(ticker, interval)
+        if last is not None:
+            frame = frame[frame.index > last]
+        if frame.empty:
+            return 0
+
+        table = pa.Table.from_pandas(frame.rename_axis('timestamp').reset_index(), schema=BAR_SCHEMA, preserve_index=False)
+        segments = self._segments(ticker, interval)
+        sequence = int(segments[-1].stem) + 1 if segments else 0
+        self._write_segment(ticker, interval, table, sequence)
+
+        if len(segments) + 1 > MAX_SEGMENTS:
+            self.compact(ticker, interval)
+        return len(frame)
+
+    def compact(self, ticker: str, interval: str = '1d'):
+        """Merge a ticker's segments into one"""
+        segments = self._segments(ticker, interval)
+        if len(segments) < 2:
+            return
+        table = pa.concat_tables([self._read_segment(path) for path in segments]).combine_chunks()
+        self._write_segment(ticker, interval, table, int(segments[-1].stem) + 1)
+        for path in segments:
+            path.unlink()
+
+    def update(self, tickers: Iterable[str], interval: str = '1d') -> Dict[str, int]:
+        """
+        Fetch and append only bars newer than each ticker's last stored bar.
+        Tickers sharing a start date are fetched together in bulk downloads.
+        Returns the number of bars appended per ticker.
+        """
+        lookback = timedelta(days=INTERVAL_LOOKBACK_DAYS[interval])
+        by_start: Dict[date, List[str]] = {}
+        for ticker in sorted(set(tickers)):
+            last = self.last_timestamp(ticker, interval)
+            start = (last + timedelta(days=1 if interval == '1d' else 0)).date() if last is not None \
+                else date.today() - lookback
+            by_start.setdefault(start, []).append(ticker)
+
+        appended = {}
+        for start, group in by_start.items():
+            if start > date.today():
+                appended.update({ticker: 0 for ticker in group})
+                continue
+            for i in range(0, len(group), DOWNLOAD_BATCH_SIZE):
+                batch = group[i:i + DOWNLOAD_BATCH_SIZE]
+                for ticker, bars in self._download(batch, start, interval).items():
+                    appended[ticker] = self.append(ticker, interval, bars)
+        return appended
+
+    def _download(self, tickers: List[str], start: date, interval: str) -> Dict[str, pd.DataFrame]:
+        """Completed bars per ticker from one bulk yfinance call"""
+        try:
+            with logger.span("yfinance.download", interval=interval, tickers=len(tickers)):
+                data = yf.download(tickers, start=start, interval=interval, auto_adjust=True,
+                                   group_by='ticker', progress=False, threads=True)
+        except Exception as e:
+            logger.error(f"Error downloading {interval} bars for {len(tickers)} tickers: {e}", interval=interval)
+            return {}
+        if data is None or data.empty:
+            return {}
+
+        bars = {}
+        for ticker in tickers:
+            if isinstance(data.columns, pd.MultiIndex):
+                if ticker not in data.columns.get_level_values(0):
+                    continue
+                frame = data[ticker]
+            else:
+                frame = data
+            frame = frame.rename(columns=str.lower).dropna(how='all')
+            # Today's daily bar (or the latest intraday bar) is still forming
+            if interval == '1d':
+                frame = frame[frame.index.date < date.today()]
+            else:
+                frame = frame.iloc[:-1]
+            bars[ticker] = frame
+        return bars
+
+
+def update_company_prices(db_settings, intervals: Iterable[str] = ('1d',), store: Optional[PriceHistoryStore] = None,
+                          extra_tickers: Iterable[str] = ()) -> Dict[str, Dict[str, int]]:
+    """Bring the store up to date for every ticker in companies (plus any extras, e.g. benchmarks)"""
+    conn = ppg.connect(dbname=db_settings.DB_NAME,
+                       user=db_settings.DB_USER,
+                       host=db_settings.DB_HOST,
+                       password=db_settings.DB_PASSWORD)
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT ticker FROM companies WHERE ticker IS NOT NULL")
+            tickers = [row[0] for row in cursor.fetchall()]
+    finally:
+        conn.close()
+
+    store = store or PriceHistoryStore()
+    results = {}
+    for interval in intervals:
+        start = datetime.now()
+        appended = store.update(tickers + list(extra_tickers), interval)
+        results[interval] = appended
+        logger.info(f"Stored {sum(appended.values())} new {interval} bars for {len(appended)} tickers "
+                    f"in {(datetime.now() - start).total_seconds():.1f}s", interval=interval)
+    return results
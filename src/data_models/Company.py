@@ -1,20 +1,22 @@
-class Company:
-    def __init__(self, ticker_symbol, company_name, sector, industry, exchange, market_cap, market_cap_category="Unknown", alpaca_tradable=False, alpaca_shortable=False, alpaca_marginable=False, alpaca_fractionable=False):
+from dataclasses import dataclass, field
+from typing import List
 
-        self.ticker_symbol = ticker_symbol
-        self.company_name = company_name
-        self.sector = sector
-        self.industry = industry
-        self.market_cap = market_cap
-        self.market_cap_category = market_cap_category
-        self.exchange = exchange
-        self.alpaca_tradable = alpaca_tradable
-        self.alpaca_shortable = alpaca_shortable
-        self.alpaca_marginable = alpaca_marginable
-        self.alpaca_fractionable = alpaca_fractionable
-        self.search_phrases = []
-        self.primary_search_phrase = ""
 
+@dataclass(slots=True)
+class Company:
+    ticker_symbol: str
+    company_name: str
+    sector: str
+    industry: str
+    exchange: str
+    market_cap: int
+    market_cap_category: str = "Unknown"
+    alpaca_tradable: bool = False
+    alpaca_shortable: bool = False
+    alpaca_marginable: bool = False
+    alpaca_fractionable: bool = False
+    search_phrases: List[str] = field(default_factory=list)
+    primary_search_phrase: str = ""
 
     def __repr__(self):
         return f"Company(ticker_symbol={self.ticker_symbol}, company_name={self.company_name}, sector={self.sector}, industry={self.industry}, market_cap={self.market_cap})"
@@ -27,4 +29,3 @@ class Company:
     def get_search_phrases(self):
         """Return the list of search phrases"""
         return self.search_phrases
-    
@@ -0,0 +1,135 @@
+"""
+Record Batches
+Columnar (struct-of-arrays) containers for moving many Study / Company /
+RegulatoryDecision records between the scrape, verify, filter and bulk-write
+stages: one list per field instead of one object per record. Records are
+only built when a caller asks for them, and the DB writers bind whole
+columns at once.
+
+to_arrow() / from_arrow() convert to a pyarrow Table (pyarrow is imported
+on first use).
+"""
+from dataclasses import MISSING, fields
+from typing import Callable, Dict, Iterable, Iterator, List, Sequence
+
+from .Company import Company
+from .RegulatoryDecision import RegulatoryDecision
+from .Study import Study
+
+
+class RecordBatch:
+    """Base batch; subclasses set record_type to a slotted dataclass"""
+    record_type = None
+
+    def __init__(self, columns: Dict[str, list] = None):
+        columns = columns or {}
+        unknown = set(columns) - set(self.field_names())
+        if unknown:
+            raise ValueError(f"Unknown {self.record_type.__name__} columns: {sorted(unknown)}")
+        length = len(next(iter(columns.values()))) if columns else 0
+        self.columns = {}
+        for field in fields(self.record_type):
+            if field.name in columns:
+                self.columns[field.name] = list(columns[field.name])
+            elif field.default_factory is not MISSING:
+                self.columns[field.name] = [field.default_factory() for _ in range(length)]
+            elif field.default is not MISSING or not length:
+                self.columns[field.name] = [field.default] * length
+            else:
+                raise ValueError(f"Missing required column: {field.name}")
+        if len({len(column) for column in self.columns.values()}) > 1:
+            raise ValueError("Columns have different lengths")
+
+    @classmethod
+    def field_names(cls) -> tuple:
+        return tuple(field.name for field in fields(cls.record_type))
+
+    @classmethod
+    def from_records(cls, records: Iterable) -> "RecordBatch":
+        batch = cls()
+        batch.extend(records)
+        return batch
+
+    def append(self, record):
+        for name, column in self.columns.items():
+            column.append(getattr(record, name))
+
+    def extend(self, records: Iterable):
+        if isinstance(records, RecordBatch):
+            # Column to column, no records built
+            for name, column in self.columns.items():
+                column.extend(records.columns[name])
+            return
+        for record in records:
+            self.append(record)
+
+    def __len__(self) -> int:
+        return len(next(iter(self.columns.values()), ()))
+
+    def __iter__(self) -> Iterator:
+        return (self.record(index) for index in range(len(self)))
+
+    def __repr__(self):
+        return f"{type(self).__name__}(records={len(self)})"
+
+    def column(self, name: str) -> list:
+        return self.columns[name]
+
+    def record(self, index: int):
+        """Build the record at index (a copy: changes do not reach the batch)"""
+        return self.record_type(**{name: column[index] for name, column in self.columns.items()})
+
+    def records(self) -> List:
+        return list(self)
+
+    def update(self, index: int, **values):
+        """Set fields of the record at index in place"""
+        for name, value in values.items():
+            self.columns[name][index] = value
+
+    def take(self, indices: Iterable[int]) -> "RecordBatch":
+        indices = list(indices)
+        return type(self)({name: [column[i] for i in indices] for name, column in self.columns.items()})
+
+    def filter(self, mask: Sequence[bool]) -> "RecordBatch":
+        return self.take(index for index, keep in enumerate(mask) if keep)
+
+    def where(self, predicate: Callable[..., bool], *names: str) -> "RecordBatch":
+        """Rows for which predicate(*values of names) is true"""
+        return self.filter([predicate(*values) for values in zip(*(self.columns[name] for name in names))])
+
+    def copy(self) -> "RecordBatch":
+        return type(self)(self.columns)
+
+    def unique(self, key: Callable[..., tuple], *names: str) -> "RecordBatch":
+        """First row for each key(*values of names)"""
+        seen = set()
+        keep = []
+        for index, values in enumerate(zip(*(self.columns[name] for name in names))):
+            row_key = key(*values)
+            if row_key not in seen:
+                seen.add(row_key)
+                keep.append(index)
+        return self.take(keep)
+
+    def to_arrow(self):
+        import pyarrow as pa
+        return pa.table(self.columns)
+
+    @classmethod
+    def from_arrow(cls, table) -> "RecordBatch":
+        return cls(table.to_pydict())
+
+
+class StudyBatch(RecordBatch):
+    record_type = Study
+
+
+class CompanyBatch(RecordBatch):
+    record_type = Company
+
+
+class RegulatoryDecisionBatch(RecordBatch):
+    record_type = RegulatoryDecision
+
+
@@ -2,7 +2,7 @@ from dataclasses import dataclass
 from datetime import datetime
 from typing import Optional
 
-@dataclass
+@dataclass(slots=True)
 class RegulatoryDecision:
     company_name: str
     ticker_symbol: str
@@ -12,9 +12,11 @@ class RegulatoryDecision:
     description: str = ""
     status: str = "pending"
     USEU: Optional[str] = "US"  # Default to US, can be 'EU' or 'US' based on the decision type
+    date_precision: str = "day"  # 'day', 'month', 'quarter' or 'half' (approximate dates sit mid-period)
 
     def __str__(self):
         return (f"RegulatoryDecision(company_name={self.company_name}, \n"
                 f"ticker_symbol={self.ticker_symbol}, \ndrug_name={self.drug_name}, \n"
                 f"pdufa_date={self.pdufa_date}, \ndecision={self.decision}, \n"
-                f"description={self.description}, \nstatus={self.status}, \nUSEU={self.USEU})\n")
\ No newline at end of file
+                f"description={self.description}, \nstatus={self.status}, \nUSEU={self.USEU}, \n"
+                f"date_precision={self.date_precision})\n")
\ No newline at end of file
@@ -1,15 +1,21 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+
+@dataclass(slots=True)
 class Study:
-    def __init__(self, nctid, title, phase, pcd, primary_sponsor, conditions):
-        self.nctid = nctid
-        self.title = title
-        self.phase = phase
-        self.pcd = pcd
-        self.primary_sponsor = primary_sponsor
-        self.conditions = conditions
+    nctid: str
+    title: str
+    phase: str
+    pcd: Optional[datetime]
+    primary_sponsor: str
+    conditions: str
+    primary_sponsor_ticker: Optional[str] = None
+    pcd_precision: str = "day"  # 'day' or 'month' (a YYYY-MM date is stored as the 1st)
 
     def __repr__(self):
         return f"Study(study_id={self.nctid}, title={self.title}, phase={self.phase}, pcd_str={self.pcd.strftime('%Y-%m-%d') if self.pcd else None}, primary_sponsor={self.primary_sponsor}, conditions={self.conditions})"
     
     def add_ticker(self, ticker):
         self.primary_sponsor_ticker = ticker
-    
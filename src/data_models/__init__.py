@@ -1,3 +1,4 @@
 from .Study import Study
 from .Company import Company
-from .RegulatoryDecision import RegulatoryDecision
\ No newline at end of file
+from .RegulatoryDecision import RegulatoryDecision
+from .RecordBatch import RecordBatch, StudyBatch, CompanyBatch, RegulatoryDecisionBatch
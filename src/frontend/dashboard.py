@@ -3,15 +3,21 @@ import pandas as pd
 import plotly.graph_objects as go
 import plotly.express as px
 from datetime import datetime, timedelta
+import hashlib
+import os
+import tempfile
+from pathlib import Path
 import psycopg as ppg
-import yfinance as yf
-import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+from psycopg_pool import ConnectionPool
 from typing import Optional
-import time
 from config import dbConfig, alpacaConfig
-from alpaca.trading.client import TradingClient
-from alpaca.data.requests import StockLatestQuoteRequest
-from alpaca.data.historical import StockHistoricalDataClient
+from trading.alpaca_gateway import get_gateway
+from data_inflows.price_history import PriceHistoryStore
+from utils.option_symbols import parse_option_symbols
+from analytics.greeks import aggregate_greeks, compute_position_greeks
+from analytics.scenarios import group_scenarios, scenario_grid
 
 # Page configuration
 st.set_page_config(
@@ -23,21 +29,13 @@ st.set_page_config(
 
 class AlpacaDataManager:
     def __init__(self):
-        """Initialize Alpaca clients for trading and market data"""
-        self.trading_client = TradingClient(
-            alpacaConfig.ALPACA_API_KEY,
-            alpacaConfig.ALPACA_SECRET_KEY,
-            paper=True
-        )
-        self.data_client = StockHistoricalDataClient(
-            alpacaConfig.ALPACA_API_KEY,
-            alpacaConfig.ALPACA_SECRET_KEY
-        )
+        """Use the shared Alpaca gateway for trading and market data"""
+        self.gateway = get_gateway(alpacaConfig, paper=True)
     
     def get_account_positions(self):
         """Get all current positions from Alpaca account"""
         try:
-            positions = self.trading_client.get_all_positions()
+            positions = self.gateway.run(self.gateway.get_all_positions())
             return positions
         except Exception as e:
             st.error(f"Error fetching positions from Alpaca: {e}")
@@ -46,13 +44,35 @@ class AlpacaDataManager:
     def get_current_quote(self, symbol: str):
         """Get current quote for a symbol"""
         try:
-            request = StockLatestQuoteRequest(symbol_or_symbols=symbol)
-            quotes = self.data_client.get_stock_latest_quote(request)
-            return quotes[symbol] if symbol in quotes else None
+            return self.gateway.run(self.gateway.get_latest_quote(symbol))
         except Exception as e:
             st.error(f"Error fetching quote for {symbol}: {e}")
             return None
     
+    def get_current_quotes(self, symbols):
+        """Get current quotes for many symbols in batched requests"""
+        try:
+            return self.gateway.run(self.gateway.get_latest_quotes(symbols))
+        except Exception as e:
+            st.error(f"Error fetching quotes: {e}")
+            return {}
+    
+    def get_option_quotes(self, symbols):
+        """Get current quotes for many option contracts in batched requests"""
+        try:
+            return self.gateway.run(self.gateway.get_latest_option_quotes(symbols))
+        except Exception as e:
+            st.error(f"Error fetching option quotes: {e}")
+            return {}
+    
+    def get_market_clock(self):
+        """Get the market clock (open flag and next open/close times)"""
+        try:
+            return self.gateway.run(self.gateway.get_clock())
+        except Exception as e:
+            st.error(f"Error fetching market clock: {e}")
+            return None
+    
     def calculate_position_pnl(self, position):
         """Calculate P&L for a position using Alpaca data"""
         try:
@@ -69,152 +89,332 @@ class AlpacaDataManager:
         except Exception as e:
             st.error(f"Error calculating P&L for {position.symbol}: {e}")
             return None
-    
-    def parse_option_symbol(self, symbol: str):
-        """Parse option symbol to extract underlying, expiration, strike, and type"""
-        try:
-            # Example: AAPL240119C00185000
-            # Format: [UNDERLYING][YYMMDD][C/P][STRIKE_PRICE]
-            if len(symbol) < 15:
-                return None
-                
-            # Find where the date starts (first digit after letters)
-            underlying_end = 0
-            for i, char in enumerate(symbol):
-                if char.isdigit():
-                    underlying_end = i
-                    break
-            
-            underlying = symbol[:underlying_end]
-            remainder = symbol[underlying_end:]
-            
-            # Extract date (YYMMDD)
-            exp_date_str = remainder[:6]
-            exp_year = 2000 + int(exp_date_str[:2])
-            exp_month = int(exp_date_str[2:4])
-            exp_day = int(exp_date_str[4:6])
-            exp_date = datetime(exp_year, exp_month, exp_day).date()
-            
-            # Extract option type (C/P)
-            option_type = remainder[6]
-            
-            # Extract strike price
-            strike_str = remainder[7:]
-            strike = float(strike_str) / 1000  # Strike is in millidollars
-            
-            return {
-                'underlying': underlying,
-                'expiration': exp_date,
-                'option_type': 'CALL' if option_type == 'C' else 'PUT',
-                'strike': strike,
-                'days_to_expiration': (exp_date - datetime.now().date()).days
-            }
-        except Exception as e:
-            st.error(f"Error parsing option symbol {symbol}: {e}")
-            return None
 
 class DatabaseManager:
-    def __init__(self):
-        self.conn = ppg.connect(
-            dbname=dbConfig.DB_NAME,
-            user=dbConfig.DB_USER,
-            host=dbConfig.DB_HOST,
-            password=dbConfig.DB_PASSWORD
-        )
+    def __init__(self, pool: ConnectionPool):
+        self.pool = pool
+    
+    def _read_sql(self, query: str, params=None) -> pd.DataFrame:
+        """Run a query on a pooled connection and return it as a DataFrame"""
+        with self.pool.connection() as conn:
+            return pd.read_sql(query, conn, params=params)
+    
+    def get_data_versions(self) -> dict:
+        """Last refresh time of each materialized event view"""
+        with self.pool.connection() as conn:
+            rows = conn.execute("SELECT view_name, refreshed_at FROM materialized_view_refreshes").fetchall()
+        return dict(rows)
+    
+    def get_linked_events(self, symbols: list) -> pd.DataFrame:
+        """Linked event of each traded symbol, limited to the given (held) symbols"""
+        query = """
+        SELECT
+            symbol,
+            linked_event,
+            event_date,
+            event_type
+        FROM event_positions
+        WHERE symbol = ANY(%(symbols)s)
+        """
+        
+        return self._read_sql(query, {'symbols': list(symbols)})
     
-    def get_active_positions(self) -> pd.DataFrame:
-        """Get all active options positions with linked events"""
+    def get_historical_moves(self, tickers: list) -> pd.DataFrame:
+        """Mean absolute day 0-1 abnormal move around each ticker's past decisions"""
         query = """
-        SELECT 
-            t.symbol,
-            t.call_put,
-            t.ticker,
-            t.expiration,
-            t.strike,
-            t.cost as entry_price,
-            t.quantity,
-            COALESCE(ct.title, rd.drug_name) as linked_event,
-            COALESCE(ct.pcd, rd.date) as event_date,
-            'Clinical Trial' as event_type
-        FROM trades t
-        LEFT JOIN clinical_trials ct ON t.study_id = ct.nctid
-        LEFT JOIN regulatory_decisions rd ON t.regulatory_id = rd.id
-        WHERE t.symbol IS NOT NULL
-        ORDER BY t.expiration DESC
+        SELECT
+            ticker,
+            avg(abs(car_0_p1)) AS mean_abs_move,
+            count(car_0_p1) AS past_decisions
+        FROM event_study_results
+        WHERE ticker = ANY(%(tickers)s)
+        GROUP BY ticker
         """
         
-        return pd.read_sql(query, self.conn)
+        return self._read_sql(query, {'tickers': list(tickers)})
     
     def get_upcoming_opportunities(self) -> pd.DataFrame:
         """Get upcoming FDA/EMA decisions and clinical trials"""
         query = """
         SELECT 
             ticker,
-            drug_name as event_name,
-            'PDUFA Decision' as event_type,
-            date as event_date,
+            event_name,
+            event_type,
+            event_date,
             status,
             decision
-        FROM regulatory_decisions 
-        WHERE date >= CURRENT_DATE AND status = 'pending'
-        
-        UNION ALL
-        
-        SELECT 
-            primary_sponsor_ticker as ticker,
-            title as event_name,
-            'Clinical Trial' as event_type,
-            pcd as event_date,
-            'pending' as status,
-            NULL as decision
-        FROM clinical_trials 
-        WHERE pcd >= CURRENT_DATE AND traded = FALSE
-        
+        FROM upcoming_events
+        WHERE event_date >= CURRENT_DATE
         ORDER BY event_date ASC
         LIMIT 20
         """
         
-        return pd.read_sql(query, self.conn)
+        return self._read_sql(query)
     
-    def get_trade_history(self) -> pd.DataFrame:
-        """Get historical trades with performance metrics"""
-        query = """
-        SELECT 
-            t.symbol,
-            t.call_put,
-            t.ticker,
-            t.expiration,
-            t.strike,
-            t.cost as entry_price,
-            t.quantity,
-            COALESCE(ct.title, rd.drug_name) as linked_event,
-            COALESCE(ct.pcd, rd.date) as event_date,
-            CASE 
-                WHEN ct.nctid IS NOT NULL THEN 'Clinical Trial'
-                ELSE 'PDUFA Decision'
-            END as event_type
-        FROM trades t
-        LEFT JOIN clinical_trials ct ON t.study_id = ct.nctid
-        LEFT JOIN regulatory_decisions rd ON t.regulatory_id = rd.id
-        ORDER BY t.expiration DESC
+    TRADE_HISTORY_COLUMNS = """
+            symbol,
+            call_put,
+            ticker,
+            expiration,
+            strike::float8 AS strike,
+            entry_price::float8 AS entry_price,
+            quantity::bigint AS quantity,
+            linked_event,
+            event_date,
+            event_type
+    """
+    
+    # Arrow schema of TRADE_HISTORY_COLUMNS for Parquet exports
+    TRADE_HISTORY_SCHEMA = pa.schema([
+        ('symbol', pa.string()),
+        ('call_put', pa.string()),
+        ('ticker', pa.string()),
+        ('expiration', pa.date32()),
+        ('strike', pa.float64()),
+        ('entry_price', pa.float64()),
+        ('quantity', pa.int64()),
+        ('linked_event', pa.string()),
+        ('event_date', pa.date32()),
+        ('event_type', pa.string())
+    ])
+    
+    EXPORT_BATCH_SIZE = 5000
+    
+    def _trade_history_where(self, ticker: Optional[str] = None, event_type: Optional[str] = None,
+                             call_put: Optional[str] = None) -> tuple:
+        """WHERE clause and params for the Trade History filters (None means no filter)"""
+        conditions, params = [], {}
+        if ticker is not None:
+            conditions.append("ticker = %(ticker)s")
+            params['ticker'] = ticker
+        if event_type is not None:
+            conditions.append("event_type = %(event_type)s")
+            params['event_type'] = event_type
+        if call_put is not None:
+            conditions.append("call_put = %(call_put)s")
+            params['call_put'] = call_put
+        return conditions, params
+    
+    def _trade_history_query(self, ticker: Optional[str] = None, event_type: Optional[str] = None,
+                             call_put: Optional[str] = None) -> tuple:
+        """Full filtered Trade History query and its params"""
+        conditions, params = self._trade_history_where(ticker, event_type, call_put)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        query = f"""
+        SELECT {self.TRADE_HISTORY_COLUMNS}
+        FROM event_positions
+        {where}
+        ORDER BY expiration DESC, symbol DESC
+        """
+        return query, params
+    
+    def export_trade_history_csv(self, out, ticker: Optional[str] = None, event_type: Optional[str] = None,
+                                 call_put: Optional[str] = None):
+        """Stream the filtered history into a binary file object with COPY ... TO STDOUT"""
+        query, params = self._trade_history_query(ticker, event_type, call_put)
+        with self.pool.connection() as conn:
+            with conn.cursor() as cursor:
+                # COPY cannot take server-side parameters; psycopg binds them client-side
+                with cursor.copy(f"COPY ({query}) TO STDOUT WITH (FORMAT csv, HEADER)", params) as copy:
+                    for chunk in copy:
+                        out.write(chunk)
+    
+    def export_trade_history_parquet(self, out, ticker: Optional[str] = None, event_type: Optional[str] = None,
+                                     call_put: Optional[str] = None):
+        """Stream the filtered history into a binary file object as Parquet, one row group per batch"""
+        query, params = self._trade_history_query(ticker, event_type, call_put)
+        schema = self.TRADE_HISTORY_SCHEMA
+        with self.pool.connection() as conn:
+            # Named (server-side) cursor: rows are fetched in batches, never all at once
+            with conn.cursor(name='trade_history_export') as cursor, pq.ParquetWriter(out, schema) as writer:
+                cursor.execute(query, params)
+                while rows := cursor.fetchmany(self.EXPORT_BATCH_SIZE):
+                    columns = zip(*rows)
+                    writer.write_batch(pa.RecordBatch.from_arrays(
+                        [pa.array(column, type=field.type) for column, field in zip(columns, schema)],
+                        schema=schema
+                    ))
+    
+    def get_trade_history_page(self, ticker: Optional[str] = None, event_type: Optional[str] = None,
+                               call_put: Optional[str] = None, after: Optional[tuple] = None,
+                               page_size: int = 50) -> pd.DataFrame:
+        """
+        One page of historical trades matching the filters.
+        Pages are keyed on the last (expiration, symbol) of the previous page
+        rather than an OFFSET, so every page is an index range scan.
+        """
+        conditions, params = self._trade_history_where(ticker, event_type, call_put)
+        if after is not None:
+            conditions.append("(expiration, symbol) < (%(after_expiration)s, %(after_symbol)s)")
+            params['after_expiration'], params['after_symbol'] = after
+        params['page_size'] = page_size
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        query = f"""
+        SELECT {self.TRADE_HISTORY_COLUMNS}
+        FROM event_positions
+        {where}
+        ORDER BY expiration DESC, symbol DESC
+        LIMIT %(page_size)s
         """
         
-        return pd.read_sql(query, self.conn)
+        return self._read_sql(query, params)
+    
+    def get_trade_event_types(self) -> list:
+        """Distinct event types for the Trade History filter"""
+        with self.pool.connection() as conn:
+            rows = conn.execute(
+                "SELECT DISTINCT event_type FROM event_positions ORDER BY event_type"
+            ).fetchall()
+        return [row[0] for row in rows]
+    
+    def get_trade_tickers(self) -> list:
+        """Distinct traded tickers for the Trade History filter"""
+        with self.pool.connection() as conn:
+            rows = conn.execute(
+                "SELECT DISTINCT ticker FROM event_positions WHERE ticker IS NOT NULL ORDER BY ticker"
+            ).fetchall()
+        return [row[0] for row in rows]
+
+@st.cache_resource
+def get_connection_pool() -> ConnectionPool:
+    """One psycopg connection pool per Streamlit server process"""
+    return ConnectionPool(
+        kwargs={
+            'dbname': dbConfig.DB_NAME,
+            'user': dbConfig.DB_USER,
+            'host': dbConfig.DB_HOST,
+            'password': dbConfig.DB_PASSWORD
+        },
+        min_size=1,
+        max_size=5,
+        open=True
+    )
+
+@st.cache_resource
+def get_database_manager() -> DatabaseManager:
+    return DatabaseManager(get_connection_pool())
+
+@st.cache_resource
+def get_alpaca_manager() -> AlpacaDataManager:
+    return AlpacaDataManager()
+
+@st.cache_resource
+def get_price_store() -> PriceHistoryStore:
+    return PriceHistoryStore()
+
+@st.cache_data(ttl=5, show_spinner=False)
+def get_data_versions() -> dict:
+    """View refresh times, re-probed at most every few seconds"""
+    return get_database_manager().get_data_versions()
+
+def table_versions(*views: str) -> tuple:
+    """Cache key for a query that reads the given materialized views"""
+    versions = get_data_versions()
+    return tuple(versions.get(view) for view in views)
+
+# Query results are keyed on the refresh times of the views they read, so a
+# view refresh invalidates exactly the queries that depend on it.
+@st.cache_data(show_spinner=False, max_entries=4)
+def load_linked_events(versions: tuple, symbols: tuple) -> pd.DataFrame:
+    return get_database_manager().get_linked_events(symbols)
 
-@st.cache_data(ttl=300)  # Cache for 5 minutes
-def get_current_stock_price(ticker: str) -> Optional[float]:
-    """Get current stock price using yfinance"""
+@st.cache_data(show_spinner=False, max_entries=4)
+def load_upcoming_opportunities(versions: tuple) -> pd.DataFrame:
+    return get_database_manager().get_upcoming_opportunities()
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def load_trade_history_page(versions: tuple, ticker: Optional[str], event_type: Optional[str],
+                            call_put: Optional[str], after: Optional[tuple], page_size: int) -> pd.DataFrame:
+    return get_database_manager().get_trade_history_page(ticker, event_type, call_put, after, page_size)
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def load_historical_moves(tickers: tuple) -> pd.DataFrame:
+    """Event study results only change when the study is re-run"""
+    return get_database_manager().get_historical_moves(tickers)
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def load_trade_tickers(versions: tuple) -> list:
+    return get_database_manager().get_trade_tickers()
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def load_trade_event_types(versions: tuple) -> list:
+    return get_database_manager().get_trade_event_types()
+
+EXPORT_DIR = Path(tempfile.gettempdir()) / "pharma_trade_exports"
+
+EXPORT_FORMATS = {
+    'CSV': ('csv', 'text/csv'),
+    'Parquet': ('parquet', 'application/vnd.apache.parquet')
+}
+
+def export_trade_history(versions: tuple, filters: tuple, export_format: str) -> Path:
+    """
+    Write the filtered trade history to a file named after the view version
+    and filters, so an export is only rebuilt after the data or filters change.
+    Rows stream from Postgres straight to disk; no DataFrame is built. Older
+    exports are deleted once the new file is in place.
+    """
+    extension, _ = EXPORT_FORMATS[export_format]
+    key = hashlib.sha1(repr((versions, filters)).encode()).hexdigest()[:16]
+    path = EXPORT_DIR / f"trade_history_{key}.{extension}"
+    if path.exists():
+        return path
+    
+    EXPORT_DIR.mkdir(parents=True, exist_ok=True)
+    db = get_database_manager()
+    # Write to a temporary name and rename, so readers never see a partial file
+    fd, tmp_path = tempfile.mkstemp(dir=EXPORT_DIR, suffix=f".{extension}.part")
     try:
-        stock = yf.Ticker(ticker)
-        return stock.info.get('regularMarketPrice')
-    except:
-        return None
+        with os.fdopen(fd, 'wb') as out:
+            if extension == 'parquet':
+                db.export_trade_history_parquet(out, *filters)
+            else:
+                db.export_trade_history_csv(out, *filters)
+        os.replace(tmp_path, path)
+    except Exception:
+        os.unlink(tmp_path)
+        raise
+    for stale in EXPORT_DIR.glob("trade_history_*"):
+        if stale != path:
+            stale.unlink(missing_ok=True)
+    return path
 
-@st.cache_data(ttl=300)
-def get_option_iv(symbol: str) -> Optional[float]:
-    """Mock function for implied volatility - replace with real data source"""
-    # This would integrate with Polygon/Tradier for real IV data
-    return np.random.uniform(0.3, 0.8)  # Mock IV between 30-80%
+def quote_midpoints(quotes: dict) -> dict:
+    """Midpoint per symbol, falling back to whichever side is quoted"""
+    prices = {}
+    for symbol, quote in quotes.items():
+        bid = quote.bid_price or 0
+        ask = quote.ask_price or 0
+        if bid > 0 and ask > 0:
+            prices[symbol] = (bid + ask) / 2
+        elif bid > 0 or ask > 0:
+            prices[symbol] = max(bid, ask)
+    return prices
+
+@st.cache_data(ttl=60, show_spinner=False)
+def get_latest_prices(tickers: tuple) -> dict:
+    """Latest prices (quote midpoint) for many tickers from one batched quote call"""
+    if not tickers:
+        return {}
+    return quote_midpoints(get_alpaca_manager().get_current_quotes(tickers))
+
+@st.cache_data(ttl=15, show_spinner=False)
+def get_option_mids(symbols: tuple) -> dict:
+    """Latest option quote midpoints for many contracts from one batched call"""
+    if not symbols:
+        return {}
+    return quote_midpoints(get_alpaca_manager().get_option_quotes(symbols))
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def get_price_trends(tickers: tuple, days: int = 30) -> dict:
+    """Recent daily closes per ticker, read from the local price store"""
+    closes = get_price_store().read_closes(tickers, start=datetime.now() - timedelta(days=days))
+    return {ticker: closes[ticker].dropna().tolist() for ticker in closes.columns}
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def get_book_greeks(snapshot: pd.DataFrame) -> pd.DataFrame:
+    """IV and greeks for every held contract, cached per quote snapshot"""
+    return compute_position_greeks(snapshot)
 
 def calculate_option_pnl(entry_price: float, current_price: float, quantity: int) -> dict:
     """Calculate P&L for options position"""
@@ -227,40 +427,36 @@ def calculate_option_pnl(entry_price: float, current_price: float, quantity: int
         'current_value': current_price * quantity * 100
     }
 
-def create_payoff_diagram(strike: float, premium: float, option_type: str, current_stock_price: float):
-    """Create options payoff diagram"""
-    stock_prices = np.linspace(strike * 0.7, strike * 1.3, 100)
-    
-    if option_type.upper() == 'CALL':
-        payoffs = np.maximum(stock_prices - strike, 0) - premium
-    else:  # PUT
-        payoffs = np.maximum(strike - stock_prices, 0) - premium
+@st.cache_data(max_entries=64, show_spinner=False)
+def create_scenario_chart(grid: pd.DataFrame, title: str, spot: Optional[float] = None):
+    """
+    P&L curves from a scenario grid, one line per days-forward row.
+    With a spot price the x-axis is the underlying price, otherwise the move.
+    """
+    moves = grid.columns.to_numpy(dtype=float)
+    x = spot * (1 + moves) if spot else moves * 100
     
     fig = go.Figure()
     
-    # Payoff line
-    fig.add_trace(go.Scatter(
-        x=stock_prices,
-        y=payoffs,
-        mode='lines',
-        name=f'{option_type} Payoff',
-        line=dict(color='blue', width=2)
-    ))
+    # One P&L line per horizon; the last row is held to expiration
+    for days, pnl in grid.iterrows():
+        fig.add_trace(go.Scatter(
+            x=x,
+            y=pnl.to_numpy(),
+            mode='lines',
+            name=f"T+{days}d"
+        ))
     
     # Break-even line
     fig.add_hline(y=0, line_dash="dash", line_color="gray", annotation_text="Break-even")
     
-    # Current stock price line
-    fig.add_vline(x=current_stock_price, line_dash="dot", line_color="red", 
-                  annotation_text=f"Current: ${current_stock_price:.2f}")
-    
-    # Strike price line
-    fig.add_vline(x=strike, line_dash="dot", line_color="green", 
-                  annotation_text=f"Strike: ${strike:.2f}")
+    # Current price / no-move line
+    fig.add_vline(x=spot if spot else 0, line_dash="dot", line_color="red",
+                  annotation_text=f"Current: ${spot:.2f}" if spot else "No move")
     
     fig.update_layout(
-        title=f'{option_type} Option Payoff Diagram',
-        xaxis_title='Stock Price at Expiration',
+        title=title,
+        xaxis_title='Underlying Price' if spot else 'Underlying Move (%)',
         yaxis_title='Profit/Loss ($)',
         height=400
     )
@@ -270,9 +466,9 @@ def create_payoff_diagram(strike: float, premium: float, option_type: str, curre
 def main():
     st.title("📊 FDA-Linked Options Trading Dashboard")
     
-    # Initialize database connection and Alpaca data manager
-    db = DatabaseManager()
-    alpaca = AlpacaDataManager()
+    # Pooled database access and shared Alpaca data manager
+    db = get_database_manager()
+    alpaca = get_alpaca_manager()
     
     # Sidebar for navigation and filters
     st.sidebar.title("Navigation")
@@ -281,20 +477,27 @@ def main():
         ["Active Positions", "Upcoming Opportunities", "Trade History", "Event Management"]
     )
     
-    # Auto-refresh toggle
+    # Auto-refresh toggle (reruns the live positions fragment only)
     auto_refresh = st.sidebar.checkbox("Auto-refresh (30s)", value=False)
-    if auto_refresh:
-        time.sleep(30)
-        st.experimental_rerun()
     
     # Manual refresh button
     if st.sidebar.button("🔄 Refresh Data"):
-        st.cache_data.clear()
-        st.experimental_rerun()
+        # Query caches follow the view refresh times, so only the version probe
+        # and live market data need to be dropped
+        get_data_versions.clear()
+        get_latest_prices.clear()
+        get_option_mids.clear()
+        st.session_state.pop('live_positions', None)
+        st.rerun()
+    
+    # When the materialized event views were last rebuilt
+    refreshed = [value for value in get_data_versions().values() if value is not None]
+    if refreshed:
+        st.sidebar.caption(f"Event data refreshed {min(refreshed).astimezone():%Y-%m-%d %H:%M:%S}")
     
     # Main content based on selected page
     if page == "Active Positions":
-        render_active_positions(db, alpaca)
+        render_active_positions(db, alpaca, refresh_interval=30 if auto_refresh else None)
     elif page == "Upcoming Opportunities":
         render_upcoming_opportunities(db)
     elif page == "Trade History":
@@ -302,25 +505,67 @@ def main():
     elif page == "Event Management":
         render_event_management(db)
 
-def render_active_positions(db: DatabaseManager, alpaca: AlpacaDataManager):
+def market_is_open(alpaca: AlpacaDataManager) -> bool:
+    """Market clock, re-fetched only once its next open/close boundary has passed"""
+    clock = st.session_state.get('market_clock')
+    if clock is None or datetime.now(clock.timestamp.tzinfo) >= min(clock.next_open, clock.next_close):
+        clock = alpaca.get_market_clock()
+        if clock is None:
+            return True
+        st.session_state['market_clock'] = clock
+    return clock.is_open
+
+def get_live_positions(alpaca: AlpacaDataManager) -> list:
+    """Alpaca positions, re-fetched only while the market can move them"""
+    positions = st.session_state.get('live_positions')
+    if positions is None or market_is_open(alpaca):
+        positions = alpaca.get_account_positions()
+        st.session_state['live_positions'] = positions
+    return positions
+
+def render_active_positions(db: DatabaseManager, alpaca: AlpacaDataManager, refresh_interval: Optional[int] = None):
     st.header("🎯 Active Positions")
     
+    # Only the live section reruns on the refresh interval; the rest of the
+    # script (navigation, other pages, cached queries) is left alone
+    st.fragment(run_every=refresh_interval)(render_live_positions)(db, alpaca)
+
+def build_live_positions(alpaca: AlpacaDataManager, alpaca_positions: list) -> pd.DataFrame:
+    """
+    One frame per held position: Alpaca P&L fields, parsed option fields and
+    the linked event, joined once on symbol. `linked` is False for positions
+    without a trade record.
+    """
+    records = [alpaca.calculate_position_pnl(position) for position in alpaca_positions]
+    positions = pd.DataFrame([record for record in records if record])
+    if positions.empty:
+        return positions
+    
+    # Parse every position symbol in one vectorized pass
+    parsed = parse_option_symbols(positions['symbol'])
+    positions = positions.join(parsed.drop(columns='symbol'))
+    
+    # Linked events for the held symbols only
+    linked_events = load_linked_events(table_versions('event_positions'), tuple(sorted(positions['symbol'])))
+    positions = positions.merge(linked_events, on='symbol', how='left', indicator=True)
+    positions['linked'] = positions.pop('_merge') == 'both'
+    return positions
+
+def render_live_positions(db: DatabaseManager, alpaca: AlpacaDataManager):
     # Get live positions from Alpaca
-    alpaca_positions = alpaca.get_account_positions()
+    alpaca_positions = get_live_positions(alpaca)
+    positions = build_live_positions(alpaca, alpaca_positions)
     
-    if not alpaca_positions:
+    if positions.empty:
         st.info("No active positions found in Alpaca account.")
         return
     
-    # Get database positions for linking to events
-    db_positions = db.get_active_positions()
-    
     st.subheader("💼 Live Account Positions")
     
     # Create a summary metrics row
-    total_market_value = sum(float(pos.market_value or 0) for pos in alpaca_positions)
-    total_unrealized_pl = sum(float(pos.unrealized_pl or 0) for pos in alpaca_positions)
-    total_cost_basis = sum(float(pos.cost_basis or 0) for pos in alpaca_positions)
+    total_market_value = positions['market_value'].sum()
+    total_unrealized_pl = positions['unrealized_pl'].sum()
+    total_cost_basis = positions['cost_basis'].sum()
     
     col1, col2, col3, col4 = st.columns(4)
     with col1:
@@ -331,82 +576,155 @@ def render_active_positions(db: DatabaseManager, alpaca: AlpacaDataManager):
     with col3:
         st.metric("Total Cost Basis", f"${total_cost_basis:,.2f}")
     with col4:
-        st.metric("Active Positions", len(alpaca_positions))
+        st.metric("Active Positions", len(positions))
+    
+    # Option legs with no trade record need reconciling against the trades table
+    unlinked = positions[positions['is_option'] & ~positions['linked']]
+    if not unlinked.empty:
+        st.warning(
+            f"{len(unlinked)} option position(s) have no trade record and need reconciliation: "
+            + ", ".join(unlinked['symbol'])
+        )
+    
+    # Price all held contracts and their underlyings with batched quote calls
+    options = positions[positions['is_option']]
+    book = pd.DataFrame()
+    if not options.empty:
+        underlying_prices = get_latest_prices(tuple(sorted(options['underlying'].unique())))
+        option_mids = get_option_mids(tuple(sorted(options['symbol'])))
+        snapshot = options[['symbol', 'underlying', 'strike', 'option_type', 'days_to_expiration', 'qty', 'avg_entry_price', 'linked_event']].assign(
+            option_price=options['symbol'].map(option_mids).astype(float).fillna(options['current_price']),
+            underlying_price=options['underlying'].map(underlying_prices).astype(float)
+        ).reset_index(drop=True)
+        book = get_book_greeks(snapshot).set_index('symbol')
+        render_book_greeks(book)
+        render_straddle_scenarios(book)
+        positions = positions.merge(book[['iv', 'delta']], left_on='symbol', right_index=True, how='left')
     
     # Display each position
-    for position in alpaca_positions:
-        pnl_data = alpaca.calculate_position_pnl(position)
-        if not pnl_data:
-            continue
-            
-        # Check if this is an options position (contains option-like symbol)
-        is_option = len(position.symbol) > 6 and any(c.isdigit() for c in position.symbol[-8:])
+    for position in positions.to_dict('records'):
+        is_option = position['is_option']
         
-        with st.expander(f"{'📊' if is_option else '📈'} {position.symbol} - {'Option' if is_option else 'Stock'}", expanded=True):
+        with st.expander(f"{'📊' if is_option else '📈'} {position['symbol']} - {'Option' if is_option else 'Stock'}", expanded=True):
             
             # Position details
             col1, col2, col3 = st.columns(3)
             with col1:
-                st.write(f"**Symbol:** {pnl_data['symbol']}")
-                st.write(f"**Quantity:** {pnl_data['qty']}")
-                st.write(f"**Avg Entry Price:** ${pnl_data['avg_entry_price']:.2f}")
+                st.write(f"**Symbol:** {position['symbol']}")
+                st.write(f"**Quantity:** {position['qty']}")
+                st.write(f"**Avg Entry Price:** ${position['avg_entry_price']:.2f}")
             with col2:
-                st.write(f"**Current Price:** ${pnl_data['current_price']:.2f}")
-                st.write(f"**Market Value:** ${pnl_data['market_value']:.2f}")
-                st.write(f"**Cost Basis:** ${pnl_data['cost_basis']:.2f}")
+                st.write(f"**Current Price:** ${position['current_price']:.2f}")
+                st.write(f"**Market Value:** ${position['market_value']:.2f}")
+                st.write(f"**Cost Basis:** ${position['cost_basis']:.2f}")
             with col3:
-                color = "green" if pnl_data['unrealized_pl'] >= 0 else "red"
-                st.write(f"**Unrealized P&L:** :{color}[${pnl_data['unrealized_pl']:.2f}]")
-                st.write(f"**P&L %:** :{color}[{pnl_data['unrealized_plpc']:.2%}]")
+                color = "green" if position['unrealized_pl'] >= 0 else "red"
+                st.write(f"**Unrealized P&L:** :{color}[${position['unrealized_pl']:.2f}]")
+                st.write(f"**P&L %:** :{color}[{position['unrealized_plpc']:.2%}]")
             
-            # Try to link with database events
-            linked_events = db_positions[db_positions['symbol'] == position.symbol]
-            if not linked_events.empty:
-                st.write("**🔗 Linked Events:**")
-                for _, event in linked_events.iterrows():
-                    st.write(f"- {event['linked_event']} ({event['event_date']})")
+            # Linked event from the trades table
+            if position['linked']:
+                st.write("**🔗 Linked Event:**")
+                st.write(f"- {position['linked_event']} ({position['event_date']})")
+            elif is_option:
+                st.write("**🔗 Linked Event:** :orange[none - not in trades table]")
             
             # For options, show additional metrics and payoff diagram
             if is_option:
-                option_details = alpaca.parse_option_symbol(position.symbol)
-                if option_details:
-                    st.write("**📊 Option Details:**")
-                    col1, col2, col3 = st.columns(3)
-                    with col1:
-                        st.write(f"**Underlying:** {option_details['underlying']}")
-                        st.write(f"**Strike:** ${option_details['strike']:.2f}")
-                    with col2:
-                        st.write(f"**Type:** {option_details['option_type']}")
-                        st.write(f"**Expiration:** {option_details['expiration']}")
-                    with col3:
-                        days_left = option_details['days_to_expiration']
-                        color = "red" if days_left < 7 else "orange" if days_left < 30 else "green"
-                        st.write(f"**Days to Exp:** :{color}[{days_left}]")
-                        
-                        # Mock IV - in production, integrate with options data provider
-                        mock_iv = np.random.uniform(0.2, 0.8)
-                        st.write(f"**Implied Vol:** {mock_iv:.1%}")
+                st.write("**📊 Option Details:**")
+                col1, col2, col3 = st.columns(3)
+                with col1:
+                    st.write(f"**Underlying:** {position['underlying']}")
+                    st.write(f"**Strike:** ${position['strike']:.2f}")
+                with col2:
+                    st.write(f"**Type:** {position['option_type']}")
+                    st.write(f"**Expiration:** {position['expiration'].date()}")
+                with col3:
+                    days_left = position['days_to_expiration']
+                    color = "red" if days_left < 7 else "orange" if days_left < 30 else "green"
+                    st.write(f"**Days to Exp:** :{color}[{days_left}]")
                     
-                    # Create payoff diagram
-                    if option_details['underlying']:
-                        underlying_price = get_current_stock_price(option_details['underlying'])
-                        if underlying_price:
-                            fig = create_payoff_diagram(
-                                option_details['strike'],
-                                pnl_data['avg_entry_price'],
-                                option_details['option_type'],
-                                underlying_price
-                            )
-                            st.plotly_chart(fig, use_container_width=True)
-                else:
-                    st.write("**Option symbol could not be parsed**")
+                    iv = position['iv']
+                    if pd.notna(iv):
+                        st.write(f"**Implied Vol:** {iv:.1%}")
+                        st.write(f"**Delta:** {position['delta']:.2f}")
+                    else:
+                        st.write("**Implied Vol:** n/a")
+                
             
             st.divider()
 
+def render_book_greeks(book: pd.DataFrame):
+    st.subheader("📐 Portfolio Greeks")
+    
+    totals = aggregate_greeks(book).iloc[0]
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Delta (shares)", f"{totals['position_delta']:,.1f}")
+    with col2:
+        st.metric("Gamma (shares / $1)", f"{totals['position_gamma']:,.2f}")
+    with col3:
+        st.metric("Vega ($ / vol pt)", f"${totals['position_vega']:,.2f}")
+    with col4:
+        st.metric("Theta ($ / day)", f"${totals['position_theta']:,.2f}")
+    
+    # Aggregate per linked event (both straddle legs share an event)
+    by_event = aggregate_greeks(book, by=['linked_event'])
+    st.dataframe(
+        by_event,
+        use_container_width=True,
+        hide_index=True,
+        column_config={
+            'linked_event': st.column_config.TextColumn("Event"),
+            'position_delta': st.column_config.NumberColumn("Delta", format="%.1f"),
+            'position_gamma': st.column_config.NumberColumn("Gamma", format="%.2f"),
+            'position_vega': st.column_config.NumberColumn("Vega", format="$%.2f"),
+            'position_theta': st.column_config.NumberColumn("Theta", format="$%.2f")
+        }
+    )
+
+def render_straddle_scenarios(book: pd.DataFrame):
+    st.subheader("🧮 Straddle Scenarios")
+    
+    # Group legs by linked event so each straddle is charted as a whole;
+    # unlinked legs fall back to their underlying
+    legs = book.reset_index()
+    legs['event_group'] = legs['linked_event'].fillna(legs['underlying'].astype(object))
+    
+    # A leg without an underlying price or expiration cannot be marked, and
+    # one NaN leg would turn every summed grid cell NaN
+    priced = legs['underlying_price'].notna() & legs['days_to_expiration'].notna()
+    if not priced.all():
+        st.caption(f"{(~priced).sum()} legs without an underlying price or expiration are left out of the scenarios.")
+    legs = legs[priced]
+    if legs.empty:
+        st.info("No priced legs to run scenarios on.")
+        return
+    
+    # Full book, every underlying moving by the same percentage
+    st.plotly_chart(
+        create_scenario_chart(scenario_grid(legs), "Full Book P&L by Underlying Move"),
+        use_container_width=True
+    )
+    
+    # Today, one and two weeks out, and held to the last leg's expiration
+    expiry = max(int(legs['days_to_expiration'].max()), 0)
+    days_forward = tuple(sorted({days for days in (0, 7, 14) if days <= expiry} | {expiry}))
+    
+    grids = group_scenarios(legs, 'event_group', days_forward=days_forward)
+    columns = st.columns(2)
+    for i, (event, grid) in enumerate(grids.items()):
+        event_legs = legs[legs['event_group'] == event]
+        underlying = event_legs['underlying'].iloc[0]
+        spot = event_legs['underlying_price'].iloc[0] if event_legs['underlying'].nunique() == 1 else None
+        title = event if event == underlying else f"{underlying} - {event}"
+        with columns[i % 2]:
+            st.plotly_chart(create_scenario_chart(grid, title, spot if pd.notna(spot) else None), use_container_width=True)
+
 def render_upcoming_opportunities(db: DatabaseManager):
     st.header("🔮 Upcoming Opportunities")
     
-    opportunities_df = db.get_upcoming_opportunities()
+    opportunities_df = load_upcoming_opportunities(table_versions('upcoming_events'))
     
     if opportunities_df.empty:
         st.info("No upcoming opportunities found.")
@@ -431,44 +749,62 @@ def render_upcoming_opportunities(db: DatabaseManager):
     cutoff_date = datetime.now().date() + timedelta(days=days_ahead)
     filtered_df = filtered_df[pd.to_datetime(filtered_df['event_date']).dt.date <= cutoff_date]
     
+    # Price every ticker on the page with one batched quote call
+    tickers = tuple(sorted(filtered_df['ticker'].dropna().unique()))
+    prices = get_latest_prices(tickers)
+    filtered_df = filtered_df.assign(
+        current_price=filtered_df['ticker'].map(prices),
+        price_trend=filtered_df['ticker'].map(get_price_trends(tickers))
+    )
+    
+    # How far each ticker has moved around its past decisions (event study)
+    moves = load_historical_moves(tickers).set_index('ticker')
+    filtered_df = filtered_df.assign(
+        mean_abs_move=filtered_df['ticker'].map(moves['mean_abs_move']) * 100,
+        past_decisions=filtered_df['ticker'].map(moves['past_decisions'])
+    )
+    
     # Display opportunities
-    for _, opp in filtered_df.iterrows():
-        with st.container():
-            col1, col2, col3, col4 = st.columns([2, 2, 1, 1])
-            
-            with col1:
-                st.write(f"**{opp['ticker']}** - {opp['event_name']}")
-            with col2:
-                st.write(f"📅 {opp['event_date']}")
-            with col3:
-                st.write(f"🏷️ {opp['event_type']}")
-            with col4:
-                current_price = get_current_stock_price(opp['ticker'])
-                if current_price:
-                    st.write(f"💰 ${current_price:.2f}")
-            
-            st.divider()
+    st.dataframe(
+        filtered_df[['ticker', 'event_name', 'event_date', 'event_type', 'current_price', 'price_trend', 'mean_abs_move', 'past_decisions']],
+        use_container_width=True,
+        hide_index=True,
+        column_config={
+            'ticker': st.column_config.TextColumn("Ticker"),
+            'event_name': st.column_config.TextColumn("Event", width="large"),
+            'event_date': st.column_config.DateColumn("📅 Date"),
+            'event_type': st.column_config.TextColumn("🏷️ Type"),
+            'current_price': st.column_config.NumberColumn("💰 Price", format="$%.2f"),
+            'price_trend': st.column_config.LineChartColumn("30d Trend"),
+            'mean_abs_move': st.column_config.NumberColumn("📈 Hist. |Move|", format="%.1f%%",
+                                                           help="Mean absolute abnormal return over days 0-1 of past decisions"),
+            'past_decisions': st.column_config.NumberColumn("Past Decisions", format="%d")
+        }
+    )
+
+TRADE_HISTORY_PAGE_SIZE = 50
 
 def render_trade_history(db: DatabaseManager):
     st.header("📚 Trade History")
     
-    history_df = db.get_trade_history()
+    versions = table_versions('event_positions')
+    tickers = load_trade_tickers(versions)
     
-    if history_df.empty:
+    if not tickers:
         st.info("No trade history found.")
         return
     
-    # Filter controls
+    # Filter controls (options come from DISTINCT queries, filtering runs in SQL)
     col1, col2, col3 = st.columns(3)
     with col1:
         ticker_filter = st.selectbox(
             "Filter by Ticker",
-            ["All"] + sorted(history_df['ticker'].dropna().unique())
+            ["All"] + tickers
         )
     with col2:
         event_type_filter = st.selectbox(
             "Filter by Event Type",
-            ["All"] + list(history_df['event_type'].unique())
+            ["All"] + load_trade_event_types(versions)
         )
     with col3:
         option_type_filter = st.selectbox(
@@ -476,27 +812,53 @@ def render_trade_history(db: DatabaseManager):
             ["All", "CALL", "PUT"]
         )
     
-    # Apply filters
-    filtered_df = history_df.copy()
-    if ticker_filter != "All":
-        filtered_df = filtered_df[filtered_df['ticker'] == ticker_filter]
-    if event_type_filter != "All":
-        filtered_df = filtered_df[filtered_df['event_type'] == event_type_filter]
-    if option_type_filter != "All":
-        filtered_df = filtered_df[filtered_df['call_put'] == option_type_filter]
-    
-    # Display trade history table
-    display_cols = ['ticker', 'symbol', 'call_put', 'strike', 'expiration', 'entry_price', 'quantity', 'linked_event', 'event_date']
-    st.dataframe(filtered_df[display_cols], use_container_width=True)
-    
-    # Export to CSV
-    if st.button("📥 Export to CSV"):
-        csv = filtered_df.to_csv(index=False)
+    filters = tuple(None if value == "All" else value
+                    for value in (ticker_filter, event_type_filter, option_type_filter))
+    
+    # Keyset cursors of the pages visited so far; reset whenever a filter changes
+    if st.session_state.get('history_filters') != filters:
+        st.session_state['history_filters'] = filters
+        st.session_state['history_cursors'] = [None]
+    cursors = st.session_state['history_cursors']
+    
+    page_df = load_trade_history_page(versions, *filters, cursors[-1], TRADE_HISTORY_PAGE_SIZE + 1)
+    has_next = len(page_df) > TRADE_HISTORY_PAGE_SIZE
+    page_df = page_df.head(TRADE_HISTORY_PAGE_SIZE)
+    
+    if page_df.empty:
+        st.info("No trades match the selected filters.")
+    else:
+        # Display trade history table
+        display_cols = ['ticker', 'symbol', 'call_put', 'strike', 'expiration', 'entry_price', 'quantity', 'linked_event', 'event_date']
+        st.dataframe(page_df[display_cols], use_container_width=True)
+    
+    prev_col, page_col, next_col = st.columns([1, 2, 1])
+    with prev_col:
+        if st.button("◀ Previous", disabled=len(cursors) == 1):
+            cursors.pop()
+            st.rerun()
+    with page_col:
+        st.caption(f"Page {len(cursors)}")
+    with next_col:
+        if st.button("Next ▶", disabled=not has_next):
+            last = page_df.iloc[-1]
+            cursors.append((last['expiration'], last['symbol']))
+            st.rerun()
+    
+    # Export the full filtered history (all pages). The file is written only
+    # when the button is clicked (deferred data), and reused until the view
+    # or filters change
+    export_col, format_col = st.columns([1, 3])
+    with format_col:
+        export_format = st.radio("Export format", list(EXPORT_FORMATS), horizontal=True, label_visibility="collapsed")
+    extension, mime = EXPORT_FORMATS[export_format]
+    with export_col:
         st.download_button(
-            label="Download CSV file",
-            data=csv,
-            file_name=f"trade_history_{datetime.now().strftime('%Y%m%d')}.csv",
-            mime="text/csv"
+            label=f"📥 Export to {export_format}",
+            data=lambda: export_trade_history(versions, filters, export_format).read_bytes(),
+            file_name=f"trade_history_{datetime.now().strftime('%Y%m%d')}.{extension}",
+            mime=mime,
+            on_click="ignore"
         )
 
 def render_event_management(db: DatabaseManager):
@@ -3,16 +3,58 @@
 from config import dbConfig, alpacaConfig
 from data_inflows import ClinicalTrialsAggregator
 from data_inflows import PDUFAManager, PDUFAScraper
+from data_inflows import update_company_prices
 from trading.order_placer import AlpacaTradingClient
-from utils import BiotechScreener
+from utils import BiotechScreener, refresh_event_views, run_migrations
+from utils.logger import LOG_DIR, Logger
+from utils.profiling import print_profile_diff, profile_run
+from analytics.event_study import BENCHMARK, run_event_study
 
 import sys
+from contextlib import nullcontext
+from datetime import datetime
 
 #from alpaca.trading.requests import GetOptionContractsRequest
 
 #import requests
 
 def main():
+    # --profile works with every subcommand: cProfile + time breakdown written next to the log
+    profile = "--profile" in sys.argv
+    if profile:
+        sys.argv.remove("--profile")
+
+    if(sys.argv[1] == "profile_diff"):
+        print_profile_diff(sys.argv[2], sys.argv[3])
+        return
+
+    # Console output plus a JSON-lines file per run (logs/<subcommand>_<timestamp>.jsonl)
+    logger = Logger(level="INFO", log_to_file=True,
+                    file_path=LOG_DIR / f"{sys.argv[1]}_{datetime.now():%Y%m%d_%H%M%S}.jsonl")
+    profiler = profile_run(logger.file_path, " ".join(sys.argv[1:])) if profile else nullcontext()
+    with logger.context(job=sys.argv[1]), profiler:
+        run_command(logger)
+    logger.log_span_summary()
+
+
+def run_command(logger):
+    if(sys.argv[1] == "migrate"):
+        run_migrations(dbConfig)
+        return
+
+    if(sys.argv[1] == "refresh_views"):
+        refresh_event_views(dbConfig)
+        return
+
+    if(sys.argv[1] == "update_prices"):
+        intervals = sys.argv[2].split(",") if len(sys.argv) > 2 else ["1d"]
+        update_company_prices(dbConfig, intervals, extra_tickers=[BENCHMARK])
+        return
+
+    if(sys.argv[1] == "event_study"):
+        run_event_study(dbConfig)
+        return
+
     # Initialize the ClinicalTrialsAggregator with the database configuration
 
     aggregator = ClinicalTrialsAggregator(dbConfig)
@@ -20,18 +62,20 @@ def main():
     pdufa_manager = PDUFAManager(db_settings=dbConfig)
     biotech_screener = BiotechScreener()
     if(sys.argv[1] == "scrape_pdufa"):
-        print("Scraping PDUFA data...")
+        logger.info("Scraping PDUFA data...")
         results = pdufa_manager.pull_records()
         companies = results['companies']
 
         companies = biotech_screener.screen_biotech_companies(companies)
 
         pdufa_manager.write_records_to_db(results['records'])
+        refresh_event_views(dbConfig)
 
     # Define the companies to fetch trials for
     # Fetch upcoming trials and save to CSV
     if(sys.argv[1] == "fetch_trials"):
         aggregator.fetch_upcoming_trials_v2()
+        refresh_event_views(dbConfig)
 
     if(sys.argv[1] == "run_trades"):
         trader.run()
@@ -46,4 +90,4 @@ if __name__ == "__main__":
     #load_companies(dbConfig)
     main()
     #test()
-    print("Program finished successfully.")
\ No newline at end of file
+    Logger().info("Program finished successfully.")
\ No newline at end of file
@@ -0,0 +1,323 @@
+"""
+Alpaca Gateway
+Shared asyncio client for Alpaca's trading and market data REST APIs.
+
+One aiohttp connection pool (keep-alive) is used for every call, identical
+in-flight GET requests are deduplicated, single-symbol quote lookups are
+coalesced into multi-symbol calls and Alpaca's per-account rate limit is
+enforced in one place. Responses are returned as alpaca-py models so callers
+can use them exactly like TradingClient results.
+
+Synchronous code (the trader, the Streamlit dashboard) drives the gateway
+through run(), which executes coroutines on the gateway's own event loop
+thread so the pool survives across calls.
+"""
+import asyncio
+import atexit
+import threading
+import time
+from enum import Enum
+from typing import Dict, Iterable, List, Optional
+
+import aiohttp
+from alpaca.data.models import Quote
+from alpaca.trading.models import Asset, Clock, OptionContractsResponse, Order, Position
+
+from utils.logger import get_logger
+
+logger = get_logger("trading")
+
+PAPER_TRADING_URL = "https://paper-api.alpaca.markets"
+LIVE_TRADING_URL = "https://api.alpaca.markets"
+DATA_URL = "https://data.alpaca.markets"
+
+# Alpaca allows 200 REST calls per minute per account
+RATE_LIMIT_PER_MINUTE = 200
+MAX_CONNECTIONS = 10
+MAX_RETRIES = 3
+
+# Symbols per multi-symbol quote request, and how long single-symbol quote
+# lookups wait to be coalesced into one of those requests
+QUOTE_BATCH_SIZE = 100
+QUOTE_BATCH_WINDOW = 0.01
+
+
+class AlpacaGatewayError(Exception):
+    """Raised when Alpaca answers with a non-success status"""
+
+    def __init__(self, status: int, endpoint: str, message: str):
+        super().__init__(f"{endpoint} returned {status}: {message}")
+        self.status = status
+        self.endpoint = endpoint
+
+
+class _RateLimiter:
+    """Token bucket refilled continuously up to the per-minute allowance"""
+
+    def __init__(self, rate_per_minute: int):
+        self.capacity = float(rate_per_minute)
+        self.tokens = float(rate_per_minute)
+        self.fill_rate = rate_per_minute / 60.0
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.fill_rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.fill_rate)
+
+
+def _clean_params(params: Optional[dict]) -> Dict[str, str]:
+    """Make request params hashable and acceptable to aiohttp"""
+    cleaned = {}
+    for key, value in (params or {}).items():
+        if value is None:
+            continue
+        if isinstance(value, Enum):
+            value = value.value
+        if isinstance(value, bool):
+            value = "true" if value else "false"
+        elif isinstance(value, (list, tuple, set)):
+            value = ",".join(str(v.value if isinstance(v, Enum) else v) for v in value)
+        cleaned[key] = str(value)
+    return cleaned
+
+
+class AlpacaGateway:
+    def __init__(self, api_key: str, secret_key: str, paper: bool = True,
+                 rate_limit_per_minute: int = RATE_LIMIT_PER_MINUTE,
+                 max_connections: int = MAX_CONNECTIONS, stock_feed: str = "iex"):
+        self.trading_url = PAPER_TRADING_URL if paper else LIVE_TRADING_URL
+        self.stock_feed = stock_feed
+        self.max_connections = max_connections
+        self._headers = {
+            'APCA-API-KEY-ID': api_key,
+            'APCA-API-SECRET-KEY': secret_key,
+        }
+
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._rate_limiter = _RateLimiter(rate_limit_per_minute)
+        self._inflight: Dict[tuple, asyncio.Future] = {}
+        self._pending_quotes: Dict[str, List[asyncio.Future]] = {}
+        self._quote_flush_handle = None
+
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="alpaca-gateway", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def run(self, coro, timeout: Optional[float] = None):
+        """Run a gateway coroutine from synchronous code and wait for the result"""
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result(timeout)
+
+    def close(self):
+        """Close the connection pool and stop the event loop thread"""
+        if not self._loop.is_running():
+            return
+        if self._session is not None and not self._session.closed:
+            self.run(self._session.close())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+    # ------------------------------------------------------------------
+    # Transport
+    # ------------------------------------------------------------------
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.max_connections, keepalive_timeout=60, ttl_dns_cache=300)
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                headers=self._headers,
+                timeout=aiohttp.ClientTimeout(total=30)
+            )
+        return self._session
+
+    async def _request(self, method: str, endpoint: str, url: str, params: Optional[dict] = None, json_body: Optional[dict] = None):
+        params = _clean_params(params)
+        if method != "GET":
+            return await self._send(method, endpoint, url, params, json_body)
+
+        # Concurrent identical GETs share one request
+        key = (url, tuple(sorted(params.items())))
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._send(method, endpoint, url, params, None))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def _send(self, method: str, endpoint: str, url: str, params: Dict[str, str], json_body: Optional[dict]):
+        session = self._get_session()
+        for attempt in range(1, MAX_RETRIES + 1):
+            await self._rate_limiter.acquire()
+            start = time.perf_counter()
+            try:
+                async with session.request(method, url, params=params or None, json=json_body) as response:
+                    if response.status == 429 and attempt < MAX_RETRIES:
+                        self._record(endpoint, time.perf_counter() - start, error=True)
+                        await asyncio.sleep(float(response.headers.get('Retry-After', attempt)))
+                        continue
+                    if response.status >= 400:
+                        message = await response.text()
+                        raise AlpacaGatewayError(response.status, endpoint, message)
+                    # DELETE /v2/orders/{id} answers 204 with no body
+                    data = await response.json() if response.status != 204 else None
+            except Exception:
+                self._record(endpoint, time.perf_counter() - start, error=True)
+                raise
+            self._record(endpoint, time.perf_counter() - start)
+            return data
+
+    def _record(self, endpoint: str, elapsed: float, error: bool = False):
+        """Per-endpoint latency goes into the run's span summary (logger.log_span_summary)"""
+        logger.record_span(f"alpaca.{endpoint}", elapsed, error)
+
+    # ------------------------------------------------------------------
+    # Trading API
+    # ------------------------------------------------------------------
+
+    async def get_all_positions(self) -> List[Position]:
+        data = await self._request("GET", "positions", f"{self.trading_url}/v2/positions")
+        return [Position(**position) for position in data]
+
+    async def get_clock(self) -> Clock:
+        data = await self._request("GET", "clock", f"{self.trading_url}/v2/clock")
+        return Clock(**data)
+
+    async def get_all_assets(self, filter=None) -> List[Asset]:
+        params = filter.to_request_fields() if filter else None
+        data = await self._request("GET", "assets", f"{self.trading_url}/v2/assets", params)
+        return [Asset(**asset) for asset in data]
+
+    async def get_option_contracts(self, request) -> OptionContractsResponse:
+        data = await self._request("GET", "options/contracts", f"{self.trading_url}/v2/options/contracts",
+                                   request.to_request_fields())
+        return OptionContractsResponse(**data)
+
+    async def submit_order(self, order_data) -> Order:
+        data = await self._request("POST", "orders", f"{self.trading_url}/v2/orders",
+                                   json_body=order_data.to_request_fields())
+        return Order(**data)
+
+    async def get_order(self, order_id) -> Order:
+        data = await self._request("GET", "orders", f"{self.trading_url}/v2/orders/{order_id}")
+        return Order(**data)
+
+    async def cancel_order(self, order_id):
+        await self._request("DELETE", "orders/cancel", f"{self.trading_url}/v2/orders/{order_id}")
+
+    async def close_position(self, symbol: str, qty: Optional[float] = None) -> Order:
+        data = await self._request("DELETE", "positions/close", f"{self.trading_url}/v2/positions/{symbol}",
+                                   {'qty': qty})
+        return Order(**data)
+
+    async def _unwind_order(self, order: Order):
+        """Cancel an order and close whatever part of it already filled"""
+        try:
+            await self.cancel_order(order.id)
+        except AlpacaGatewayError as e:
+            # 422: no longer cancelable, i.e. already filled
+            if e.status != 422:
+                raise
+        filled_qty = float((await self.get_order(order.id)).filled_qty or 0)
+        if filled_qty:
+            await self.close_position(order.symbol, filled_qty)
+
+    async def submit_orders(self, orders: Iterable) -> List[Order]:
+        """
+        Submit several orders concurrently, results in input order. The orders
+        are legs of one position (a straddle): if any leg is rejected, the legs
+        that were placed are cancelled or closed and the first error is raised.
+        """
+        results = await asyncio.gather(*(self.submit_order(order) for order in orders), return_exceptions=True)
+        errors = [result for result in results if isinstance(result, BaseException)]
+        if not errors:
+            return list(results)
+
+        placed = [result for result in results if not isinstance(result, BaseException)]
+        logger.error(f"{len(errors)} of {len(results)} legs failed ({errors[0]}); unwinding {len(placed)} placed legs",
+                     symbols=[order.symbol for order in placed])
+        unwound = await asyncio.gather(*(self._unwind_order(order) for order in placed), return_exceptions=True)
+        for order, outcome in zip(placed, unwound):
+            if isinstance(outcome, BaseException):
+                logger.critical(f"Could not unwind order {order.id} for {order.symbol}: {outcome}; "
+                                f"the position may be left open", order=str(order.id), symbol=order.symbol)
+            else:
+                logger.warning(f"Unwound order {order.id} for {order.symbol}", order=str(order.id), symbol=order.symbol)
+        raise errors[0]
+
+    # ------------------------------------------------------------------
+    # Market data API
+    # ------------------------------------------------------------------
+
+    async def _get_latest_quotes(self, endpoint: str, url: str, symbols: Iterable[str], extra_params: dict) -> Dict[str, Quote]:
+        symbols = sorted(set(symbols))
+        chunks = [symbols[i:i + QUOTE_BATCH_SIZE] for i in range(0, len(symbols), QUOTE_BATCH_SIZE)]
+        responses = await asyncio.gather(*(
+            self._request("GET", endpoint, url, {'symbols': chunk, **extra_params}) for chunk in chunks
+        ))
+
+        quotes = {}
+        for data in responses:
+            for symbol, raw_quote in (data.get('quotes') or {}).items():
+                quotes[symbol] = Quote(symbol, raw_quote)
+        return quotes
+
+    async def get_latest_quotes(self, symbols: Iterable[str]) -> Dict[str, Quote]:
+        """Latest stock quotes for many symbols using multi-symbol requests"""
+        return await self._get_latest_quotes("stocks/quotes/latest", f"{DATA_URL}/v2/stocks/quotes/latest",
+                                             symbols, {'feed': self.stock_feed})
+
+    async def get_latest_option_quotes(self, symbols: Iterable[str]) -> Dict[str, Quote]:
+        """Latest option quotes for many OCC symbols using multi-symbol requests"""
+        return await self._get_latest_quotes("options/quotes/latest", f"{DATA_URL}/v1beta1/options/quotes/latest",
+                                             symbols, {'feed': 'indicative'})
+
+    async def get_latest_quote(self, symbol: str) -> Optional[Quote]:
+        """Latest stock quote for one symbol, coalesced with concurrent lookups"""
+        future = self._loop.create_future()
+        self._pending_quotes.setdefault(symbol, []).append(future)
+        if self._quote_flush_handle is None:
+            self._quote_flush_handle = self._loop.call_later(QUOTE_BATCH_WINDOW, self._flush_quotes)
+        return await future
+
+    def _flush_quotes(self):
+        pending, self._pending_quotes = self._pending_quotes, {}
+        self._quote_flush_handle = None
+        task = self._loop.create_task(self.get_latest_quotes(pending.keys()))
+
+        def resolve(task):
+            error = task.exception() if not task.cancelled() else asyncio.CancelledError()
+            for symbol, futures in pending.items():
+                for future in futures:
+                    if future.done():
+                        continue
+                    if error:
+                        future.set_exception(error)
+                    else:
+                        future.set_result(task.result().get(symbol))
+
+        task.add_done_callback(resolve)
+
+
+_gateways: Dict[tuple, AlpacaGateway] = {}
+_gateways_lock = threading.Lock()
+
+
+def get_gateway(alpaca_config, paper: bool = True) -> AlpacaGateway:
+    """Process-wide gateway for the given credentials"""
+    key = (alpaca_config.ALPACA_API_KEY, paper)
+    with _gateways_lock:
+        if key not in _gateways:
+            _gateways[key] = AlpacaGateway(
+                alpaca_config.ALPACA_API_KEY,
+                alpaca_config.ALPACA_SECRET_KEY,
+                paper=paper
+            )
+        return _gateways[key]
@@ -1,17 +1,24 @@
 import psycopg as ppg
 from datetime import datetime, timedelta
-from alpaca.trading.client import TradingClient
 from alpaca.trading.requests import MarketOrderRequest
 from alpaca.trading.enums import OrderSide, TimeInForce
 from alpaca.trading.requests import GetOptionContractsRequest
 import yfinance as yf
 
+from .alpaca_gateway import get_gateway
+from utils.event_views import refresh_event_views
+from utils.logger import get_logger
+from utils.option_symbols import parse_option_symbols
+
+logger = get_logger("trading")
+
 class AlpacaTradingClient:
     def __init__(self, db_config, alpaca_config):
         """
         Initialize database and trading connections
         """
         # Database connection
+        self.db_config = db_config
         self.conn = ppg.connect(
             dbname=db_config.DB_NAME,
             user=db_config.DB_USER,
@@ -20,12 +27,8 @@ class AlpacaTradingClient:
         )
         self.cursor = self.conn.cursor()
 
-        # Alpaca client
-        self.trading_client = TradingClient(
-            alpaca_config.ALPACA_API_KEY,
-            alpaca_config.ALPACA_SECRET_KEY,
-            paper=True  # Use paper trading
-        )
+        # Shared Alpaca gateway (paper trading)
+        self.gateway = get_gateway(alpaca_config, paper=True)
 
     def __del__(self):
         """
@@ -76,11 +79,12 @@ class AlpacaTradingClient:
         try:
             # Get current stock price using yfinance
             stock = yf.Ticker(ticker)
-            current_price = stock.info['regularMarketPrice']
+            with logger.span("yfinance.info", ticker=ticker):
+                current_price = stock.info['regularMarketPrice']
             
             return current_price
         except Exception as e:
-            print(f"Error getting stock price for {ticker}: {e}")
+            logger.error(f"Error getting stock price for {ticker}: {e}")
             return None
 
     def get_best_contract(self, ticker, target_date):
@@ -94,56 +98,56 @@ class AlpacaTradingClient:
             date_upper_bound = target_date + timedelta(days=15)
 
             optionContractsRequest = GetOptionContractsRequest(root_symbol=ticker, style="american", type="call", expiration_date_gte=date_lower_bound.strftime('%Y-%m-%d'), expiration_date_lte=date_upper_bound.strftime('%Y-%m-%d'), strike_price_gte=str(strike_price_lower_bound), strike_price_lte=str(strike_price_upper_bound))
-            optionResponse = self.trading_client.get_option_contracts(optionContractsRequest)
+            optionResponse = self.gateway.run(self.gateway.get_option_contracts(optionContractsRequest))
             if not optionResponse.option_contracts:
-                print(f"No option contracts found for {ticker} within the specified bounds.")
+                logger.info(f"No option contracts found for {ticker} within the specified bounds.")
                 return None, None
             
             atm_strike = min([float(option.strike_price) for option in optionResponse.option_contracts if option.strike_price is not None], key=lambda x: abs(x - stock_price))
 
             best_date = min(optionResponse.option_contracts, key=lambda x: abs(x.expiration_date - target_date)).expiration_date
-            print("Best Date: ", best_date)
-            print("Best Date type: ", type(best_date))
+            logger.debug(f"Best Date: {best_date}")
 
-            best_options = self.trading_client.get_option_contracts(GetOptionContractsRequest(root_symbol=ticker, expiration_date=best_date, style="american", strike_price_gte=str(atm_strike), strike_price_lte=str(atm_strike)))
+            best_options = self.gateway.run(self.gateway.get_option_contracts(GetOptionContractsRequest(root_symbol=ticker, expiration_date=best_date, style="american", strike_price_gte=str(atm_strike), strike_price_lte=str(atm_strike))))
             return best_options.option_contracts[0], best_options.option_contracts[1]
 
 
     def write_trades_to_db(self, call, put, order_qty: int, filled_price, study_nctid: str, record_id: int):
-        print("Writing trades to DB...")
+        logger.info("Writing trades to DB...")
         try:
-            self.cursor.execute(
-                """
-                INSERT INTO trades (symbol, call_put, ticker, expiration, strike, premium, study_id, regulatory_id, quantity)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-                ON CONFLICT (symbol) DO NOTHING
-                """,
-                (call.symbol, 'CALL', call.root_symbol, call.expiration_date, call.strike_price, filled_price[0], study_nctid, record_id, order_qty))
-
-
-            self.cursor.execute(
-                """
-                INSERT INTO trades (symbol, call_put, ticker, expiration, strike, premium, study_id, regulatory_id, quantity)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-                ON CONFLICT (symbol) DO NOTHING
-                """,
-                (put.symbol, 'PUT', put.root_symbol, put.expiration_date, put.strike_price, filled_price[1], study_nctid, record_id, order_qty))
-
-            if(study_nctid):
+            with logger.span("db.trades.write"):
                 self.cursor.execute(
-                    "UPDATE clinical_trials SET traded = TRUE WHERE nctid = %s",
-                    (study_nctid,)
-                )
-            elif(record_id):
+                    """
+                    INSERT INTO trades (symbol, call_put, ticker, expiration, strike, premium, study_id, regulatory_id, quantity)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+                    ON CONFLICT (symbol) DO NOTHING
+                    """,
+                    (call.symbol, 'CALL', call.root_symbol, call.expiration_date, call.strike_price, filled_price[0], study_nctid, record_id, order_qty))
+
+
                 self.cursor.execute(
-                    "UPDATE regulatory_decisions SET traded = TRUE WHERE id = %s",
-                    (record_id,)
-                )
-            self.conn.commit()
-            print("Trades written to DB successfully.")
+                    """
+                    INSERT INTO trades (symbol, call_put, ticker, expiration, strike, premium, study_id, regulatory_id, quantity)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+                    ON CONFLICT (symbol) DO NOTHING
+                    """,
+                    (put.symbol, 'PUT', put.root_symbol, put.expiration_date, put.strike_price, filled_price[1], study_nctid, record_id, order_qty))
+
+                if(study_nctid):
+                    self.cursor.execute(
+                        "UPDATE clinical_trials SET traded = TRUE WHERE nctid = %s",
+                        (study_nctid,)
+                    )
+                elif(record_id):
+                    self.cursor.execute(
+                        "UPDATE regulatory_decisions SET traded = TRUE WHERE id = %s",
+                        (record_id,)
+                    )
+                self.conn.commit()
+            logger.info("Trades written to DB successfully.")
             return
         except Exception as e:
-            print(f"Error writing trades to DB: {e}")
+            logger.error(f"Error writing trades to DB: {e}")
             self.conn.rollback()
             return
 
@@ -157,37 +161,36 @@ class AlpacaTradingClient:
 
         best_call, best_put = self.get_best_contract(ticker, target_date)
         if not best_call or not best_put:
-            print(f"No suitable options found for {ticker} on {target_date_str}")
+            logger.info(f"No suitable options found for {ticker} on {target_date_str}")
             return 1, None
         try:
             order_quantity = 1
-            # Place call order
+            # Call order
             call_order = MarketOrderRequest(
                 symbol=best_call.symbol,
                 qty=order_quantity,
                 side=OrderSide.BUY,
                 time_in_force=TimeInForce.DAY
             )
-            call_result = self.trading_client.submit_order(call_order)
             
-            # Place put order
+            # Put order
             put_order = MarketOrderRequest(
                 symbol=best_put.symbol,
                 qty=order_quantity,
                 side=OrderSide.BUY,
                 time_in_force=TimeInForce.DAY
             )
-            put_result = self.trading_client.submit_order(put_order)
+
+            # Submit both legs of the straddle concurrently
+            call_result, put_result = self.gateway.run(self.gateway.submit_orders([call_order, put_order]))
 
             self.write_trades_to_db(call=best_call, put=best_put, order_qty=order_quantity, filled_price=(call_result.filled_avg_price, put_result.filled_avg_price), study_nctid=study_nctid, record_id=record_id)
             
-            print(f"Placed orders for {ticker}")
-            print(f"Call order: {call_result.id}")
-            print(f"Put order: {put_result.id}")
+            logger.info(f"Placed orders for {ticker}", call_order=str(call_result.id), put_order=str(put_result.id))
             return 0, None
             
         except Exception as e:
-            print(f"Error placing orders for {ticker}: {e}")
+            logger.error(f"Error placing orders for {ticker}: {e}")
             return 2, str(e)
 
     def trade_on_studies(self):
@@ -198,26 +201,27 @@ class AlpacaTradingClient:
             # Get upcoming studies
             studies = self.get_upcoming_studies()
             if not studies:
-                print("No upcoming studies found within 2 months")
+                logger.info("No upcoming studies found within 2 months")
                 return
 
-            print(f"Found {len(studies)} upcoming studies")
+            logger.info(f"Found {len(studies)} upcoming studies")
             
             # Place orders for each study
             for study in studies:
-                print(f"\nProcessing study {study[0]} for {study[4]}")
+                logger.info(f"Processing study {study[0]} for {study[4]}", event_id=study[0])
                 ticker = study[5]
                 if not ticker:
-                    print(f"No ticker found for study {study[0]}")
+                    logger.warning(f"No ticker found for study {study[0]}", event_id=study[0])
                     continue
                 target_date = study[3] + timedelta(days=60)
 
-                return_code, error_code = self.place_option_orders(ticker, target_date, study_nctid=study[0], record_id=None)
+                with logger.context(event_id=study[0], ticker=ticker):
+                    return_code, error_code = self.place_option_orders(ticker, target_date, study_nctid=study[0], record_id=None)
                 if return_code == 1:
-                    print(f"No suitable options found for {ticker} on {target_date}")
+                    logger.info(f"No suitable options found for {ticker} on {target_date}", event_id=study[0])
                     continue
                 elif return_code == 2:
-                    print(f"Error placing orders for {ticker}: {error_code}")
+                    logger.error(f"Error placing orders for {ticker}: {error_code}", event_id=study[0])
                     continue
                 self.cursor.execute(
                     "UPDATE clinical_trials SET traded = TRUE WHERE nctid = %s",
@@ -226,7 +230,7 @@ class AlpacaTradingClient:
                 self.conn.commit()
         
         except Exception as e:
-            print(f"Error in run process: {e}")
+            logger.error(f"Error in run process: {e}")
             self.conn.rollback()
 
     def trade_on_regulatory_decisions(self):
@@ -237,30 +241,31 @@ class AlpacaTradingClient:
             # Get upcoming regulatory decisions
             decisions = self.get_upcoming_regulatory_decisions()
             if not decisions:
-                print("No upcoming regulatory decisions found within 15 days")
+                logger.info("No upcoming regulatory decisions found within 15 days")
                 return
 
-            print(f"Found {len(decisions)} upcoming regulatory decisions")
+            logger.info(f"Found {len(decisions)} upcoming regulatory decisions")
             
             # Place orders for each decision
             for decision in decisions:
                 # decision columns: id, useu, ticker, drug_name, date, status, decision, traded
-                print(f"\nProcessing regulatory decision for {decision[3]} ({decision[2]})")
+                logger.info(f"Processing regulatory decision for {decision[3]} ({decision[2]})", event_id=decision[0])
                 ticker = decision[2]
                 if not ticker:
-                    print(f"No ticker found for regulatory decision {decision[0]}")
+                    logger.warning(f"No ticker found for regulatory decision {decision[0]}", event_id=decision[0])
                     continue
                 
                 # Target expiration date is 2 weeks after the regulatory decision date
                 target_date = decision[4] + timedelta(days=14)
                 
-                return_code, error_code = self.place_option_orders(ticker, target_date, record_id=decision[7])
+                with logger.context(event_id=decision[0], ticker=ticker):
+                    return_code, error_code = self.place_option_orders(ticker, target_date, record_id=decision[7])
 
                 if return_code == 1:
-                    print(f"No suitable options found for {ticker} on {target_date}")
+                    logger.info(f"No suitable options found for {ticker} on {target_date}", event_id=decision[0])
                     continue
                 elif return_code == 2:
-                    print(f"Error placing orders for {ticker}: {error_code}")
+                    logger.error(f"Error placing orders for {ticker}: {error_code}", event_id=decision[0])
                     continue
 
                 # Mark as traded in database
@@ -271,16 +276,51 @@ class AlpacaTradingClient:
                 self.conn.commit()
         
         except Exception as e:
-            print(f"Error in trade_on_regulatory_decisions: {e}")
+            logger.error(f"Error in trade_on_regulatory_decisions: {e}")
             self.conn.rollback()
 
 
+    def reconcile_positions(self):
+        """
+        Check held option positions against the trades table.
+        Returns the held option legs that have no matching trade row.
+        """
+        try:
+            positions = self.gateway.run(self.gateway.get_all_positions())
+        except Exception as e:
+            logger.error(f"Error fetching positions for reconciliation: {e}")
+            return None
+
+        held = parse_option_symbols([position.symbol for position in positions])
+        held = held[held['is_option']]
+        if held.empty:
+            logger.info("No option positions to reconcile")
+            return held
+
+        self.cursor.execute(
+            "SELECT symbol, linked_event FROM event_positions WHERE symbol = ANY(%s)",
+            (held['symbol'].tolist(),)
+        )
+        linked_events = dict(self.cursor.fetchall())
+        unrecorded = held[~held['symbol'].isin(linked_events.keys())]
+        expiring = held[held['days_to_expiration'] <= 1]
+
+        logger.info(f"Reconciled {len(held)} option positions: {len(unrecorded)} without a trade record, {len(expiring)} expiring within a day")
+        for leg in unrecorded.itertuples():
+            logger.warning(f"  Unrecorded: {leg.symbol} ({leg.underlying} {leg.option_type} {leg.strike} exp {leg.expiration.date()})")
+        for leg in expiring.itertuples():
+            logger.info(f"  Expiring: {leg.symbol} ({linked_events.get(leg.symbol) or 'no linked event'})")
+        return unrecorded
+
     def run(self):
         """
         Main method to run the order placement process
         """
         self.trade_on_studies()
-        self.trade_on_regulatory_decisions
+        self.trade_on_regulatory_decisions()
+        # Rebuild the event views so reconciliation sees this run's trades
+        refresh_event_views(self.db_config)
+        self.reconcile_positions()
 
 if __name__ == "__main__":
     from config.config import dbConfig, alpacaConfig
@@ -288,3 +328,5 @@ if __name__ == "__main__":
     # Initialize and run the order placer
     order_placer = AlpacaTradingClient(dbConfig, alpacaConfig)
     order_placer.run()
+    # Gateway latency per endpoint is part of the span summary
+    get_logger().log_span_summary()
@@ -1,3 +1,6 @@
 from .biotech_screener import BiotechScreener
-from .load_companies import load_companies
 from .add_clinical_trials_tags import enhance_with_clinical_trials_tags
+
+from .migrations import run_migrations
+from .option_symbols import parse_option_symbols
+from .event_views import refresh_event_views
@@ -6,8 +6,9 @@ Generates a list of publicly traded biotech companies and filters by Alpaca API
 
 
 from config.config import alpacaConfig, dbConfig
-from data_models.Company import Company
+from data_models import Company, CompanyBatch
 from .add_clinical_trials_tags import enhance_with_clinical_trials_tags
+from .logger import get_logger
 
 import yfinance as yf
 from alpaca.trading.client import TradingClient
@@ -15,13 +16,19 @@ from alpaca.trading.requests import GetAssetsRequest
 from alpaca.trading.enums import AssetClass, AssetStatus
 import psycopg as ppg
 
-import json
 import time
-from typing import Set, List
+from datetime import timedelta
+
+logger = get_logger("screener")
+
+# Pause between tickers to stay under the yfinance / Alpaca rate limits
+SCREEN_DELAY_SECONDS = 0.1
 
 class BiotechScreener:
-    def __init__(self):
+    def __init__(self, rescreen_after_days: int = 30):
         """Initialize the screener with Alpaca client"""
+        # Known companies older than this are screened again to refresh their data
+        self.rescreen_after = timedelta(days=rescreen_after_days)
         self.conn = ppg.connect(
             dbname=dbConfig.DB_NAME,
             user=dbConfig.DB_USER,
@@ -40,7 +47,8 @@ class BiotechScreener:
         """Get company information using yfinance"""
         try:
             stock = yf.Ticker(ticker)
-            info = stock.info
+            with logger.span("yfinance.info", ticker=ticker):
+                info = stock.info
             
             return {
                 'ticker': ticker,
@@ -53,19 +61,21 @@ class BiotechScreener:
                 'exchange': info.get('exchange', 'N/A')
             }
         except Exception as e:
-            print(f"Error getting info for {ticker}: {e}")
+            logger.error(f"Error getting info for {ticker}: {e}", ticker=ticker)
             return None
         
     def filter_already_in_db(self, tickers: set[str]):
-        """Check if tickers are already in the database"""
-        self.cursor.execute("SELECT ticker FROM companies")
-        existing_tickers = self.cursor.fetchall()
-        
-        for tick in existing_tickers:
-            if tick in tickers:
-                tickers.remove(tick)
+        """Drop tickers that are already in the database and were screened recently"""
+        self.cursor.execute(
+            """
+            SELECT ticker FROM companies
+            WHERE ticker = ANY(%s) AND updated_at >= now() - %s
+            """,
+            (list(tickers), self.rescreen_after)
+        )
+        fresh_tickers = {row[0] for row in self.cursor.fetchall()}
 
-        return tickers
+        return set(tickers) - fresh_tickers
     
     def check_alpaca_tradability(self, ticker):
         """Check if a ticker is tradable on Alpaca"""
@@ -75,7 +85,8 @@ class BiotechScreener:
                 status=AssetStatus.ACTIVE,
                 asset_class=AssetClass.US_EQUITY
             )
-            assets = self.trading_client.get_all_assets(search_request)
+            with logger.span("alpaca.assets", ticker=ticker):
+                assets = self.trading_client.get_all_assets(search_request)
             
             # Check if ticker exists in Alpaca assets
             for asset in assets:
@@ -91,7 +102,7 @@ class BiotechScreener:
             return {'tradable': False}
             
         except Exception as e:
-            print(f"Error checking Alpaca tradability for {ticker}: {e}")
+            logger.error(f"Error checking Alpaca tradability for {ticker}: {e}", ticker=ticker)
             return {'tradable': False, 'error': str(e)}
     
     def categorize_by_market_cap(self, market_cap):
@@ -109,16 +120,15 @@ class BiotechScreener:
     
     def screen_biotech_companies(self, tickers):
         """Main screening function"""
-        results = []
-        tradable_companies = []
+        results = CompanyBatch()
 
         tickers = self.filter_already_in_db(tickers)
         
-        print("Screening biotech companies...")
-        print(f"Total tickers to check: {len(tickers)}")
+        logger.info("Screening biotech companies...")
+        logger.info(f"Total tickers to check: {len(tickers)}")
         
         for i, ticker in enumerate(tickers, 1):
-            print(f"Processing {i}/{len(tickers)}: {ticker}")
+            logger.debug(f"Processing {i}/{len(tickers)}: {ticker}", ticker=ticker)
             
             # Get company info
             company_info = self.get_company_info(ticker)
@@ -147,66 +157,91 @@ class BiotechScreener:
             # Set search phrases for clinical trials
             result = enhance_with_clinical_trials_tags(result)
             
-            self.write_company_to_db(result)
+            results.append(result)
             
             # Small delay to avoid rate limiting
-            time.sleep(0.1)
+            time.sleep(SCREEN_DELAY_SECONDS)
+        
+        # One transaction for the whole batch instead of a commit per ticker
+        self.write_companies_to_db(results)
         
+        tradable_companies = results.filter(results.column('alpaca_tradable'))
         return results, tradable_companies
     
-    def write_company_to_db(self, company: Company):
-        """Insert or update the company in the database"""
+    def write_companies_to_db(self, companies: CompanyBatch):
+        """Bulk insert or update the screened companies in a single transaction"""
+        if not isinstance(companies, CompanyBatch):
+            companies = CompanyBatch.from_records(companies)
+        if not len(companies):
+            return
         try:
-            self.cursor.execute(
-                """
-                INSERT INTO companies (ticker, company_name, sector, industry, exchange, market_cap_category, alpaca_tradable, alpaca_shortable, alpaca_marginable, alpaca_fractionable, clinical_trials_search_phrases, primary_search_phrase)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                ON CONFLICT (ticker) DO NOTHING
-                """,
-                (
-                    company.ticker_symbol,
-                    company.company_name,
-                    company.sector,
-                    company.industry,
-                    company.exchange,
-                    company.market_cap_category,
-                    company.alpaca_tradable,
-                    company.alpaca_shortable,
-                    company.alpaca_marginable,
-                    company.alpaca_fractionable,
-                    ','.join(company.search_phrases),
-                    company.primary_search_phrase
-                ))
+            # psycopg pipelines executemany, so the batch costs one round trip.
+            # Rows are zipped straight from the columns (unnest would flatten
+            # the text[] search phrases)
+            with logger.span("db.companies.write", companies=len(companies)):
+                self.cursor.executemany(
+                    """
+                    INSERT INTO companies (ticker, company_name, sector, industry, exchange, market_cap_category, alpaca_tradable, alpaca_shortable, alpaca_marginable, alpaca_fractionable, clinical_trials_search_phrases, primary_search_phrase)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                    ON CONFLICT (ticker) DO UPDATE SET
+                        company_name = EXCLUDED.company_name,
+                        sector = EXCLUDED.sector,
+                        industry = EXCLUDED.industry,
+                        exchange = EXCLUDED.exchange,
+                        market_cap_category = EXCLUDED.market_cap_category,
+                        alpaca_tradable = EXCLUDED.alpaca_tradable,
+                        alpaca_shortable = EXCLUDED.alpaca_shortable,
+                        alpaca_marginable = EXCLUDED.alpaca_marginable,
+                        alpaca_fractionable = EXCLUDED.alpaca_fractionable,
+                        clinical_trials_search_phrases = EXCLUDED.clinical_trials_search_phrases,
+                        primary_search_phrase = EXCLUDED.primary_search_phrase,
+                        updated_at = now()
+                    """,
+                    zip(*(companies.column(name) for name in (
+                        'ticker_symbol',
+                        'company_name',
+                        'sector',
+                        'industry',
+                        'exchange',
+                        'market_cap_category',
+                        'alpaca_tradable',
+                        'alpaca_shortable',
+                        'alpaca_marginable',
+                        'alpaca_fractionable',
+                        'search_phrases',
+                        'primary_search_phrase'
+                    ))))
             self.conn.commit()
+            logger.info(f"Wrote {len(companies)} companies to database")
         except Exception as e:
-            print(f"Error writing {company.ticker_symbol} to database: {e}")
+            logger.error(f"Error writing {len(companies)} companies to database: {e}")
             self.conn.rollback()
     
     def print_summary(self, all_results, tradable_results):
         """Print summary of results"""
-        print(f"\n{'='*60}")
-        print("BIOTECH COMPANY SCREENING SUMMARY")
-        print(f"{'='*60}")
-        print(f"Total companies analyzed: {len(all_results)}")
-        print(f"Companies tradable on Alpaca: {len(tradable_results)}")
-        print(f"Alpaca tradability rate: {len(tradable_results)/len(all_results)*100:.1f}%")
+        logger.info(f"{'='*60}")
+        logger.info("BIOTECH COMPANY SCREENING SUMMARY")
+        logger.info(f"{'='*60}")
+        logger.info(f"Total companies analyzed: {len(all_results)}")
+        logger.info(f"Companies tradable on Alpaca: {len(tradable_results)}")
+        logger.info(f"Alpaca tradability rate: {len(tradable_results)/len(all_results)*100:.1f}%")
         
         # Market cap breakdown for tradable companies
         cap_categories = {}
         for company in tradable_results:
-            category = company['market_cap_category']
+            category = company.market_cap_category
             cap_categories[category] = cap_categories.get(category, 0) + 1
         
-        print(f"\nTradable companies by market cap:")
+        logger.info(f"Tradable companies by market cap:")
         for category, count in cap_categories.items():
-            print(f"  {category}: {count} companies")
+            logger.info(f"  {category}: {count} companies")
         
         # Top 10 tradable companies by market cap
-        tradable_sorted = sorted(tradable_results, key=lambda x: x['market_cap'], reverse=True)
-        print(f"\nTop 10 tradable biotech companies by market cap:")
+        tradable_sorted = sorted(tradable_results, key=lambda x: x.market_cap, reverse=True)
+        logger.info(f"Top 10 tradable biotech companies by market cap:")
         for i, company in enumerate(tradable_sorted[:10], 1):
-            market_cap_b = company['market_cap'] / 1_000_000_000
-            print(f"  {i:2d}. {company['ticker']:4s} - {company['company_name'][:40]:40s} ${market_cap_b:5.1f}B")
+            market_cap_b = company.market_cap / 1_000_000_000
+            logger.info(f"  {i:2d}. {company.ticker_symbol:4s} - {company.company_name[:40]:40s} ${market_cap_b:5.1f}B")
 
 def main():
     screener = BiotechScreener()
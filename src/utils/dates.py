@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+"""
+Date Normalizer
+Shared parser for the dates in scraped calendar text and API fields
+("PDUFA date of October 17, 2026", "4/14/2025", "Q4 2025", "2H 2026",
+"second half of 2026", "Aug 2025", "2027-09", "2025-04-18T00:00"). Every
+supported form contains a four-digit year, so the parser finds the years
+first and only looks at what touches each one: "/" before it (US dates),
+"-" after it (ISO dates) or the few words before it, checked with dict
+lookups rather than a regex over the whole string. Results are cached per
+string since calendars repeat the same phrases.
+
+Each result carries its precision (day, month, quarter or half) so
+approximate dates are not mistaken for exact ones. ParsedDate.start is the
+first day of the period; ParsedDate.mid is the mid-period anchor the RTT
+scraper has always used (the 15th, the middle month of a quarter, the 1st
+of the fourth month of a half).
+"""
+import calendar
+import re
+from datetime import date, datetime
+from functools import lru_cache
+from pathlib import Path
+from typing import List, NamedTuple, Optional, Tuple
+
+DAY = "day"
+MONTH = "month"
+QUARTER = "quarter"
+HALF = "half"
+
+# Length in months of each approximate precision
+PERIOD_MONTHS = {MONTH: 1, QUARTER: 3, HALF: 6}
+
+MONTHS = {
+    'january': 1, 'february': 2, 'march': 3, 'april': 4, 'may': 5, 'june': 6,
+    'july': 7, 'august': 8, 'september': 9, 'october': 10, 'november': 11, 'december': 12,
+    'jan': 1, 'feb': 2, 'mar': 3, 'apr': 4, 'jun': 6, 'jul': 7, 'aug': 8,
+    'sep': 9, 'sept': 9, 'oct': 10, 'nov': 11, 'dec': 12,
+}
+QUARTER_WORDS = {'first': 1, 'second': 2, 'third': 3, 'fourth': 4}
+HALF_WORDS = {'first': 1, 'second': 2}
+# Word before the year (or before "of") naming the period, and the ordinals it takes
+PERIOD_WORDS = {'quarter': (QUARTER, QUARTER_WORDS), 'half': (HALF, HALF_WORDS)}
+
+# Short forms as a whole word: Q4/4Q, H1/1H. "Q4" may also end a longer word
+PERIOD_TOKENS = {
+    **{f"q{n}": (QUARTER, n) for n in range(1, 5)},
+    **{f"{n}q": (QUARTER, n) for n in range(1, 5)},
+    **{f"h{n}": (HALF, n) for n in range(1, 3)},
+    **{f"{n}h": (HALF, n) for n in range(1, 3)},
+}
+
+# Numbers must not run on into other digits; names must start a word, but
+# anything else may touch the date (scraped text often lacks spaces). The
+# one exception is "Q42025", where the year follows the quarter directly
+YEAR_PATTERN = re.compile(r"(?:(?<!\d)|(?<=[Qq][1-4]))\d{4}(?!\d)")
+ISO_REST = re.compile(r"-(\d{1,2})(?:-(\d{1,2}))?(?![\d-])")
+US_PREFIX = re.compile(r"(?<!\d)(\d{1,2})/(\d{1,2})/$")
+LAST_LETTERS = re.compile(r"[a-z]*$")
+ORDINAL_SUFFIXES = ('st', 'nd', 'rd', 'th')
+
+CACHE_SIZE = 8192
+
+
+class ParsedDate(NamedTuple):
+    start: datetime
+    precision: str
+
+    @property
+    def mid(self) -> datetime:
+        if self.precision == MONTH:
+            return self.start.replace(day=15)
+        if self.precision == QUARTER:
+            return self.start.replace(month=self.start.month + 1, day=15)
+        if self.precision == HALF:
+            return self.start.replace(month=self.start.month + 3)
+        return self.start
+
+
+def _period(year: int, precision: str, number: int) -> ParsedDate:
+    """The number-th quarter or half of year"""
+    return ParsedDate(datetime(year, (number - 1) * PERIOD_MONTHS[precision] + 1, 1), precision)
+
+
+def _word(token: str) -> str:
+    """Lower-cased letters ending the token ("x,Oct" reads as "oct")"""
+    token = token.lower()
+    if token.isascii() and token.isalpha():
+        return token
+    return LAST_LETTERS.search(token).group()
+
+
+def _day(token: str) -> Optional[int]:
+    """Day number of a "17", "17," or "17th," token"""
+    token = token.lower().removesuffix(',')
+    if token.endswith(ORDINAL_SUFFIXES):
+        token = token[:-2]
+    return int(token) if len(token) <= 2 and token.isdecimal() else None
+
+
+def _from_words(words: List[str], year: int) -> Optional[ParsedDate]:
+    """Date ending in the year from the (up to three) words before it; raises ValueError for impossible dates"""
+    last = words[-1].lower()
+    token = PERIOD_TOKENS.get(last)
+    if token is None and last[-2:-1] == 'q':
+        token = PERIOD_TOKENS.get(last[-2:])
+    if token:
+        return _period(year, *token)
+    if len(words) > 1:
+        day = _day(last)
+        if day is not None:
+            # October 17, 2026 / Oct. 17th 2026
+            month = MONTHS.get(_word(words[-2].removesuffix('.')))
+            return ParsedDate(datetime(year, month, day), DAY) if month else None
+        # third quarter of 2025 / second half 2026
+        period = words[:-1] if last == 'of' else words
+        if len(period) > 1 and period[-1].lower() in PERIOD_WORDS:
+            precision, numbers = PERIOD_WORDS[period[-1].lower()]
+            number = numbers.get(_word(period[-2]))
+            return _period(year, precision, number) if number else None
+    # Aug 2025 / Aug., 2025
+    month = MONTHS.get(_word(words[-1].removesuffix(',').removesuffix('.')))
+    return ParsedDate(datetime(year, month, 1), MONTH) if month else None
+
+
+def period_bounds(value: datetime, precision: str) -> Tuple[date, date]:
+    """First and last day of the day, month, quarter or half (per precision) containing value"""
+    if precision == DAY:
+        return value.date(), value.date()
+    months = PERIOD_MONTHS[precision]
+    first_month = (value.month - 1) // months * months + 1
+    last_month = first_month + months - 1
+    return (date(value.year, first_month, 1),
+            date(value.year, last_month, calendar.monthrange(value.year, last_month)[1]))
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def normalize_date(text: str) -> Optional[ParsedDate]:
+    """First valid date in text, or None"""
+    if not text:
+        return None
+    for match in YEAR_PATTERN.finditer(text):
+        start, end = match.span()
+        year = int(match.group())
+        try:
+            # Forms that start before the year come first, as they start further left
+            before = text[start - 1] if start else ''
+            if before == '/':
+                us = US_PREFIX.search(text, max(0, start - 6), start)
+                if us:
+                    return ParsedDate(datetime(year, int(us.group(1)), int(us.group(2))), DAY)
+            elif before.isdecimal():
+                # Q42025
+                return _period(year, QUARTER, int(before))
+            elif before.isspace():
+                words = text[:start].rsplit(None, 3)
+                parsed = _from_words(words, year) if words else None
+                if parsed:
+                    return parsed
+            iso = ISO_REST.match(text, end)
+            if iso:
+                month = int(iso.group(1))
+                if iso.group(2):
+                    return ParsedDate(datetime(year, month, int(iso.group(2))), DAY)
+                return ParsedDate(datetime(year, month, 1), MONTH)
+        except ValueError:
+            # e.g. 2/30/2025: keep looking further along the string
+            continue
+    return None
+
+
+# ----------------------------------------------------------------------
+# Fuzz / benchmark
+# ----------------------------------------------------------------------
+
+def _parse_date_loop(date_text: str) -> Optional[datetime]:
+    """Previous PDUFAScraper._parse_date (five regexes in turn), kept for benchmarking"""
+    date_text = date_text.strip()
+    months = {
+        'january': 1, 'february': 2, 'march': 3, 'april': 4,
+        'may': 5, 'june': 6, 'july': 7, 'august': 8,
+        'september': 9, 'october': 10, 'november': 11, 'december': 12,
+        'jan': 1, 'feb': 2, 'mar': 3, 'apr': 4, 'jun': 6,
+        'jul': 7, 'aug': 8, 'sep': 9, 'oct': 10, 'nov': 11, 'dec': 12
+    }
+    patterns = [
+        r'(\d{1,2})/(\d{1,2})/(\d{4})',
+        r'(\d{4})-(\d{1,2})-(\d{1,2})',
+        r'(\w+)\s+(\d{1,2}),?\s+(\d{4})',
+        r'Q(\d)\s+(\d{4})',
+        r'(\w+)\s+(\d{4})',
+    ]
+    for pattern in patterns:
+        match = re.search(pattern, date_text)
+        if match:
+            try:
+                if 'Q' in pattern:
+                    return datetime(int(match.group(2)), (int(match.group(1)) - 1) * 3 + 2, 15)
+                elif len(match.groups()) == 2:
+                    month_num = months.get(match.group(1).lower())
+                    if month_num:
+                        return datetime(int(match.group(2)), month_num, 15)
+                elif match.group(1).isdigit():
+                    return datetime(int(match.group(3)), int(match.group(1)), int(match.group(2)))
+                else:
+                    month_num = months.get(match.group(1).lower())
+                    if month_num:
+                        return datetime(int(match.group(3)), month_num, int(match.group(2)))
+            except ValueError:
+                continue
+    return None
+
+
+def _parse_pcd_previous(date_str: str) -> Optional[datetime]:
+    """Previous ClinicalTrialsAggregator completion-date parsing (YYYY-MM padded to the 1st)"""
+    if re.match(r"^\d{4}-\d{2}$", date_str):
+        date_str += "-01"
+    try:
+        return datetime.fromisoformat(date_str.split("T")[0])
+    except Exception:
+        return None
+
+
+FIXTURES_DIR = Path(__file__).resolve().parents[2] / "benchmarks" / "fixtures"
+
+
+def _fixture_strings(fixtures_dir: Path = FIXTURES_DIR) -> dict:
+    """Date strings as recorded from RTT (Event/Outcome divs) and ClinicalTrials.gov (completion dates)"""
+    import json
+
+    from bs4 import BeautifulSoup
+
+    rtt = []
+    for path in sorted((fixtures_dir / "rtt").glob("page_*.html")):
+        soup = BeautifulSoup(path.read_bytes(), 'html.parser')
+        for label in ('Event', 'Outcome'):
+            rtt.extend(div.get_text(strip=True) for div in soup.find_all('div', attrs={'data-th': label}))
+    clinical_trials = []
+    for path in sorted((fixtures_dir / "clinicaltrials").glob("studies_page_*.json")):
+        for study in json.loads(path.read_text()).get('studies', []):
+            status = study.get('protocolSection', {}).get('statusModule', {})
+            clinical_trials.append(status.get('primaryCompletionDateStruct', {}).get('date', ""))
+    return {'rtt': rtt, 'clinical_trials': clinical_trials}
+
+
+def compare_fixtures(fixtures_dir: Path = FIXTURES_DIR) -> dict:
+    """
+    Previous vs new parser over the recorded fixture strings. RTT strings are
+    compared on the mid-period date the scraper stores, completion dates on
+    the period start. Returns per-source counts and the differing strings.
+    """
+    previous_parsers = {'rtt': (_parse_date_loop, 'mid'), 'clinical_trials': (_parse_pcd_previous, 'start')}
+    report = {}
+    for source, strings in _fixture_strings(fixtures_dir).items():
+        previous_parser, anchor = previous_parsers[source]
+        counts = {'strings': len(strings), 'same': 0, 'new_only': 0, 'previous_only': 0, 'different': 0}
+        differences = []
+        for text in sorted(set(strings)):
+            parsed = normalize_date(text)
+            new = getattr(parsed, anchor) if parsed else None
+            previous = previous_parser(text)
+            if new == previous:
+                kind = 'same'
+            elif previous is None:
+                kind = 'new_only'
+            elif new is None:
+                kind = 'previous_only'
+            else:
+                kind = 'different'
+            counts[kind] += strings.count(text)
+            if kind != 'same':
+                differences.append((kind, text, previous, new))
+        report[source] = (counts, differences)
+    return report
+
+
+def _calendar_corpus(n: int, seed: int = 0) -> list:
+    """Strings in the shapes the RTT calendar and ClinicalTrials.gov produce, plus fuzzed variants"""
+    import random
+
+    rng = random.Random(seed)
+    month_names = ["January", "February", "March", "April", "May", "June", "July",
+                   "August", "September", "October", "November", "December"]
+    templates = [
+        lambda y, m, d: f"PDUFA date of {month_names[m - 1]} {d}, {y}",
+        lambda y, m, d: f"FDA decision expected {m}/{d}/{y}",
+        lambda y, m, d: f"Decision anticipated {month_names[m - 1][:3]} {y}",
+        lambda y, m, d: f"FDA decision expected in Q{(m - 1) // 3 + 1} {y}",
+        lambda y, m, d: f"Target action date {y}-{m:02d}-{d:02d}",
+        lambda y, m, d: f"{y}-{m:02d}",
+        lambda y, m, d: f"{y}-{m:02d}-{d:02d}T00:00:00",
+        lambda y, m, d: "FDA decision date to be announced",
+        lambda y, m, d: f"Advisory committee meeting in the second half of {y}",
+    ]
+    # Calendars repeat a small set of phrases, so draw from a few thousand
+    phrases = []
+    for _ in range(4000):
+        y, m, d = rng.randint(2023, 2028), rng.randint(1, 12), rng.randint(1, 28)
+        phrases.append(rng.choice(templates)(y, m, d))
+
+    def fuzz(text: str) -> str:
+        choice = rng.random()
+        if choice < 0.3:
+            return text.upper() if rng.random() < 0.5 else text.lower()
+        if choice < 0.6:
+            cut = rng.randint(0, len(text))
+            return text[:cut] + rng.choice(["", " ", "/", "-", ",", "Q", "13", "2/30/2025", "é"]) + text[cut:]
+        return text[:rng.randint(0, len(text))]
+
+    corpus = [rng.choice(phrases) for _ in range(n)]
+    return [fuzz(text) if rng.random() < 0.05 else text for text in corpus]
+
+
+def main():
+    import time
+
+    # Recorded strings first: nothing the previous parsers read may be lost or moved
+    for source, (counts, differences) in compare_fixtures().items():
+        print(f"Fixture strings from {source}: {counts}")
+        # Dates only the new parser finds are expected (ISO dates); list a few
+        new_only = [difference for difference in differences if difference[0] == 'new_only']
+        for kind, text, previous, new in new_only[:3] + [d for d in differences if d[0] != 'new_only']:
+            print(f"    {kind}: {text!r}: {previous} -> {new}")
+
+    n = 200_000
+    corpus = _calendar_corpus(n)
+
+    # Fuzz: never raises, and should agree with the previous parser wherever it found
+    # a date. That parser also missed ISO dates (reading the year as the month) and
+    # took a year out of longer digit runs ("202613"), which are now rejected
+    disagreements = []
+    for text in set(corpus):
+        parsed = normalize_date(text)
+        previous = _parse_date_loop(text)
+        if previous is not None and (parsed is None or parsed.mid != previous) and not re.search(r"\d{5}", text):
+            disagreements.append((text, previous, parsed))
+
+    normalize_date.cache_clear()
+    start = time.perf_counter()
+    parsed = [normalize_date(text) for text in corpus]
+    cached = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for text in corpus:
+        normalize_date.__wrapped__(text)
+    uncached = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for text in corpus:
+        _parse_date_loop(text)
+    loop = time.perf_counter() - start
+
+    found = [result for result in parsed if result]
+    by_precision = {precision: sum(result.precision == precision for result in found) for precision in (DAY, MONTH, QUARTER, HALF)}
+    print(f"Normalized {n:,} strings ({len(set(corpus)):,} distinct), {len(found):,} dates {by_precision}")
+    print(f"  disagreements with previous parser: {len(disagreements)}")
+    for text, previous, parsed in sorted(disagreements)[:10]:
+        print(f"    {text!r}: {previous} -> {parsed.start if parsed else None}")
+    # The cache only pays off because calendars repeat phrases; report the parser on its own too
+    print(f"  previous: {loop * 1000:8.1f} ms")
+    print(f"  uncached: {uncached * 1000:8.1f} ms ({loop / uncached:.1f}x faster than previous)")
+    print(f"  cached:   {cached * 1000:8.1f} ms ({loop / cached:.1f}x faster than previous, "
+          f"{normalize_date.cache_info().hits:,} cache hits)")
+
+
+if __name__ == "__main__":
+    main()
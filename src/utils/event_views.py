@@ -0,0 +1,49 @@
+"""
+Event Views
+Refreshes the event_positions and upcoming_events materialized views after
+ingestion and trading runs and records when each was rebuilt
+"""
+import psycopg as ppg
+from psycopg import sql
+
+from .logger import get_logger
+
+logger = get_logger("utils")
+
+EVENT_VIEWS = ("event_positions", "upcoming_events")
+
+
+def refresh_event_views(db_settings, views=EVENT_VIEWS):
+    """
+    Rebuild the materialized views concurrently, so dashboard readers are
+    never blocked, and stamp materialized_view_refreshes. Returns the names
+    of the views that were refreshed.
+    """
+    conn = ppg.connect(dbname=db_settings.DB_NAME,
+                       user=db_settings.DB_USER,
+                       host=db_settings.DB_HOST,
+                       password=db_settings.DB_PASSWORD)
+    refreshed = []
+    try:
+        with conn.cursor() as cursor:
+            for view in views:
+                try:
+                    with logger.span("db.refresh_view", view=view):
+                        cursor.execute(sql.SQL("REFRESH MATERIALIZED VIEW CONCURRENTLY {}").format(sql.Identifier(view)))
+                    cursor.execute(
+                        """
+                        INSERT INTO materialized_view_refreshes (view_name, refreshed_at)
+                        VALUES (%s, now())
+                        ON CONFLICT (view_name) DO UPDATE SET refreshed_at = EXCLUDED.refreshed_at
+                        """,
+                        (view,)
+                    )
+                    conn.commit()
+                    refreshed.append(view)
+                except Exception as e:
+                    logger.error(f"Error refreshing materialized view {view}: {e}", view=view)
+                    conn.rollback()
+    finally:
+        conn.close()
+    logger.info(f"Refreshed materialized views: {', '.join(refreshed) or 'none'}")
+    return refreshed
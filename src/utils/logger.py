@@ -0,0 +1,312 @@
+"""
+Logger
+Project-wide logger (see requirements/logger_requirements.pdf) wrapping the
+standard logging module.
+
+- Console lines read "YYYY-MM-DD HH:MM:SS [LEVEL] message key=value ...",
+  color-coded when attached to a terminal.
+- The optional log file gets one JSON object per line (rotated by size), so
+  runs can be filtered by job, ticker, nctid or event id afterwards.
+- Context fields bound with logger.context(...) are attached to every
+  record logged inside the block.
+- logger.span(name) times a block (external call, DB write) and feeds a
+  per-run p50/p95 latency summary per span name.
+"""
+import json
+import logging
+import logging.handlers
+import sys
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from functools import wraps
+from pathlib import Path
+from typing import Dict, Optional
+
+ROOT_LOGGER = "pharma_trade"
+LOG_DIR = Path(__file__).resolve().parents[2] / "logs"
+
+CONSOLE_FORMAT = "%(asctime)s [%(levelname)s] %(message)s"
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Rotate the JSON-lines file after this many bytes, keeping a few backups
+MAX_LOG_BYTES = 10 * 1024 * 1024
+LOG_BACKUP_COUNT = 5
+
+# Latest durations kept per span name for the percentile summary
+SPAN_HISTORY = 10000
+
+COLORS = {
+    'DEBUG': "\033[90m",
+    'INFO': "\033[37m",
+    'WARNING': "\033[33m",
+    'ERROR': "\033[31m",
+    'CRITICAL': "\033[1;31m",
+}
+RESET = "\033[0m"
+
+_context: ContextVar[dict] = ContextVar("log_context", default={})
+
+
+class _ConsoleFormatter(logging.Formatter):
+    def __init__(self, color: bool):
+        super().__init__(CONSOLE_FORMAT, DATE_FORMAT)
+        self.color = color
+
+    def formatMessage(self, record):
+        line = super().formatMessage(record)
+        fields = getattr(record, 'fields', None)
+        if fields:
+            line += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        return line
+
+    def format(self, record):
+        line = super().format(record)
+        if self.color and record.levelname in COLORS:
+            line = f"{COLORS[record.levelname]}{line}{RESET}"
+        return line
+
+
+class _JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+            **getattr(record, 'fields', {}),
+        }
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class _SpanStats:
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.durations = deque(maxlen=SPAN_HISTORY)
+
+    def summary(self) -> Dict[str, float]:
+        durations = sorted(self.durations)
+
+        def percentile(p):
+            if not durations:
+                return 0.0
+            return round(durations[min(len(durations) - 1, int(p * len(durations)))] * 1000, 3)
+
+        return {
+            'count': self.count,
+            'errors': self.errors,
+            'total_ms': round(self.total * 1000, 3),
+            'p50_ms': percentile(0.50),
+            'p95_ms': percentile(0.95),
+        }
+
+
+class Logger:
+    """
+    Singleton: every Logger(...) call returns the same instance. Calling it
+    with arguments (re)configures the handlers; calling it bare, as modules
+    do through get_logger(), leaves the configuration alone.
+    """
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __new__(cls, *args, **kwargs):
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = super().__new__(cls)
+                cls._instance._configured = False
+            return cls._instance
+
+    def __init__(self, level: Optional[str] = None, log_to_file: Optional[bool] = None,
+                 file_path: Optional[str] = None, module_levels: Optional[Dict[str, str]] = None,
+                 color: Optional[bool] = None):
+        if self._configured and all(arg is None for arg in (level, log_to_file, file_path, module_levels, color)):
+            return
+        self._logger = logging.getLogger(ROOT_LOGGER)
+        self._spans: Dict[str, _SpanStats] = defaultdict(_SpanStats)
+        self._spans_lock = threading.Lock()
+        self.configure(level or "INFO", bool(log_to_file), file_path, module_levels, color)
+        self._configured = True
+
+    def configure(self, level: str = "INFO", log_to_file: bool = False, file_path: Optional[str] = None,
+                  module_levels: Optional[Dict[str, str]] = None, color: Optional[bool] = None):
+        """Replace the handlers: console always, JSON-lines file (append mode) optionally"""
+        self._logger.setLevel(level.upper())
+        self._logger.propagate = False
+        for handler in list(self._logger.handlers):
+            self._logger.removeHandler(handler)
+            handler.close()
+
+        console = logging.StreamHandler(sys.stdout)
+        console.setFormatter(_ConsoleFormatter(sys.stdout.isatty() if color is None else color))
+        self._logger.addHandler(console)
+
+        self.file_path = None
+        if log_to_file:
+            self.file_path = Path(file_path) if file_path else LOG_DIR / f"run_{datetime.now():%Y%m%d_%H%M%S}.jsonl"
+            self.file_path.parent.mkdir(parents=True, exist_ok=True)
+            file_handler = logging.handlers.RotatingFileHandler(
+                self.file_path, mode='a', maxBytes=MAX_LOG_BYTES, backupCount=LOG_BACKUP_COUNT, encoding='utf-8'
+            )
+            file_handler.setFormatter(_JsonFormatter())
+            self._logger.addHandler(file_handler)
+
+        for module, module_level in (module_levels or {}).items():
+            self.set_module_level(module, module_level)
+
+    def set_level(self, level: str):
+        self._logger.setLevel(level.upper())
+
+    def set_module_level(self, module: str, level: str):
+        """Different verbosity for one module, e.g. set_module_level("data_inflows", "DEBUG")"""
+        logging.getLogger(f"{ROOT_LOGGER}.{module}").setLevel(level.upper())
+
+    # ------------------------------------------------------------------
+    # Logging
+    # ------------------------------------------------------------------
+
+    def _log(self, std_logger: logging.Logger, level: int, msg: str, fields: dict, exc_info=None):
+        if not std_logger.isEnabledFor(level):
+            return
+        merged = {**_context.get(), **fields}
+        std_logger.log(level, msg, exc_info=exc_info, extra={'fields': merged})
+
+    def debug(self, msg: str, **fields):
+        self._log(self._logger, logging.DEBUG, msg, fields)
+
+    def info(self, msg: str, **fields):
+        self._log(self._logger, logging.INFO, msg, fields)
+
+    def warning(self, msg: str, **fields):
+        self._log(self._logger, logging.WARNING, msg, fields)
+
+    def error(self, msg: str, exc_info=None, **fields):
+        self._log(self._logger, logging.ERROR, msg, fields, exc_info)
+
+    def critical(self, msg: str, exc_info=None, **fields):
+        self._log(self._logger, logging.CRITICAL, msg, fields, exc_info)
+
+    @contextmanager
+    def context(self, **fields):
+        """Attach fields (job, ticker, nctid, event_id, ...) to every record in the block"""
+        token = _context.set({**_context.get(), **fields})
+        try:
+            yield
+        finally:
+            _context.reset(token)
+
+    # ------------------------------------------------------------------
+    # Timing spans
+    # ------------------------------------------------------------------
+
+    def record_span(self, name: str, seconds: float, error: bool = False):
+        """Add a duration measured elsewhere (e.g. inside the Alpaca gateway) to the run summary"""
+        with self._spans_lock:
+            stats = self._spans[name]
+            stats.count += 1
+            stats.total += seconds
+            stats.durations.append(seconds)
+            if error:
+                stats.errors += 1
+
+    def span(self, name: str, **fields):
+        """Time a block; logged at DEBUG and aggregated into span_summary()"""
+        return self._span(self._logger, name, fields)
+
+    @contextmanager
+    def _span(self, std_logger: logging.Logger, name: str, fields: dict):
+        start = time.perf_counter()
+        error = False
+        try:
+            yield
+        except BaseException:
+            error = True
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            self.record_span(name, elapsed, error)
+            self._log(std_logger, logging.DEBUG, f"span {name}", {
+                'span': name, 'duration_ms': round(elapsed * 1000, 3), 'error': error, **fields
+            })
+
+    def timed(self, name: Optional[str] = None):
+        """Decorator form of span()"""
+        def decorator(func):
+            span_name = name or func.__qualname__
+
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(span_name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def span_summary(self) -> Dict[str, Dict[str, float]]:
+        """Count, errors, total and p50/p95 latency per span name for this run"""
+        with self._spans_lock:
+            return {name: stats.summary() for name, stats in self._spans.items()}
+
+    def reset_spans(self):
+        with self._spans_lock:
+            self._spans.clear()
+
+    def log_span_summary(self):
+        """Log the per-run latency table (and one structured record per span name)"""
+        summary = self.span_summary()
+        if not summary:
+            return
+        self.info("Run timing summary:")
+        for name, stats in sorted(summary.items(), key=lambda item: -item[1]['total_ms']):
+            self.info(
+                f"  {name}: {stats['count']} calls, {stats['errors']} errors, total {stats['total_ms']:.0f}ms, "
+                f"p50 {stats['p50_ms']:.0f}ms, p95 {stats['p95_ms']:.0f}ms",
+                span=name, **stats
+            )
+
+
+class ModuleLogger:
+    """Per-module view of the singleton, so module levels apply (see Logger.set_module_level)"""
+
+    def __init__(self, logger: Logger, module: str):
+        self._root = logger
+        self._logger = logging.getLogger(f"{ROOT_LOGGER}.{module}")
+
+    def debug(self, msg: str, **fields):
+        self._root._log(self._logger, logging.DEBUG, msg, fields)
+
+    def info(self, msg: str, **fields):
+        self._root._log(self._logger, logging.INFO, msg, fields)
+
+    def warning(self, msg: str, **fields):
+        self._root._log(self._logger, logging.WARNING, msg, fields)
+
+    def error(self, msg: str, exc_info=None, **fields):
+        self._root._log(self._logger, logging.ERROR, msg, fields, exc_info)
+
+    def critical(self, msg: str, exc_info=None, **fields):
+        self._root._log(self._logger, logging.CRITICAL, msg, fields, exc_info)
+
+    def context(self, **fields):
+        return self._root.context(**fields)
+
+    def span(self, name: str, **fields):
+        return self._root._span(self._logger, name, fields)
+
+    def timed(self, name: Optional[str] = None):
+        return self._root.timed(name)
+
+    def record_span(self, name: str, seconds: float, error: bool = False):
+        self._root.record_span(name, seconds, error)
+
+
+def get_logger(module: Optional[str] = None):
+    """The shared Logger, or a per-module view of it (module is usually the top-level package)"""
+    logger = Logger()
+    return ModuleLogger(logger, module) if module else logger
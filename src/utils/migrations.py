@@ -0,0 +1,50 @@
+"""
+Schema Migrations
+Applies the numbered SQL files in sql/migrations that have not been run yet
+"""
+from pathlib import Path
+
+import psycopg as ppg
+
+from .logger import get_logger
+
+logger = get_logger("utils")
+
+MIGRATIONS_DIR = Path(__file__).resolve().parents[2] / "sql" / "migrations"
+
+
+def run_migrations(db_settings, migrations_dir: Path = MIGRATIONS_DIR):
+    """Apply pending migrations in filename order, one transaction per file"""
+    conn = ppg.connect(dbname=db_settings.DB_NAME,
+                       user=db_settings.DB_USER,
+                       host=db_settings.DB_HOST,
+                       password=db_settings.DB_PASSWORD)
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(
+                """
+                CREATE TABLE IF NOT EXISTS schema_migrations (
+                    filename TEXT PRIMARY KEY,
+                    applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+                )
+                """
+            )
+            conn.commit()
+
+            cursor.execute("SELECT filename FROM schema_migrations")
+            applied = {row[0] for row in cursor.fetchall()}
+
+            for path in sorted(migrations_dir.glob("*.sql")):
+                if path.name in applied:
+                    continue
+                logger.info(f"Applying migration {path.name}...", migration=path.name)
+                try:
+                    cursor.execute(path.read_text())
+                    cursor.execute("INSERT INTO schema_migrations (filename) VALUES (%s)", (path.name,))
+                    conn.commit()
+                except Exception as e:
+                    logger.error(f"Error applying migration {path.name}: {e}", migration=path.name)
+                    conn.rollback()
+                    raise
+    finally:
+        conn.close()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Option Symbol Parser
+Vectorized parsing of OCC option symbols (e.g. AAPL240119C00185000) into
+typed underlying / expiration / type / strike / DTE columns
+"""
+from datetime import date
+from typing import Iterable, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+# OCC layout: [UNDERLYING up to 6, space padded][YYMMDD][C/P][STRIKE x 1000, 8 digits].
+# Right-aligning every symbol to the full 21 characters puts the fixed-width
+# tail in fixed columns, so the whole batch is parsed as one uint8 matrix.
+OCC_WIDTH = 21
+ROOT_WIDTH = 6
+EXPIRY_COLS = slice(6, 12)
+TYPE_COL = 12
+STRIKE_COLS = slice(13, 21)
+
+
+def _digits_to_int(digits: np.ndarray) -> np.ndarray:
+    """Fold a (n, k) matrix of digit values into n integers"""
+    powers = 10 ** np.arange(digits.shape[1] - 1, -1, -1, dtype=np.int64)
+    return digits.astype(np.int64) @ powers
+
+
+def parse_option_symbols(symbols: Union[pd.Series, Iterable[str]], as_of: Optional[date] = None) -> pd.DataFrame:
+    """
+    Parse a column of symbols in one pass.
+    Returns a frame aligned with the input with columns symbol, is_option,
+    underlying, expiration, option_type, strike and days_to_expiration.
+    Symbols that are not OCC options get is_option=False and null fields.
+    """
+    symbols = pd.Series(symbols, dtype="string") if not isinstance(symbols, pd.Series) else symbols.astype("string")
+    as_of = np.datetime64(as_of or date.today(), 'D')
+
+    # One spare character so over-long symbols still show up in the lengths
+    values = symbols.fillna("").to_numpy(dtype=object).astype(f'U{OCC_WIDTH + 1}')
+    lengths = np.char.str_len(values)
+    padded = np.char.rjust(values, OCC_WIDTH) if len(values) else values
+    try:
+        padded = padded.astype(f'S{OCC_WIDTH}')
+    except UnicodeEncodeError:
+        padded = np.char.encode(padded, 'ascii', 'replace').astype(f'S{OCC_WIDTH}')
+    chars = padded.view(np.uint8).reshape(-1, OCC_WIDTH)
+
+    digits = chars - ord('0')
+    expiry = digits[:, EXPIRY_COLS]
+    strike_digits = digits[:, STRIKE_COLS]
+    type_char = chars[:, TYPE_COL]
+    root = chars[:, :ROOT_WIDTH]
+    root_start = chars[np.arange(len(chars)), (OCC_WIDTH - lengths).clip(0, OCC_WIDTH - 1)]
+
+    is_option = (
+        (lengths > 15) & (lengths <= OCC_WIDTH)
+        & (expiry <= 9).all(axis=1)
+        & (strike_digits <= 9).all(axis=1)
+        & ((type_char == ord('C')) | (type_char == ord('P')))
+        & (root_start >= ord('A')) & (root_start <= ord('Z'))
+    )
+
+    # Build dates as datetime64: months since epoch, then days into the month
+    month = _digits_to_int(expiry[:, 2:4])
+    day = _digits_to_int(expiry[:, 4:6])
+    month_start = ((_digits_to_int(expiry[:, 0:2]) + 30) * 12 + month - 1).astype('datetime64[M]')
+    expiration = month_start.astype('datetime64[D]') + (day - 1)
+    # Reject impossible dates, including days that overflow the month (Feb 30)
+    is_option &= (month >= 1) & (month <= 12) & (day >= 1) & (expiration.astype('datetime64[M]') == month_start)
+
+    expiration = np.where(is_option, expiration, np.datetime64('NaT'))
+    strike = np.where(is_option, _digits_to_int(strike_digits) / 1000, np.nan)
+    option_type = pd.Categorical.from_codes(
+        np.where(is_option, (type_char == ord('P')).astype(np.int8), -1),
+        categories=['CALL', 'PUT']
+    )
+    underlying = pd.array(np.char.strip(root.copy().view(f'S{ROOT_WIDTH}').ravel()).astype(f'U{ROOT_WIDTH}'), dtype="string")
+    underlying[~is_option] = pd.NA
+    days_to_expiration = pd.array((expiration - as_of).astype(np.int64), dtype="Int64")
+    days_to_expiration[~is_option] = pd.NA
+
+    return pd.DataFrame({
+        'symbol': symbols,
+        'is_option': is_option,
+        'underlying': underlying,
+        'expiration': expiration.astype('datetime64[ns]'),
+        'option_type': option_type,
+        'strike': strike,
+        'days_to_expiration': days_to_expiration
+    }, index=symbols.index)
+
+
+def _parse_option_symbol_loop(symbol: str):
+    """Previous per-symbol parser, kept for benchmarking"""
+    underlying_end = 0
+    for i, char in enumerate(symbol):
+        if char.isdigit():
+            underlying_end = i
+            break
+    remainder = symbol[underlying_end:]
+    exp_date = date(2000 + int(remainder[:2]), int(remainder[2:4]), int(remainder[4:6]))
+    return {
+        'underlying': symbol[:underlying_end],
+        'expiration': exp_date,
+        'option_type': 'CALL' if remainder[6] == 'C' else 'PUT',
+        'strike': float(remainder[7:]) / 1000,
+        'days_to_expiration': (exp_date - date.today()).days
+    }
+
+
+def main():
+    import time
+
+    n = 100_000
+    rng = np.random.default_rng(0)
+    letters = np.array(list("ABCDEFGHIJKLMNOPQRSTUVWXYZ"))
+    roots = ["".join(rng.choice(letters, size=rng.integers(1, 6))) for _ in range(1000)]
+    expiries = pd.date_range("2025-01-01", periods=730, freq="D").strftime("%y%m%d")
+    symbols = pd.Series([
+        f"{roots[r]}{expiries[e]}{'C' if c else 'P'}{k:08d}"
+        for r, e, c, k in zip(
+            rng.integers(0, len(roots), n),
+            rng.integers(0, len(expiries), n),
+            rng.integers(0, 2, n),
+            rng.integers(1, 500, n) * 500
+        )
+    ])
+
+    start = time.perf_counter()
+    parsed = parse_option_symbols(symbols)
+    vectorized = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for symbol in symbols:
+        _parse_option_symbol_loop(symbol)
+    loop = time.perf_counter() - start
+
+    assert parsed['is_option'].all()
+    print(f"Parsed {n:,} symbols")
+    print(f"  vectorized: {vectorized * 1000:8.1f} ms")
+    print(f"  loop:       {loop * 1000:8.1f} ms ({loop / vectorized:.1f}x slower)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""
+Run Profiling
+cProfile capture for main.py subcommands (--profile) and a diff report
+between two captured runs.
+
+A profiled run writes two files next to its log:
+- <log>.prof: raw pstats data (python -m pstats, snakeviz, ...)
+- <log>.profile.json: wall time, process CPU time and a network / DB / CPU
+  breakdown of the wall time, the logger's span summary and the top
+  functions by cumulative and own time. profile_diff compares two of these.
+
+The breakdown attributes each profiled function's own time by where it
+lives: psycopg code is DB, socket / HTTP client code is network, and time
+spent blocked on worker threads (the Alpaca gateway loop, yfinance download
+threads) counts as network since those threads only do I/O. Built-ins such
+as socket reads or select waits are charged to whoever called them.
+"""
+import cProfile
+import json
+import pstats
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Tuple
+
+from .logger import get_logger
+
+logger = get_logger("utils")
+
+DB_MARKERS = ("/psycopg/", "/psycopg_binary/", "/psycopg_pool/")
+NETWORK_MARKERS = (
+    "/socket.py", "/ssl.py", "/http/client.py", "/selectors.py", "/urllib3/", "/requests/",
+    "/aiohttp/", "/curl_cffi/", "/yfinance/", "/alpaca/", "/concurrent/futures/", "/threading.py",
+)
+
+# Functions listed in the JSON summary (by cumulative and by own time)
+TOP_FUNCTIONS = 40
+
+
+def _classify_path(filename: str) -> str:
+    filename = filename.replace("\\", "/")
+    if any(marker in filename for marker in DB_MARKERS):
+        return 'db'
+    if any(marker in filename for marker in NETWORK_MARKERS):
+        return 'network'
+    return 'cpu'
+
+
+def _function_name(key: Tuple[str, int, str]) -> str:
+    filename, line, name = key
+    if filename == '~':
+        return name
+    parts = Path(filename).parts
+    return f"{'/'.join(parts[-2:])}:{line}({name})"
+
+
+def time_breakdown(stats: pstats.Stats) -> Dict[str, float]:
+    """Seconds of profiled wall time per category (network, db, cpu)"""
+    breakdown = {'network': 0.0, 'db': 0.0, 'cpu': 0.0}
+    for (filename, line, name), (_, _, tottime, _, callers) in stats.stats.items():
+        if filename != '~' or not callers:
+            breakdown[_classify_path(filename)] += tottime
+            continue
+        # Built-in: split its own time over its callers
+        caller_total = sum(entry[2] for entry in callers.values()) or 1.0
+        for caller, entry in callers.items():
+            category = _classify_path(caller[0]) if caller[0] != '~' else 'cpu'
+            breakdown[category] += tottime * entry[2] / caller_total
+    return breakdown
+
+
+def _top_functions(stats: pstats.Stats, sort_index: int) -> Dict[str, dict]:
+    rows = sorted(stats.stats.items(), key=lambda item: -item[1][sort_index])[:TOP_FUNCTIONS]
+    return {
+        _function_name(key): {'calls': nc, 'tottime_s': round(tt, 6), 'cumtime_s': round(ct, 6)}
+        for key, (_, nc, tt, ct, _) in rows
+    }
+
+
+def summarize_profile(stats: pstats.Stats, wall: float, cpu: float) -> dict:
+    breakdown = time_breakdown(stats)
+    # Whatever cProfile did not see (other threads' own work, profiler gaps) stays CPU
+    breakdown['cpu'] = max(wall - breakdown['network'] - breakdown['db'], 0.0)
+    return {
+        'wall_s': round(wall, 6),
+        'process_cpu_s': round(cpu, 6),
+        'breakdown_s': {category: round(seconds, 6) for category, seconds in breakdown.items()},
+        'spans': get_logger().span_summary(),
+        'top_cumulative': _top_functions(stats, 3),
+        'top_own': _top_functions(stats, 2),
+    }
+
+
+@contextmanager
+def profile_run(output_path: Path, command: str = ""):
+    """Profile the block; write output_path.prof and output_path.profile.json"""
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    profiler = cProfile.Profile()
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        wall, cpu = time.perf_counter() - wall_start, time.process_time() - cpu_start
+
+        prof_path = output_path.with_suffix(".prof")
+        profiler.dump_stats(prof_path)
+        summary = {'command': command, **summarize_profile(pstats.Stats(profiler), wall, cpu)}
+        summary_path = output_path.with_suffix(".profile.json")
+        summary_path.write_text(json.dumps(summary, indent=2))
+
+        breakdown = summary['breakdown_s']
+        logger.info(
+            f"Profile: wall {wall:.2f}s (network {breakdown['network']:.2f}s, db {breakdown['db']:.2f}s, "
+            f"cpu {breakdown['cpu']:.2f}s), process CPU {cpu:.2f}s -> {summary_path}",
+            profile=str(summary_path), **{f"{category}_s": seconds for category, seconds in breakdown.items()}
+        )
+
+
+# ----------------------------------------------------------------------
+# Diff report
+# ----------------------------------------------------------------------
+
+def load_profile(path) -> dict:
+    """A .profile.json summary (given it, its .prof or the run's log path)"""
+    path = Path(path)
+    if not path.name.endswith(".profile.json"):
+        path = path.with_suffix(".profile.json")
+    return json.loads(path.read_text())
+
+
+def _delta(before: float, after: float) -> str:
+    change = after - before
+    percent = f" ({change / before:+.0%})" if before else ""
+    return f"{before:10.3f} -> {after:10.3f}  {change:+10.3f}{percent}"
+
+
+def diff_profiles(before: dict, after: dict, limit: int = 15) -> str:
+    """Text report: totals, breakdown, spans and the functions whose time changed most"""
+    lines = [f"Profile diff: {before.get('command', '')} -> {after.get('command', '')}", "", "Totals (s)"]
+    lines.append(f"  {'wall':<48} {_delta(before['wall_s'], after['wall_s'])}")
+    lines.append(f"  {'process cpu':<48} {_delta(before['process_cpu_s'], after['process_cpu_s'])}")
+    for category in ('network', 'db', 'cpu'):
+        lines.append(f"  {category:<48} {_delta(before['breakdown_s'].get(category, 0.0), after['breakdown_s'].get(category, 0.0))}")
+
+    spans = sorted(set(before['spans']) | set(after['spans']))
+    if spans:
+        lines += ["", "Spans: total ms (p95 ms)"]
+        rows = []
+        for span in spans:
+            a, b = before['spans'].get(span, {}), after['spans'].get(span, {})
+            rows.append((abs(b.get('total_ms', 0) - a.get('total_ms', 0)), span, a, b))
+        for _, span, a, b in sorted(rows, reverse=True)[:limit]:
+            lines.append(f"  {span:<48} {_delta(a.get('total_ms', 0.0), b.get('total_ms', 0.0))}"
+                         f"  (p95 {a.get('p95_ms', 0.0):.1f} -> {b.get('p95_ms', 0.0):.1f})")
+
+    functions = set(before['top_cumulative']) | set(after['top_cumulative'])
+    rows = []
+    for function in functions:
+        a = before['top_cumulative'].get(function, {}).get('cumtime_s', 0.0)
+        b = after['top_cumulative'].get(function, {}).get('cumtime_s', 0.0)
+        rows.append((abs(b - a), function, a, b))
+    lines += ["", "Functions: cumulative s"]
+    for _, function, a, b in sorted(rows, reverse=True)[:limit]:
+        lines.append(f"  {function[:48]:<48} {_delta(a, b)}")
+    return "\n".join(lines)
+
+
+def print_profile_diff(before_path, after_path):
+    print(diff_profiles(load_profile(before_path), load_profile(after_path)))